@@ -0,0 +1,231 @@
+"""
+Headless HTTP/JSON API for water filter recommendations, backed by the same
+RecommendationService as the Streamlit app.
+
+    python api.py --port 8080 --workers 4 --processes 2
+
+POST /recommend    body: requirements JSON (as produced by the assistant)
+                   query: top_k=<n>, alibaba=0 to skip Alibaba, markdown=1 to add the rendered answer
+GET  /health       catalogue version and product count
+GET  /metrics      per-stage latency percentiles and recommendation cache counters, Prometheus text format
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import json
+import multiprocessing
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from utils.catalogue import CatalogueStore
+from utils.data_loader import DISPLAY_COLUMNS, load_product_data
+from utils.recommendation_service import (
+    ALIBABA_LATENCY_BUDGET_SECONDS, MAX_RESULTS, RecommendationService, validate_requirements
+)
+from utils.tracing import tracer
+
+# Seconds a request may take end to end before it is answered with 504
+REQUEST_TIMEOUT_SECONDS = 5.0
+
+# Requests in progress at once per process, counting ranking jobs that
+# outlive their timed-out request; more are rejected with 503
+MAX_PENDING_REQUESTS = 64
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SERVICE_KEY = web.AppKey('service', RecommendationService)
+EXECUTOR_KEY = web.AppKey('executor', concurrent.futures.ThreadPoolExecutor)
+SETTINGS_KEY = web.AppKey('settings', dict)
+
+
+def error_response(status, message):
+    return web.json_response({'error': message}, status=status)
+
+
+def _query_flag(request, name, default):
+    value = request.query.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+async def _alibaba_results(service, requirements, budget):
+    """
+    Alibaba rows if the search finishes within budget, else None. A slow
+    search keeps running and fills the search cache for later requests.
+    """
+    future = asyncio.wrap_future(service.search_alibaba(requirements))
+    done, _ = await asyncio.wait({future}, timeout=budget)
+    if not done:
+        return None
+    return future.result()
+
+
+def _recommend(service, requirements, alibaba_results_df, alibaba_status, top_k, include_markdown):
+    recommendation = service.recommend(requirements, alibaba_results_df, alibaba_status, top_k=top_k)
+    return recommendation.to_dict(include_markdown=include_markdown)
+
+
+async def recommend(request):
+    app = request.app
+    settings = app[SETTINGS_KEY]
+
+    try:
+        requirements = validate_requirements(await request.json())
+    except json.JSONDecodeError:
+        return error_response(400, "Request body must be JSON")
+    except ValueError as e:
+        return error_response(400, str(e))
+
+    try:
+        top_k = int(request.query.get('top_k', MAX_RESULTS))
+    except ValueError:
+        return error_response(400, "top_k must be an integer")
+    if top_k < 1:
+        return error_response(400, "top_k must be at least 1")
+    use_alibaba = _query_flag(request, 'alibaba', True)
+    include_markdown = _query_flag(request, 'markdown', False)
+
+    if settings['pending'] >= settings['max_pending']:
+        return error_response(503, "Too many requests in progress, retry later")
+
+    service = app[SERVICE_KEY]
+    loop = asyncio.get_running_loop()
+    job = None
+
+    def release():
+        settings['pending'] -= 1
+
+    def on_job_done(_):
+        # Runs in the worker thread; the count belongs to the event loop
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(release)
+
+    async def run():
+        nonlocal job
+        alibaba_results_df = None
+        alibaba_status = 'disabled'
+        if use_alibaba:
+            alibaba_results_df = await _alibaba_results(service, requirements, settings['alibaba_budget'])
+            alibaba_status = 'pending'
+        # Ranking and serialization are CPU work, keep them off the event loop.
+        # The copied context carries the request's trace into the worker thread.
+        job = app[EXECUTOR_KEY].submit(
+            contextvars.copy_context().run,
+            _recommend, service, requirements, alibaba_results_df, alibaba_status, top_k, include_markdown,
+        )
+        # A timeout cannot stop the job, so it holds its slot until it finishes
+        job.add_done_callback(on_job_done)
+        return await asyncio.wrap_future(job)
+
+    settings['pending'] += 1
+    try:
+        with tracer.turn('api.recommend'):
+            result = await asyncio.wait_for(run(), timeout=settings['timeout'])
+    except asyncio.TimeoutError:
+        return error_response(504, "Recommendation timed out")
+    except Exception as e:
+        print(f"Error handling recommendation request: {e!r}")
+        return error_response(500, "Internal error")
+    finally:
+        if job is None:
+            # Timed out or failed before ranking started
+            release()
+
+    return web.json_response(result)
+
+
+async def metrics(request):
+    text = tracer.prometheus_text() + request.app[SERVICE_KEY].cache.prometheus_text()
+    return web.Response(text=text, headers={'Content-Type': PROMETHEUS_CONTENT_TYPE})
+
+
+async def health(request):
+    catalogue = request.app[SERVICE_KEY].catalogue()
+    return web.json_response({
+        'status': 'ok',
+        'catalogue_version': catalogue.version,
+        'products': len(catalogue.products_df),
+    })
+
+
+def create_app(service=None, workers=4, timeout=REQUEST_TIMEOUT_SECONDS,
+               max_pending=MAX_PENDING_REQUESTS, alibaba_budget=ALIBABA_LATENCY_BUDGET_SECONDS, shard_workers=0):
+    """
+    Build the aiohttp application
+
+    Parameters:
+    service (RecommendationService): Defaults to one over the default catalogue
+    workers (int): Threads that run ranking and rendering
+    timeout (float): Seconds before a request is answered with 504
+    max_pending (int): Requests admitted at once before answering 503
+    alibaba_budget (float): Seconds to wait for Alibaba before ranking without it
+    shard_workers (int): Processes for sharded matching of large catalogues, 0 to match in-process
+    """
+    if service is None:
+        store = CatalogueStore(loader=functools.partial(load_product_data, columns=DISPLAY_COLUMNS))
+        service = RecommendationService(store, shard_workers=shard_workers)
+        service.precompute()
+
+    app = web.Application()
+    app[SERVICE_KEY] = service
+    app[EXECUTOR_KEY] = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='recommend')
+    app[SETTINGS_KEY] = {
+        'timeout': timeout,
+        'max_pending': max_pending,
+        'alibaba_budget': alibaba_budget,
+        'pending': 0,
+    }
+
+    async def shutdown_executor(app):
+        app[EXECUTOR_KEY].shutdown(wait=False)
+
+    app.on_cleanup.append(shutdown_executor)
+    app.add_routes([
+        web.post('/recommend', recommend),
+        web.get('/health', health),
+        web.get('/metrics', metrics),
+    ])
+    return app
+
+
+def serve(host, port, workers, timeout, shard_workers=0, reuse_port=False):
+    app = create_app(workers=workers, timeout=timeout, shard_workers=shard_workers)
+    web.run_app(app, host=host, port=port, reuse_port=reuse_port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Water filter recommendation API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=4, help="Ranking threads per process")
+    parser.add_argument('--processes', type=int, default=1, help="Server processes sharing the port")
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT_SECONDS, help="Per-request timeout in seconds")
+    parser.add_argument('--shard-workers', type=int, default=0,
+                        help="Matching processes per server process for large catalogues (0 = in-process)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if args.processes == 1:
+        serve(args.host, args.port, args.workers, args.timeout, args.shard_workers)
+        return
+
+    # Each process loads its own catalogue snapshot and the kernel spreads
+    # connections across them (SO_REUSEPORT)
+    processes = [
+        multiprocessing.Process(
+            target=serve, args=(args.host, args.port, args.workers, args.timeout, args.shard_workers, True)
+        )
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,20 @@
 import os
-import json
+import uuid
+import functools
 import streamlit as st
-import pandas as pd
 from dotenv import load_dotenv
-from utils.data_loader import load_product_data
-from utils.product_matcher import match_products, format_comparison_table
-from utils.mock_claude import get_mock_response
-from utils.alibaba_scraper import alibaba_search
+from utils.catalogue import CatalogueStore
+from utils.data_loader import DISPLAY_COLUMNS, load_product_data
+from utils.product_matcher import format_comparison_table, get_detailed_comparison
+from utils.llm_backend import get_llm_backend
+from utils.incremental_ranking import RankingState
+from utils.recommendation_service import RecommendationService, extract_requirements as parse_requirements
+from utils.response_stream import stream_reply
+from utils.async_fetcher import async_fetcher
+from utils.chat_history import ChatHistory
+from utils.compact_rows import compact_rows
+from utils.session_memory import catalogue_objects, session_report
+from utils.tracing import tracer
 
 # Load environment variables
 load_dotenv()
@@ -18,8 +26,34 @@ st.set_page_config(
     layout="wide"
 )
 
-# Load product data
-products_df = load_product_data()
+# Product data is loaded once per process and reloaded only when the file changes.
+# Only the columns the app matches on and displays are read.
+@st.cache_resource
+def get_catalogue_store():
+    return CatalogueStore(loader=functools.partial(load_product_data, columns=DISPLAY_COLUMNS))
+
+# Largest number of alternatives the UI can show (see the sidebar slider)
+MAX_COMPARE_COUNT = 10
+
+# Matching and ranking live in the recommendation service, shared with the HTTP API (api.py)
+# Common requirement profiles (RECOMMENDATION_PROFILES) are ranked into its cache up front
+@st.cache_resource
+def get_recommendation_service():
+    service = RecommendationService(get_catalogue_store(), max_results=MAX_COMPARE_COUNT)
+    service.precompute()
+    return service
+
+recommendation_service = get_recommendation_service()
+
+# MockClaude by default; Claude when ANTHROPIC_API_KEY or LLM_BACKEND=anthropic is set
+@st.cache_resource
+def get_conversation_backend():
+    return get_llm_backend()
+
+llm_backend = get_conversation_backend()
+
+# Keep one catalogue snapshot for the whole script run
+catalogue = recommendation_service.catalogue()
 
 # Title and description
 st.title("💧 Water Filter Shopping Assistant")
@@ -29,10 +63,14 @@ Chat with our AI to discuss your requirements, and we'll recommend the best prod
 """)
 
 # Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# Replies keep product ids rather than markdown, and old turns are summarized to fit a byte budget
+if "history" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+    st.session_state.history = ChatHistory()
     st.session_state.user_requirements = {}
     st.session_state.recommendations = None
+    # Filter bitsets and Alibaba rows of the last ranking, so refinements only redo what changed
+    st.session_state.ranking_state = RankingState()
     st.session_state.user_profile = {}  
     st.session_state.location_asked = False
     st.session_state.context = {
@@ -43,32 +81,30 @@ if "messages" not in st.session_state:
 # Function to extract requirements from response
 def extract_requirements(content):
     try:
-        # Look for JSON block in the response
-        if "```json" in content:
-            json_start = content.find("```json") + 7
-            json_end = content.find("```", json_start)
-            json_str = content[json_start:json_end].strip()
-            requirements = json.loads(json_str)
-            return requirements
-        return None
+        return parse_requirements(content)
     except Exception as e:
         st.error(f"Error extracting requirements: {e}")
         return None
 
-# Function to generate YouTube installation links (in a real app, this would come from your database)
-def get_installation_guide(product_type):
-    # Mock function to return YouTube URLs based on product type
-    # In a real application, this would be stored in the product database
-    guides = {
-        "reverse_osmosis": "https://www.youtube.com/watch?v=_w-hpBq_Cbo",
-        "under_sink": "https://www.youtube.com/watch?v=NDMXLYEv0jU",
-        "countertop": "https://www.youtube.com/watch?v=t90RQMKMv3s",
-        "pitcher": "https://www.youtube.com/watch?v=ja0ioX6GSz0",
-        "portable": "https://www.youtube.com/watch?v=t-c9WjUxLg8",
-        "shower": "https://www.youtube.com/watch?v=OaG2RyDxQlk",
-        "whole_house": "https://www.youtube.com/watch?v=5DTMfz-MP-k"
-    }
-    return guides.get(product_type, "https://www.youtube.com/results?search_query=water+filter+installation")
+def requirements_changes(previous, current):
+    """The fields of previous that differ in current (None where previous lacked the field)."""
+    return {key: previous.get(key) for key in previous.keys() | current.keys() if previous.get(key) != current.get(key)}
+
+def handle_requirements(response):
+    """Reads the requirements from a finished reply and records them in session state."""
+    requirements = extract_requirements(response)
+    if requirements:
+        # Store what refining changed, rather than a second copy of the requirements
+        if st.session_state.context["refinement_stage"] and st.session_state.user_requirements:
+            st.session_state.context["previous_requirements"] = requirements_changes(st.session_state.user_requirements, requirements)
+        
+        # Update current requirements
+        st.session_state.user_requirements = requirements
+    return requirements
+
+def store_recommendation(recommendation):
+    """Keeps the latest ranked products for the refinement buttons and sidebar, as product ids."""
+    st.session_state.recommendations = compact_rows(recommendation.products, catalogue)
 
 def update_user_profile(new_data):
     """Updates the user profile in session state."""
@@ -80,17 +116,22 @@ def ask_location():
     location = st.text_input("Where do you live (City, Country)?", key="location_input")
     return ownership, location
 
-# Display chat history
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Display chat history: the latest page, older pages on request
+history = st.session_state.history
+if history.has_older():
+    st.button("Load older messages", on_click=history.load_older)
+elif history.dropped:
+    st.caption(f"{history.dropped} earlier messages were removed to keep this conversation small.")
+for message in history.visible():
+    with st.chat_message(message.role):
+        st.markdown(history.render(message, catalogue))
 
 # Initial message if conversation is empty
-if not st.session_state.messages:
+if not st.session_state.history:
     with st.chat_message("assistant"):
         welcome_message = "Hello! I'm your water filter shopping assistant. I'll help you find the perfect water filtration solution for your needs. How can I assist you today?"
         st.markdown(welcome_message)
-    st.session_state.messages.append({"role": "assistant", "content": welcome_message})
+    st.session_state.history.add("assistant", welcome_message)
 
 # --- LOCATION AND PROFILE COLLECTION ---
 if not st.session_state.location_asked:
@@ -100,15 +141,20 @@ if not st.session_state.location_asked:
             update_user_profile({"location": location, "ownership": ownership})
             st.session_state.location_asked = True
             st.markdown("Thanks! Knowing your location helps me personalize recommendations.")
-            st.session_state.messages.append({"role": "assistant", "content": "Thanks! Knowing your location helps me personalize recommendations."})
+            st.session_state.history.add("assistant", "Thanks! Knowing your location helps me personalize recommendations.")
             st.rerun()  # <--- Use st.rerun() instead of st.experimental_rerun()
         else:
             st.markdown("First, could you tell me if you own your home live and where it is located?")
-            st.session_state.messages.append({"role": "assistant", "content": "First, could you tell me if you own your home and where it is located?"})
+            st.session_state.history.add("assistant", "First, could you tell me if you own your home and where it is located?")
             st.stop() # Stop execution until the user provides the data
 
-# Refinement section - show only after recommendations have been made
-if st.session_state.recommendations is not None:
+# Refinement section - show only after recommendations have been made.
+# The buttons add their message in an on_click callback, before the rerun, so a click costs one run of the app.
+def add_refinement(message):
+    st.session_state.history.add("user", message)
+    st.session_state.context["refinement_stage"] = True
+
+def refinement_section():
     st.markdown("---")
     st.markdown("### Refine Your Requirements")
     st.markdown("Would you like to adjust your requirements based on any of these scenarios?")
@@ -116,104 +162,58 @@ if st.session_state.recommendations is not None:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("Installation constraints"):
-            message = "I'm a tenant and cannot drill holes or make permanent modifications. What options would work for me with these limitations?"
-            st.session_state.messages.append({"role": "user", "content": message})
-            st.session_state.context["refinement_stage"] = True
-            st.rerun()
+        st.button("Installation constraints", on_click=add_refinement,
+                  args=("I'm a tenant and cannot drill holes or make permanent modifications. What options would work for me with these limitations?",))
     
     with col2:
-        if st.button("Water hardness concerns"):
-            message = "My water is very hard with lots of limescale. Which of these filters would help with this issue?"
-            st.session_state.messages.append({"role": "user", "content": message})
-            st.session_state.context["refinement_stage"] = True
-            st.rerun()
+        st.button("Water hardness concerns", on_click=add_refinement,
+                  args=("My water is very hard with lots of limescale. Which of these filters would help with this issue?",))
     
     with col3:
-        if st.button("Health priorities"):
-            message = "I'm actually more concerned about potential bacteria and lead in my water. Could you adjust the recommendations?"
-            st.session_state.messages.append({"role": "user", "content": message})
-            st.session_state.context["refinement_stage"] = True
-            st.rerun()
+        st.button("Health priorities", on_click=add_refinement,
+                  args=("I'm actually more concerned about potential bacteria and lead in my water. Could you adjust the recommendations?",))
+
+if st.session_state.recommendations is not None:
+    refinement_section()
 
 # Chat input
 prompt = st.chat_input("Ask about water filters...")
 
 if prompt:
     # Display user message
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    st.session_state.history.add("user", prompt)
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Get response
-    with st.spinner("Thinking..."):
-        # Include user profile data in the prompt
-        augmented_prompt = f"{prompt}. My location is {st.session_state.user_profile.get('location', 'unknown')}, and I {'own' if st.session_state.user_profile.get('ownership') == 'Yes' else 'rent'} my home."
-        # Use mock Claude instead of the API
-        mock_response = get_mock_response(augmented_prompt)
-        
-        # Check if requirements are in the response
-        requirements = extract_requirements(mock_response)
-        if requirements:
-            # Store previous requirements if we're refining
-            if st.session_state.context["refinement_stage"]:
-                st.session_state.context["previous_requirements"] = st.session_state.user_requirements
-            
-            # Update current requirements
-            st.session_state.user_requirements = requirements
-            
-            # Search Alibaba
-            alibaba_results_df = alibaba_search(requirements)
-
-            # Combine product dataframes
-            all_products_df = pd.concat([products_df, alibaba_results_df], ignore_index=True)
-
-
-            # Match products with requirements
-            matched_products = match_products(all_products_df, requirements)
-            st.session_state.recommendations = matched_products
-            
-            # Generate comparison table for top 3 alternatives
-            comparison_table = format_comparison_table(matched_products, top_n=3)
-            
-            # Add product recommendations to response
-            mock_response += "\n\n### Recommended Products\n\n"
-            mock_response += comparison_table
-            
-            # Add detailed specs for top recommendation
-            if not matched_products.empty:
-                top_product = matched_products.iloc[0]
-                mock_response += f"\n\n### Top Recommendation: {top_product['name']}\n\n"
-                mock_response += f"* Price: £{top_product['price_gbp']}\n"
-                mock_response += f"* Type: {top_product['type'].replace('_', ' ').title()}\n"
-                mock_response += f"* Installation: {top_product['installation'].replace('_', ' ').title()}\n"
-                mock_response += f"* Capacity: {top_product['capacity_liters']} liters\n"
-                mock_response += f"* Filtration: {top_product['filtration_type'].replace('_', ' ').title()}\n"
-                mock_response += f"* Remineralization: {'Yes' if top_product['remineralization'] == 'yes' else 'No'}\n"
-                mock_response += f"* Removes Chlorine: {'Yes' if top_product['removes_chlorine'] == 'yes' else 'Partially' if top_product['removes_chlorine'] == 'partial' else 'No'}\n"
-                mock_response += f"* Removes Lead: {'Yes' if top_product['removes_lead'] == 'yes' else 'Partially' if top_product['removes_lead'] == 'partial' else 'No'}\n"
-                mock_response += f"* Removes Fluoride: {'Yes' if top_product['removes_fluoride'] == 'yes' else 'Partially' if top_product['removes_fluoride'] == 'partial' else 'No'}\n"
-                mock_response += f"* Removes Bacteria: {'Yes' if top_product['removes_bacteria'] == 'yes' else 'Partially' if top_product['removes_bacteria'] == 'partial' else 'No'}\n"
-                mock_response += f"* Filter Lifespan: {top_product['filter_lifespan_months']} months\n"
-                mock_response += f"* Annual Maintenance Cost: £{top_product['maintenance_cost_yearly_gbp']}\n"
-                mock_response += f"* Warranty: {top_product['warranty_years']} years\n"
-                
-                # Add installation guide
-                installation_url = get_installation_guide(top_product['type'])
-                mock_response += f"\n\n### Installation Guide\n\n"
-                mock_response += f"[Watch Installation Tutorial on YouTube]({installation_url})\n"
-                
-                # Add refinement prompt
-                mock_response += f"\n\n### Need To Refine Further?\n\n"
-                mock_response += "You can ask me more specific questions about these products or tell me if you have additional requirements or constraints."
+    # Include user profile data in the prompt
+    augmented_prompt = f"{prompt}. My location is {st.session_state.user_profile.get('location', 'unknown')}, and I {'own' if st.session_state.user_profile.get('ownership') == 'Yes' else 'rent'} my home."
     
-    # Display response
-    st.session_state.messages.append({"role": "assistant", "content": mock_response})
+    # Stream the response: model text first, then the catalogue table, then any Alibaba rows
+    reply_parts = []
     with st.chat_message("assistant"):
-        st.markdown(mock_response)
+        with tracer.turn("chat_turn") as turn:
+            st.write_stream(stream_reply(
+                recommendation_service,
+                llm_backend.stream_response(st.session_state.session_id, augmented_prompt),
+                catalogue=catalogue,
+                alibaba_timeout=async_fetcher.timeout + 5,
+                on_recommendation=store_recommendation,
+                extract=handle_requirements,
+                state=st.session_state.ranking_state,
+                on_part=lambda template, value: reply_parts.append((template, value)),
+            ))
+    st.session_state.last_trace = turn
+    st.session_state.history.add_reply(reply_parts, catalogue)
 
-# Sidebar with current requirements
-with st.sidebar:
+    # Search Alibaba as soon as the installation types are known, so the final turn need not wait for it
+    recommendation_service.prefetch_alibaba(
+        llm_backend.known_requirements(st.session_state.session_id),
+        st.session_state.ranking_state,
+    )
+
+# Sidebar regions are fragments: their widgets rerun only their own region, not the chat history
+@st.fragment
+def current_requirements():
     st.header("Current Requirements")
     if st.session_state.user_requirements:
         req = st.session_state.user_requirements
@@ -228,18 +228,21 @@ with st.sidebar:
         st.write(f"**Priorities:** {', '.join([p.title() for p in req.get('priorities', ['Not specified'])])}")
         
         # Show previous requirements if we're in refinement stage
-        if st.session_state.context["previous_requirements"]:
+        if st.session_state.context["previous_requirements"] is not None:
             st.markdown("---")
             st.header("Previous Requirements")
-            prev_req = st.session_state.context["previous_requirements"]
+            prev_req = {**req, **st.session_state.context["previous_requirements"]}
+            prev_req = {key: value for key, value in prev_req.items() if value is not None}
             st.write(f"**Installation:** {', '.join([i.replace('_', ' ').title() for i in prev_req.get('installation', ['Not specified'])])}")
             st.write(f"**Max Price:** £{prev_req.get('max_price', 'Not specified')}")
             # Add other fields as needed
         
         if st.button("Reset Conversation"):
-            st.session_state.messages = []
+            llm_backend.reset(st.session_state.session_id)
+            st.session_state.history = ChatHistory()
             st.session_state.user_requirements = {}
             st.session_state.recommendations = None
+            st.session_state.ranking_state = RankingState()
             st.session_state.context = {
                 "refinement_stage": False,
                 "previous_requirements": None
@@ -247,6 +250,62 @@ with st.sidebar:
             st.rerun()
     else:
         st.write("No requirements gathered yet. Chat with the assistant to get started!")
+
+@st.fragment
+def compare_alternatives():
+    compare_count = st.slider("Number of alternatives to compare", min_value=2, max_value=MAX_COMPARE_COUNT, value=3)
+    
+    # Rendered tables are memoized, so moving the slider only renders new row sets.
+    # The session keeps product ids; the rows are taken from the shared catalogue.
+    if st.session_state.recommendations is not None and len(st.session_state.recommendations):
+        with st.expander("Compare alternatives"):
+            recommendations = st.session_state.recommendations.products(recommendation_service.catalogue())
+            st.markdown(format_comparison_table(recommendations, top_n=compare_count))
+            if len(recommendations) >= 2:
+                st.markdown(get_detailed_comparison(recommendations.iloc[0], recommendations.iloc[1]))
+
+@st.fragment
+def latency_panel():
+    # Stage timings of the last turn and percentiles across this server's turns
+    if st.checkbox("Show latency debug panel", value=False):
+        if not tracer.enabled:
+            st.caption("Tracing is off (TRACING=0).")
+        else:
+            last_trace = st.session_state.get("last_trace")
+            if last_trace is not None:
+                st.markdown(f"**Last turn:** {last_trace.duration * 1000:.1f} ms")
+                st.markdown("\n".join(f"- {stage}: {seconds * 1000:.1f} ms" for stage, seconds in last_trace.spans))
+            stats = tracer.summary()
+            if stats:
+                st.dataframe([
+                    {
+                        "Stage": stage,
+                        "Count": stage_stats["count"],
+                        "p50 (ms)": round(stage_stats["p50"] * 1000, 1),
+                        "p95 (ms)": round(stage_stats["p95"] * 1000, 1),
+                        "p99 (ms)": round(stage_stats["p99"] * 1000, 1),
+                    }
+                    for stage, stage_stats in stats.items()
+                ], hide_index=True)
+            else:
+                st.caption("No turns traced yet.")
+
+@st.fragment
+def memory_panel():
+    # What this session holds; the catalogue and services every session shares are left out
+    if st.checkbox("Show session memory", value=False):
+        shared = catalogue_objects(recommendation_service.catalogue()) + [recommendation_service, llm_backend]
+        report = session_report(st.session_state.to_dict(), shared)
+        st.dataframe([{"State": key, "KB": round(size / 1024, 1)} for key, size in report.items()], hide_index=True)
+
+@st.fragment
+def amazon_search():
+    # In a real app, these would trigger actual Amazon product searches
+    if st.checkbox("Search Amazon directly", value=False):
+        st.warning("Amazon direct search requires API integration (currently simulated)")
+
+with st.sidebar:
+    current_requirements()
     
     # Add information about the project
     st.markdown("---")
@@ -272,8 +331,7 @@ with st.sidebar:
     # Add advanced options
     st.markdown("---")
     st.header("Advanced Options")
-    compare_count = st.slider("Number of alternatives to compare", min_value=2, max_value=10, value=3)
-    
-    # In a real app, these would trigger actual Amazon product searches
-    if st.checkbox("Search Amazon directly", value=False):
-        st.warning("Amazon direct search requires API integration (currently simulated)")
+    compare_alternatives()
+    latency_panel()
+    memory_panel()
+    amazon_search()
@@ -0,0 +1,89 @@
+"""
+Compare ranking many requirement profiles one match_products call at a
+time with the batch matcher.
+
+A profile whose installation is a lone string, as profile files may
+write it, must rank like the same profile with a list.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_matcher
+"""
+import io
+import json
+import random
+import sys
+import time
+
+from benchmarks.synthetic import INSTALLATIONS, synthetic_catalogue
+from utils.batch_matcher import rank_batch, stream_batch
+from utils.product_index import build_product_index
+from utils.product_matcher import match_products
+
+PRIORITIES = ['health', 'eco', 'price', 'maintenance']
+FLAGS = ['remove_chlorine', 'remove_lead', 'remove_fluoride', 'remove_bacteria', 'eco_friendly', 'remineralization']
+
+# (catalogue rows, profiles)
+CASES = [(1_000, 100_000), (10_000, 100_000), (100_000, 20_000)]
+
+# match_products calls timed per case; the per-profile time is extrapolated
+SAMPLE_PROFILES = 500
+
+
+def random_profiles(n_profiles, seed=0):
+    """
+    Requirement profiles as the assistant produces them, with budgets in whole pounds
+    """
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(n_profiles):
+        profile = {
+            'installation': rng.sample(INSTALLATIONS, rng.randint(1, 2)),
+            'max_price': rng.randrange(20, 600),
+            'priorities': rng.sample(PRIORITIES, rng.randint(1, 3)),
+        }
+        for flag in FLAGS:
+            profile[flag] = rng.random() < 0.3
+        profiles.append(profile)
+    return profiles
+
+
+def check_string_installation(index, top_k=10):
+    """
+    Exit unless the CLI ranks {"installation": "<type>"} like {"installation": ["<type>"]}
+    """
+    for installation in INSTALLATIONS:
+        lines = [json.dumps({'installation': installation}), json.dumps({'installation': [installation]})]
+        output = io.StringIO()
+        stream_batch(lines, output, index, top_k=top_k)
+        as_string, as_list = [json.loads(line)['products'] for line in output.getvalue().splitlines()]
+        if not as_list or as_string != as_list:
+            sys.exit(f"installation {installation!r} as a string ranks {len(as_string)} products, "
+                     f"as a list {len(as_list)}")
+
+
+def main(cases=CASES, top_k=10):
+    check_string_installation(build_product_index(synthetic_catalogue(1_000)), top_k)
+    print(f"{'rows':>8} {'profiles':>9} {'loop (profiles/min)':>20} {'batch (profiles/min)':>21} {'speedup':>8}")
+    for n_rows, n_profiles in cases:
+        products_df = synthetic_catalogue(n_rows)
+        index = build_product_index(products_df)
+        profiles = random_profiles(n_profiles)
+
+        sample = profiles[:SAMPLE_PROFILES]
+        start = time.perf_counter()
+        expected = [match_products(products_df, profile, index=index, top_k=top_k) for profile in sample]
+        loop_rate = len(sample) / (time.perf_counter() - start) * 60
+
+        start = time.perf_counter()
+        results = rank_batch(index, profiles, top_k)
+        batch_rate = n_profiles / (time.perf_counter() - start) * 60
+
+        for frame, (positions, _) in zip(expected, results):
+            if frame['product_id'].tolist() != products_df['product_id'].to_numpy()[positions].tolist():
+                sys.exit(f"Ranking mismatch at {n_rows} rows")
+
+        print(f"{n_rows:>8} {n_profiles:>9} {loop_rate:>20,.0f} {batch_rate:>21,.0f} {batch_rate / loop_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
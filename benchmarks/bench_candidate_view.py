@@ -0,0 +1,96 @@
+"""
+Compare ranking the catalogue with a few Alibaba rows by concatenating the
+two (as recommend() did) with the multi-source CandidateView: time per turn
+and the peak memory a turn allocates, per catalogue size. Before timing,
+an Alibaba row is compared against a catalogue row from both rankings, as
+the app's "Compare alternatives" does, and the markdown must match.
+
+Run from the repository root:
+    python -m benchmarks.bench_candidate_view
+"""
+import contextlib
+import io
+import sys
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.bench_extraction import load_fixtures
+from benchmarks.bench_product_index import REQUIREMENTS, best_of
+from benchmarks.synthetic import realistic_catalogue
+from utils.alibaba_scraper import extract_offers, offers_to_products
+from utils.candidate_view import CandidateView
+from utils.product_index import build_product_index
+from utils.product_matcher import format_comparison_table, get_detailed_comparison, match_products
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+TOP_K = 10
+
+
+def peak_allocated(func):
+    """
+    Peak bytes allocated while func runs, above what was allocated before
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - start
+
+
+def comparisons(products):
+    """
+    Markdown of the comparison table and of the detailed comparison of the
+    best Alibaba row against the best catalogue row, both ways round
+    """
+    alibaba = products['is_alibaba'].eq(True)
+    pair = [products[alibaba].iloc[0], products[~alibaba].iloc[0]]
+    return [format_comparison_table(products), get_detailed_comparison(*pair), get_detailed_comparison(*pair[::-1])]
+
+
+def check_comparisons(alibaba_rows, n_rows=SIZES[0]):
+    """
+    Exit if comparing an Alibaba row with a catalogue row renders differently
+    (or fails) when ranked by the CandidateView rather than concatenated
+    """
+    products_df = realistic_catalogue(n_rows)
+    top_k = n_rows + len(alibaba_rows)
+    concatenated = match_products(pd.concat([products_df, alibaba_rows], ignore_index=True), REQUIREMENTS, top_k=top_k)
+    view = CandidateView(build_product_index(products_df), [alibaba_rows]).match(REQUIREMENTS, top_k)
+    if comparisons(concatenated) != comparisons(view):
+        sys.exit("Comparison mismatch between an Alibaba row and a catalogue row")
+
+
+def main(sizes=SIZES):
+    offers = extract_offers(next(iter(load_fixtures().values())), 100)
+    with contextlib.redirect_stdout(io.StringIO()):
+        alibaba_rows = offers_to_products(offers, REQUIREMENTS)
+    check_comparisons(alibaba_rows)
+
+    print(f"{'rows':>10} {'concat (ms)':>12} {'view (ms)':>10} {'concat peak (MB)':>17} {'view peak (MB)':>15}")
+    for n_rows in sizes:
+        products_df = realistic_catalogue(n_rows)
+        index = build_product_index(products_df)
+        repeat = 20 if n_rows <= 100_000 else 5
+
+        def concatenated():
+            all_products_df = pd.concat([products_df, alibaba_rows], ignore_index=True)
+            return match_products(all_products_df, REQUIREMENTS, top_k=TOP_K)
+
+        def view():
+            return CandidateView(index, [alibaba_rows]).match(REQUIREMENTS, TOP_K)
+
+        if concatenated()['name'].tolist() != view()['name'].tolist():
+            sys.exit(f"Ranking mismatch at {n_rows} rows")
+
+        concat_time = best_of(concatenated, repeat)
+        view_time = best_of(view, repeat)
+        print(f"{n_rows:>10} {concat_time * 1000:>12.2f} {view_time * 1000:>10.2f} "
+              f"{peak_allocated(concatenated) / 1e6:>17.1f} {peak_allocated(view) / 1e6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
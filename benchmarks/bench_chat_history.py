@@ -0,0 +1,130 @@
+"""
+Rerun cost and session memory of the chat history as a conversation grows.
+
+Scripted conversations (the load test's) are sent through the chat
+pipeline, and each turn is stored twice: as the app kept it before, a list
+of fully rendered markdown messages drawn on every rerun, and in a
+ChatHistory. At each history length the chat area of the app is rerun with
+AppTest from both stores, and the stored bytes are compared.
+
+Run from the repository root:
+    python -m benchmarks.bench_chat_history
+"""
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import time
+
+from benchmarks.load_test import _NoAlibaba, _requirements, scripted_dialogue
+from utils.catalogue import CatalogueStore
+from utils.chat_history import ChatHistory
+from utils.incremental_ranking import RankingState
+from utils.llm_backend import MockBackend
+from utils.mock_claude import ConversationEngine
+from utils.recommendation_service import RecommendationService
+from utils.response_stream import stream_reply
+
+TURNS = [10, 100, 500, 2000]
+
+REPEAT = 10
+
+# The chat area of app.py before and after ChatHistory
+LIST_SCRIPT = """
+import streamlit as st
+for message in st.session_state.messages:
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+"""
+
+HISTORY_SCRIPT = """
+import streamlit as st
+history = st.session_state.history
+if history.has_older():
+    st.button("Load older messages", on_click=history.load_older)
+elif history.dropped:
+    st.caption(f"{history.dropped} earlier messages were removed to keep this conversation small.")
+for message in history.visible():
+    with st.chat_message(message.role):
+        st.markdown(history.render(message, st.session_state.catalogue))
+"""
+
+
+def conversation(service, turns, seed=0):
+    """
+    Yield (user input, rendered reply, reply parts) for turns scripted turns, conversation after conversation
+    """
+    rng = random.Random(seed)
+    backend = MockBackend(ConversationEngine())
+    catalogue = service.catalogue()
+    sent = 0
+    while True:
+        state = RankingState()
+        for _, user_input in scripted_dialogue(rng):
+            if sent == turns:
+                return
+            parts = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                reply = "".join(stream_reply(service, backend.stream_response("bench", user_input), catalogue=catalogue,
+                                             extract=_requirements, state=state,
+                                             on_part=lambda template, value: parts.append((template, value))))
+            sent += 1
+            yield user_input, reply, parts
+        backend.reset("bench")
+
+
+def _utf8_size(messages):
+    return sum(len(message["content"].encode('utf-8')) for message in messages)
+
+
+def time_rerun(script, repeat, **session):
+    """
+    Median seconds of an AppTest run of script with the given session state
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_string(script, default_timeout=120)
+    for key, value in session.items():
+        at.session_state[key] = value
+    at.run()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time chat reruns and measure history size as a conversation grows")
+    parser.add_argument('--turns', default=",".join(map(str, TURNS)), help="Comma-separated history lengths")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    args = parser.parse_args(argv)
+    checkpoints = sorted(int(turns) for turns in args.turns.split(','))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = RecommendationService(CatalogueStore(), search=lambda requirements: _NoAlibaba())
+        catalogue = service.catalogue()
+    messages = []
+    history = ChatHistory()
+
+    print(f"{'turns':>6} {'list (KB)':>10} {'history (KB)':>13} {'compacted':>10} {'dropped':>8} "
+          f"{'list rerun (ms)':>16} {'history rerun (ms)':>19}")
+    turns = 0
+    for user_input, reply, parts in conversation(service, checkpoints[-1]):
+        messages += [{"role": "user", "content": user_input}, {"role": "assistant", "content": reply}]
+        history.add("user", user_input)
+        history.add_reply(parts, catalogue)
+        turns += 1
+        if turns not in checkpoints:
+            continue
+        list_time = time_rerun(LIST_SCRIPT, args.repeat, messages=messages)
+        history_time = time_rerun(HISTORY_SCRIPT, args.repeat, history=history, catalogue=catalogue)
+        stats = history.stats()
+        print(f"{turns:>6} {_utf8_size(messages) / 1024:>10.1f} {stats['bytes'] / 1024:>13.1f} "
+              f"{stats['compacted']:>10} {stats['dropped']:>8} {list_time * 1000:>16.1f} {history_time * 1000:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
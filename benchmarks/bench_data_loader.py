@@ -0,0 +1,83 @@
+"""
+Compare load_product_data across catalogue formats: CSV, Parquet, Feather
+and the memory-mapped column store, loading all columns and only the
+columns the app uses. First, a CSV with a blank cell in each integer
+column must still load every row, the blanks as NaN.
+
+Run from the repository root:
+    python -m benchmarks.bench_data_loader
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from benchmarks.bench_product_index import best_of
+from benchmarks.synthetic import synthetic_catalogue
+from utils.column_store import write_column_store
+from utils.data_loader import DISPLAY_COLUMNS, PRODUCT_DTYPES, load_product_data
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+def write_formats(products_df, directory):
+    """
+    Write one catalogue in every format; returns {format: path}
+    """
+    paths = {
+        'csv': os.path.join(directory, 'products.csv'),
+        'column store': os.path.join(directory, 'products.columns'),
+    }
+    products_df.to_csv(paths['csv'], index=False)
+    products_df = load_product_data(paths['csv'])
+    write_column_store(products_df, paths['column store'])
+    try:
+        paths['parquet'] = os.path.join(directory, 'products.parquet')
+        products_df.to_parquet(paths['parquet'], index=False)
+        paths['feather'] = os.path.join(directory, 'products.feather')
+        products_df.to_feather(paths['feather'])
+    except ImportError:
+        # Parquet and Feather need pyarrow
+        paths.pop('parquet', None)
+        paths.pop('feather', None)
+    return paths
+
+
+def check_blank_cells(directory):
+    """
+    Exit unless a CSV with one blank cell in each integer column loads in full
+    """
+    products_df = synthetic_catalogue(100).astype(PRODUCT_DTYPES)
+    integer_columns = [column for column, dtype in PRODUCT_DTYPES.items() if dtype == 'int64']
+    for row, column in enumerate(integer_columns):
+        products_df[column] = products_df[column].astype('float64')
+        products_df.loc[row, column] = None
+    path = os.path.join(directory, 'blanks.csv')
+    products_df.to_csv(path, index=False)
+
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        loaded = load_product_data(path)
+    if len(loaded) != len(products_df):
+        sys.exit(f"A CSV with blank integer cells loaded {len(loaded)} of {len(products_df)} rows: {output.getvalue()}")
+    blank = [column for row, column in enumerate(integer_columns) if not loaded[column].isna()[row]]
+    if blank:
+        sys.exit(f"Blank cells did not load as missing values in: {', '.join(blank)}")
+
+
+def main(sizes=SIZES):
+    with tempfile.TemporaryDirectory() as directory:
+        check_blank_cells(directory)
+    print(f"{'rows':>10} {'format':>13} {'all columns (ms)':>17} {'app columns (ms)':>17}")
+    for n_rows in sizes:
+        products_df = synthetic_catalogue(n_rows).astype(PRODUCT_DTYPES)
+        repeat = 5 if n_rows <= 100_000 else 3
+        with tempfile.TemporaryDirectory() as directory:
+            for name, path in write_formats(products_df, directory).items():
+                all_time = best_of(lambda: load_product_data(path), repeat)
+                app_time = best_of(lambda: load_product_data(path, columns=DISPLAY_COLUMNS), repeat)
+                print(f"{n_rows:>10} {name:>13} {all_time * 1000:>17.1f} {app_time * 1000:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
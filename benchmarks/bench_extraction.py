@@ -0,0 +1,66 @@
+"""
+Compare the Alibaba HTML extraction backends on saved search pages.
+
+Every installed backend must extract exactly the same offers as the
+BeautifulSoup reference backend, and extract_offers must fall back to the
+next backend when one fails. Run from the repository root:
+    python -m benchmarks.bench_extraction
+"""
+import contextlib
+import io
+import os
+import sys
+from unittest import mock
+
+from benchmarks.bench_product_index import best_of
+from utils.offer_extractors import EXTRACTORS, available_backends, extract_offers
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+MAX_RESULTS = [5, 100]
+
+
+def load_fixtures():
+    fixtures = {}
+    for file_name in sorted(os.listdir(FIXTURES_DIR)):
+        if file_name.startswith('alibaba_search') and file_name.endswith('.html'):
+            with open(os.path.join(FIXTURES_DIR, file_name), encoding='utf-8') as f:
+                fixtures[file_name] = f.read()
+    return fixtures
+
+
+def _failing(html, max_results):
+    raise ValueError("parser failed")
+
+
+def check_fallback(html, max_results=100):
+    """
+    Exit unless extract_offers gets the reference offers when every backend
+    but BeautifulSoup raises, or finds no listings
+    """
+    expected = EXTRACTORS['bs4'](html, max_results)
+    for broken in (_failing, lambda html, max_results: None, lambda html, max_results: []):
+        backends = {name: broken for name in available_backends() if name != 'bs4'}
+        with mock.patch.dict(EXTRACTORS, backends), contextlib.redirect_stdout(io.StringIO()):
+            offers = extract_offers(html, max_results)
+        if offers != expected:
+            sys.exit(f"extract_offers did not fall back to bs4 past {sorted(backends)}")
+
+
+def main():
+    backends = available_backends()
+    check_fallback(next(iter(load_fixtures().values())))
+    print(f"{'fixture':<32} {'max':>4} " + " ".join(f"{name + ' (ms)':>16}" for name in backends))
+    for file_name, html in load_fixtures().items():
+        for max_results in MAX_RESULTS:
+            expected = EXTRACTORS['bs4'](html, max_results)
+            timings = []
+            for name in backends:
+                offers = EXTRACTORS[name](html, max_results)
+                if offers != expected:
+                    sys.exit(f"{name} extracted different offers from {file_name} (max_results={max_results})")
+                timings.append(best_of(lambda: EXTRACTORS[name](html, max_results), 20))
+            print(f"{file_name:<32} {max_results:>4} " + " ".join(f"{t * 1000:>16.2f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Time refinement turns, where one requirement changes at a time, ranked from
+scratch (Alibaba rows rebuilt from the cached offers) and with a
+RankingState, which keeps the Alibaba rows and their index. Both rank the
+catalogue through the service's RecommendationCache, as the app does.
+
+Run from the repository root:
+    python -m benchmarks.bench_incremental
+"""
+import contextlib
+import io
+import sys
+import time
+
+from benchmarks.bench_extraction import load_fixtures
+from benchmarks.bench_product_index import REQUIREMENTS, best_of
+from benchmarks.synthetic import realistic_catalogue
+from utils.alibaba_scraper import extract_offers, offers_to_products
+from utils.catalogue import CatalogueSnapshot
+from utils.incremental_ranking import RankingState, uncapped
+from utils.recommendation_service import RecommendationService
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+# Each refinement changes one requirement of the turn before
+REFINEMENTS = [
+    ("max_price 200 -> 150", {"max_price": 150}),
+    ("priorities", {"priorities": ["health", "price"]}),
+    ("remove_lead off", {"remove_lead": False}),
+    ("eco_friendly on", {"eco_friendly": True}),
+]
+
+TOP_K = 10
+
+
+class _Catalogue:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get(self):
+        return self.snapshot
+
+
+def time_refinement(service, catalogue, previous, requirements, alibaba_rows, repeat):
+    """
+    Best time to re-rank for requirements from the state ranking previous left behind
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        state = RankingState()
+        state.rank(catalogue, previous, alibaba_rows, TOP_K, cache=service.cache)
+        start = time.perf_counter()
+        state.rank(catalogue, requirements, alibaba_rows, TOP_K, cache=service.cache)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes=SIZES):
+    offers = extract_offers(next(iter(load_fixtures().values())), 100)
+    print(f"{'rows':>10} {'refinement':<22} {'from scratch (ms)':>18} {'with state (ms)':>17} {'speedup':>8}")
+    for n_rows in sizes:
+        catalogue = CatalogueSnapshot(1, realistic_catalogue(n_rows), None, None)
+        service = RecommendationService(_Catalogue(catalogue))
+        repeat = 20 if n_rows <= 100_000 else 5
+
+        state = RankingState()
+        with contextlib.redirect_stdout(io.StringIO()):
+            alibaba_rows = offers_to_products(offers, uncapped(REQUIREMENTS))
+        service.recommend(REQUIREMENTS, alibaba_rows, catalogue=catalogue, top_k=TOP_K, state=state)
+
+        requirements = REQUIREMENTS
+        for name, change in REFINEMENTS:
+            previous, requirements = requirements, dict(requirements, **change)
+
+            def from_scratch():
+                # A stateless turn: parse the cached offers again, then rank everything
+                with contextlib.redirect_stdout(io.StringIO()):
+                    rows = offers_to_products(offers, requirements)
+                return service.recommend(requirements, rows, catalogue=catalogue, top_k=TOP_K)
+
+            expected = from_scratch().products['name'].tolist()
+            actual = service.recommend(requirements, alibaba_rows, catalogue=catalogue, top_k=TOP_K,
+                                       state=state).products['name'].tolist()
+            if expected != actual:
+                sys.exit(f"Ranking mismatch at {n_rows} rows after {name}")
+
+            scratch_time = best_of(from_scratch, repeat)
+            state_time = time_refinement(service, catalogue, previous, requirements, alibaba_rows, repeat)
+            print(f"{n_rows:>10} {name:<22} {scratch_time * 1000:>18.2f} {state_time * 1000:>17.2f} "
+                  f"{scratch_time / state_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare classifying product names one at a time (classify_name) with
+classify_names, on the names of the saved Alibaba pages repeated up to
+each batch size. classify_names is vectorized from VECTORIZED_MIN_NAMES
+names, so smaller batches show it matching the loop.
+
+Both must give the same attributes, and a few names whose classification
+once regressed must classify as expected. Run from the repository root:
+    python -m benchmarks.bench_name_classifier
+"""
+import sys
+
+import pandas as pd
+
+from benchmarks.bench_extraction import load_fixtures
+from benchmarks.bench_product_index import best_of
+from utils.name_classifier import OUTPUT_COLUMNS, VECTORIZED_MIN_NAMES, classify_name, classify_names
+from utils.offer_extractors import extract_offers
+
+SIZES = [10, 100, 1_000, 10_000, 100_000]
+
+# Names and the attributes they must get: stems match inside longer words,
+# short words ('ro', 'lead', 'house') only as whole words
+REGRESSION_CASES = [
+    ("Dechlorination Shower Filter", {'removes_chlorine': 'yes', 'installation': 'shower'}),
+    ("Defluoridation Water Purifier", {'removes_fluoride': 'yes'}),
+    ("Antibacterial Ceramic Pitcher", {'removes_bacteria': 'yes', 'filtration_type': 'ceramic'}),
+    ("Kitchen Sinks Carbon Filter", {'installation': 'under_sink'}),
+    ("Professional Carbon Filter", {'filtration_type': 'carbon', 'installation': 'countertop'}),
+    ("Household Jug Filter", {'installation': 'pitcher'}),
+    ("Leading Brand Water Bottle", {'removes_lead': 'partial', 'installation': 'portable'}),
+    ("RO Heavy Metals Purifier", {'removes_lead': 'yes', 'filtration_type': 'reverse_osmosis',
+                                  'installation': 'under_sink'}),
+]
+
+
+def check_regressions():
+    """
+    Exit if a regression case is misclassified by classify_name or by
+    classify_names, in a small batch and in one large enough to be vectorized
+    """
+    names = [name for name, _ in REGRESSION_CASES]
+    small = classify_names(names).to_dict('records')
+    large = classify_names(names * (VECTORIZED_MIN_NAMES // len(names) + 1)).to_dict('records')
+    for (name, expected), *results in zip(REGRESSION_CASES, small, large):
+        for result in [classify_name(name)] + results:
+            wrong = {column: result[column] for column, value in expected.items() if result[column] != value}
+            if wrong:
+                sys.exit(f"{name!r} classified as {wrong}, expected {expected}")
+
+
+def main(sizes=SIZES):
+    check_regressions()
+    names = [offer['name'] for html in load_fixtures().values() for offer in extract_offers(html, 100)]
+
+    print(f"{'names':>8} {'one at a time (ms)':>19} {'classify_names (ms)':>20} {'speedup':>8}")
+    for size in sizes:
+        batch = (names * (size // len(names) + 1))[:size]
+        expected = pd.DataFrame([classify_name(name) for name in batch], columns=OUTPUT_COLUMNS)
+        if classify_names(batch).to_dict('records') != expected.to_dict('records'):
+            sys.exit(f"classify_names differs from classify_name on {size} names")
+
+        repeat = 20 if size <= 1_000 else 3
+        single_time = best_of(lambda: [classify_name(name) for name in batch], repeat)
+        batch_time = best_of(lambda: classify_names(batch), repeat)
+        print(f"{size:>8} {single_time * 1000:>19.2f} {batch_time * 1000:>20.2f} {single_time / batch_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
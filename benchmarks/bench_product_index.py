@@ -0,0 +1,60 @@
+"""
+Compare match_products on the plain DataFrame path with the ProductIndex path.
+
+Run from the repository root:
+    python -m benchmarks.bench_product_index
+"""
+import sys
+import time
+
+from benchmarks.synthetic import synthetic_catalogue
+from utils.product_index import build_product_index
+from utils.product_matcher import match_products
+
+REQUIREMENTS = {
+    "installation": ["under_sink", "countertop"],
+    "max_price": 200,
+    "remove_chlorine": True,
+    "remove_lead": True,
+    "remove_fluoride": False,
+    "remove_bacteria": True,
+    "eco_friendly": False,
+    "remineralization": False,
+    "priorities": ["health", "maintenance"]
+}
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes=SIZES):
+    print(f"{'rows':>10} {'build (ms)':>12} {'dataframe (ms)':>15} {'index (ms)':>12} {'speedup':>8}")
+    for n_rows in sizes:
+        products_df = synthetic_catalogue(n_rows)
+        repeat = 20 if n_rows <= 100_000 else 5
+
+        start = time.perf_counter()
+        index = build_product_index(products_df)
+        build_time = time.perf_counter() - start
+
+        expected = match_products(products_df, REQUIREMENTS)
+        actual = match_products(products_df, REQUIREMENTS, index=index)
+        if not expected.equals(actual):
+            sys.exit(f"Ranking mismatch at {n_rows} rows")
+
+        df_time = best_of(lambda: match_products(products_df, REQUIREMENTS), repeat)
+        index_time = best_of(lambda: match_products(products_df, REQUIREMENTS, index=index), repeat)
+        print(f"{n_rows:>10} {build_time * 1000:>12.1f} {df_time * 1000:>15.2f} "
+              f"{index_time * 1000:>12.2f} {df_time / index_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Memory per user session, as the app kept it before and keeps it now.
+
+Sessions are the load test's scripted conversations, sent through the chat
+pipeline with Alibaba served by a local stub, followed by a refinement
+turn ranked with the session's RankingState, as the app ranks one. For
+each, the session state is built twice: before, with every reply's
+markdown, the recommendations as a DataFrame and the previous requirements
+as a full dict; now, with a ChatHistory, CompactRows and only the fields
+the refinement changed. Both hold the same RankingState. Memory is
+measured with utils.session_memory, the catalogue and service not counted.
+
+Run from the repository root:
+    python -m benchmarks.bench_session_memory
+    python -m benchmarks.bench_session_memory --rows 1000000 --sessions 100
+"""
+import argparse
+import contextlib
+import io
+import random
+import statistics
+
+from benchmarks.bench_extraction import load_fixtures
+from benchmarks.load_test import _requirements, scripted_dialogue
+from benchmarks.synthetic import realistic_catalogue
+from utils.alibaba_scraper import alibaba_search_async
+from utils.async_fetcher import async_fetcher
+from utils.catalogue import CatalogueSnapshot, CatalogueStore
+from utils.chat_history import ChatHistory
+from utils.compact_rows import compact_rows
+from utils.incremental_ranking import RankingState
+from utils.llm_backend import MockBackend
+from utils.mock_claude import ConversationEngine
+from utils.recommendation_service import RecommendationService
+from utils.response_stream import stream_reply
+from utils.session_memory import catalogue_objects, session_report
+from utils.stub_server import StubServer
+
+SESSIONS = 200
+
+# A refinement the sessions make after their recommendation: the user's message, the reply and the change
+REFINEMENT_MESSAGE = "Could you keep it under £150, with price first?"
+REFINEMENT_REPLY = "Here are the options under £150, cheapest first:\n\n"
+REFINEMENT = {"max_price": 150, "priorities": ["price", "health"]}
+
+
+class _Catalogue:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get(self):
+        return self.snapshot
+
+
+def build_sessions(service, backend, sessions, seed=0):
+    """
+    Session state of sessions scripted conversations, as (before, now) dict pairs
+    """
+    rng = random.Random(seed)
+    catalogue = service.catalogue()
+    for number in range(sessions):
+        session_id = f"session-{number}"
+        messages, history, ranking_state = [], ChatHistory(), RankingState()
+        recommended = []
+
+        def send(user_input, text, requirements=None):
+            parts = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                reply = "".join(stream_reply(service, text, requirements=requirements, catalogue=catalogue,
+                                             extract=_requirements, state=ranking_state,
+                                             on_recommendation=recommended.append,
+                                             on_part=lambda template, value: parts.append((template, value))))
+            messages.extend([{"role": "user", "content": user_input}, {"role": "assistant", "content": reply}])
+            history.add("user", user_input)
+            history.add_reply(parts, catalogue)
+
+        for _, user_input in scripted_dialogue(rng):
+            send(user_input, backend.stream_response(session_id, user_input))
+        backend.reset(session_id)
+        if not recommended:
+            continue
+
+        # The refinement is ranked from the state the recommendation left, like the app's next turn
+        requirements = recommended[-1].requirements
+        refined = dict(requirements, **REFINEMENT)
+        send(REFINEMENT_MESSAGE, REFINEMENT_REPLY, refined)
+        changed = {key: requirements.get(key) for key in requirements.keys() | refined.keys()
+                   if requirements.get(key) != refined.get(key)}
+        common = {"session_id": session_id, "ranking_state": ranking_state, "user_requirements": refined}
+        before = dict(common, messages=messages, recommendations=recommended[-1].products,
+                      context={"refinement_stage": True, "previous_requirements": dict(requirements)})
+        now = dict(common, history=history, recommendations=compact_rows(recommended[-1].products, catalogue),
+                   context={"refinement_stage": True, "previous_requirements": changed})
+        yield before, now
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-session memory of the app's session state")
+    parser.add_argument('--sessions', type=int, default=SESSIONS)
+    parser.add_argument('--rows', type=int, default=0, help="Synthetic catalogue rows (default: the bundled catalogue)")
+    args = parser.parse_args(argv)
+
+    server = StubServer({"/trade/search": (200, next(iter(load_fixtures().values())), 0)}).start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            store = _Catalogue(CatalogueSnapshot(1, realistic_catalogue(args.rows), None, None)) if args.rows \
+                else CatalogueStore()
+            base_url = server.url("/trade/search")
+            search = lambda requirements: alibaba_search_async(requirements, base_url=base_url)
+            service = RecommendationService(store, search=search)
+        shared = catalogue_objects(service.catalogue()) + [service]
+        reports = {'before': [], 'now': []}
+        for before, now in build_sessions(service, MockBackend(ConversationEngine()), args.sessions):
+            reports['before'].append(session_report(before, shared))
+            reports['now'].append(session_report(now, shared))
+    finally:
+        async_fetcher.close()
+        server.stop()
+
+    keys = list(dict.fromkeys(key for report in reports['before'] + reports['now'] for key in report))
+    keys.remove('total')
+    print(f"{len(reports['now'])} sessions, mean bytes per session")
+    print(f"{'state':<20} {'before':>10} {'now':>10}")
+    for key in keys + ['total']:
+        values = [statistics.fmean(report.get(key, 0) for report in reports[kind]) for kind in ('before', 'now')]
+        print(f"{key:<20} {values[0]:>10.0f} {values[1]:>10.0f}")
+    per_thousand = [statistics.fmean(report['total'] for report in reports[kind]) * 1000 / 2 ** 20
+                    for kind in ('before', 'now')]
+    print(f"1000 sessions: {per_thousand[0]:.1f} MB before, {per_thousand[1]:.1f} MB now")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare single-process top-K matching with ShardedMatcher on 1, 2, 4 and 8
+worker processes.
+
+Run from the repository root:
+    python -m benchmarks.bench_sharded_matcher
+"""
+import os
+import sys
+
+from benchmarks.bench_batch_matcher import random_profiles
+from benchmarks.bench_product_index import best_of
+from benchmarks.synthetic import synthetic_catalogue
+from utils.product_index import build_product_index
+from utils.product_matcher import match_products
+from utils.sharded_matcher import ShardedMatcher
+
+SIZES = [1_000_000, 4_000_000]
+WORKERS = [1, 2, 4, 8]
+TOP_K = 10
+
+# Requests timed per configuration; the same requirement profiles for all
+N_REQUESTS = 20
+
+
+def main(sizes=SIZES, workers_list=WORKERS):
+    print(f"CPUs available: {os.cpu_count()}")
+    print(f"{'rows':>10} {'workers':>8} {'ms/request':>11} {'speedup':>8}")
+    for n_rows in sizes:
+        products_df = synthetic_catalogue(n_rows)
+        index = build_product_index(products_df)
+        profiles = random_profiles(N_REQUESTS)
+        expected = [match_products(products_df, profile, index=index, top_k=TOP_K) for profile in profiles]
+
+        def single_process():
+            for profile in profiles:
+                match_products(products_df, profile, index=index, top_k=TOP_K)
+
+        baseline = best_of(single_process, 3) / N_REQUESTS
+        print(f"{n_rows:>10} {'-':>8} {baseline * 1000:>11.2f} {1:>7.1f}x")
+
+        for workers in workers_list:
+            with ShardedMatcher(index, workers=workers) as matcher:
+                for profile, frame in zip(profiles, expected):
+                    if not matcher.match(profile, TOP_K).equals(frame):
+                        sys.exit(f"Result mismatch at {n_rows} rows, {workers} workers")
+
+                def sharded():
+                    for profile in profiles:
+                        matcher.match(profile, TOP_K)
+
+                elapsed = best_of(sharded, 3) / N_REQUESTS
+            print(f"{n_rows:>10} {workers:>8} {elapsed * 1000:>11.2f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
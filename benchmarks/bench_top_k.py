@@ -0,0 +1,42 @@
+"""
+Compare full-sort ranking with top-K scoring in match_products.
+
+Run from the repository root:
+    python -m benchmarks.bench_top_k
+"""
+import numpy as np
+
+from benchmarks.bench_product_index import best_of
+from benchmarks.synthetic import synthetic_catalogue
+from utils.product_index import build_product_index
+from utils.product_matcher import match_products
+
+REQUIREMENTS = {
+    "installation": [],
+    "max_price": 500,
+    "remove_chlorine": True,
+    "priorities": ["health", "eco", "price", "maintenance"]
+}
+
+SIZES = [1_000, 100_000, 1_000_000]
+TOP_K = 10
+
+
+def main(sizes=SIZES):
+    print(f"{'rows':>10} {'full sort (ms)':>15} {'top-k (ms)':>12} {'speedup':>8}")
+    for n_rows in sizes:
+        products_df = synthetic_catalogue(n_rows)
+        index = build_product_index(products_df)
+        repeat = 20 if n_rows <= 100_000 else 5
+
+        full = match_products(products_df, REQUIREMENTS, index=index)
+        top = match_products(products_df, REQUIREMENTS, index=index, top_k=TOP_K)
+        assert np.allclose(full['match_score'].head(TOP_K), top['match_score'])
+
+        full_time = best_of(lambda: match_products(products_df, REQUIREMENTS, index=index).head(TOP_K), repeat)
+        top_time = best_of(lambda: match_products(products_df, REQUIREMENTS, index=index, top_k=TOP_K), repeat)
+        print(f"{n_rows:>10} {full_time * 1000:>15.2f} {top_time * 1000:>12.2f} {full_time / top_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
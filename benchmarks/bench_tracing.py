@@ -0,0 +1,81 @@
+"""
+Measure the overhead of the tracing layer on a chat turn over the shipped
+catalogue (mock LLM reply, catalogue match, rendering; no network), the
+smallest turn and so the worst case for relative overhead.
+
+Timing whole turns with tracing on and off is noisy at this scale, so the
+overhead is also derived from the cost of one span and the number of spans
+per turn.
+
+Run from the repository root:
+    python -m benchmarks.bench_tracing
+"""
+import time
+
+from benchmarks.bench_product_index import REQUIREMENTS, best_of
+from utils.catalogue import CatalogueStore
+from utils.llm_backend import MockBackend
+from utils.recommendation_service import RecommendationService
+from utils.response_stream import stream_reply
+from utils.tracing import Tracer, tracer
+
+TURNS = 200
+REPEAT = 15
+
+
+class _NoAlibaba:
+    """
+    A resolved search with no rows, so turns never touch the network
+    """
+    def done(self):
+        return True
+
+    def result(self, timeout=None):
+        return None
+
+
+def main(turns=TURNS, repeat=REPEAT):
+    service = RecommendationService(CatalogueStore(), search=lambda requirements: _NoAlibaba())
+    catalogue = service.catalogue()
+    backend = MockBackend()
+
+    def chat_turns():
+        for i in range(turns):
+            with tracer.turn("chat_turn"):
+                for _ in stream_reply(service, backend.stream_response(f"bench-{i}", "hi"), REQUIREMENTS,
+                                      catalogue=catalogue):
+                    pass
+            backend.reset(f"bench-{i}")
+
+    with tracer.turn("chat_turn") as turn:
+        for _ in stream_reply(service, backend.stream_response("bench", "hi"), REQUIREMENTS, catalogue=catalogue):
+            pass
+    backend.reset("bench")
+    spans_per_turn = len(turn.spans) + 1
+
+    timings = {}
+    for enabled in [False, True] * repeat:
+        tracer.enabled = enabled
+        elapsed = best_of(chat_turns, 1)
+        timings[enabled] = min(timings.get(enabled, float('inf')), elapsed)
+    tracer.enabled = True
+
+    off, on = timings[False] / turns, timings[True] / turns
+    print(f"turn, tracing off: {off * 1e6:8.1f} us")
+    print(f"turn, tracing on:  {on * 1e6:8.1f} us")
+    print(f"measured overhead: {(on - off) / off * 100:8.2f} %")
+
+    # Cost of one span on its own
+    spans = Tracer()
+    start = time.perf_counter()
+    for _ in range(100_000):
+        with spans.span("stage"):
+            pass
+    span_cost = (time.perf_counter() - start) / 100_000
+    print(f"one span:          {span_cost * 1e6:8.2f} us")
+    print(f"spans per turn:    {spans_per_turn:8d}")
+    print(f"derived overhead:  {spans_per_turn * span_cost / off * 100:8.2f} %")
+
+
+if __name__ == "__main__":
+    main()
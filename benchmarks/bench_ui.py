@@ -0,0 +1,205 @@
+"""
+Time the Streamlit script run each UI interaction triggers.
+
+The app is driven headless with streamlit.testing's AppTest through a chat
+that reaches a recommendation, then every interaction is repeated and timed:
+the comparison slider, the latency panel and Amazon checkboxes, a
+refinement button and a chat message. An interaction whose widget lives in
+an st.fragment reruns only that fragment, as in the browser; any other
+interaction reruns the whole script. AppTest itself always reruns the whole
+script, so fragment-scoped runs are requested from its script runner here.
+
+    python -m benchmarks.bench_ui                       # the current app.py
+    python -m benchmarks.bench_ui --before HEAD~1       # and app.py at an earlier commit
+
+Alibaba is served by a local stub and the chat by the mock LLM backend, so
+no run touches the internet.
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHAT = ["hi", "under the sink", "about £300", "chlorine and lead", "yes", "yes", "family of 4"]
+
+REPEAT = 20
+
+
+def _fragment_runner():
+    """
+    AppTest's script runner, able to rerun a single fragment. Runs share
+    one ScriptCache, as a server's do, so the app is compiled once.
+    """
+    from streamlit.runtime.scriptrunner import RerunData
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+    from streamlit.testing.v1.element_tree import parse_tree_from_messages
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas
+
+    class FragmentRunner(LocalScriptRunner):
+        fragment_id = None
+        # (element type, label) -> id of the fragment that drew it
+        widget_fragments = {}
+        script_cache = ScriptCache()
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._script_cache = FragmentRunner.script_cache
+
+        def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+            if FragmentRunner.fragment_id is None:
+                tree = super().run(widget_state, query_params, timeout, page_hash)
+            else:
+                # Replace the full run queued on construction with the fragment's
+                self._requests = ScriptRequests()
+                self.request_rerun(RerunData(widget_states=widget_state, page_script_hash=page_hash,
+                                             fragment_id_queue=[FragmentRunner.fragment_id],
+                                             is_fragment_scoped_rerun=True))
+                try:
+                    if not self._script_thread:
+                        self.start()
+                    require_widgets_deltas(self, timeout)
+                finally:
+                    self.join()
+                tree = parse_tree_from_messages(self.forward_msgs())
+
+            for msg in self.forward_msgs():
+                if msg.HasField('delta') and msg.delta.HasField('new_element'):
+                    element = msg.delta.new_element
+                    kind = element.WhichOneof('type')
+                    label = getattr(getattr(element, kind), 'label', None)
+                    if label is not None:
+                        FragmentRunner.widget_fragments[(kind, label)] = msg.delta.fragment_id or None
+            return tree
+
+    return FragmentRunner
+
+
+def _interactions():
+    """
+    (name, function(at) that changes a widget and returns it) per interaction; each call alternates the value
+    """
+    def slider(at):
+        widget = at.sidebar.slider[0]
+        return widget.set_value(5 if widget.value != 5 else 3)
+
+    def checkbox(label):
+        def toggle(at):
+            widget = next(box for box in at.sidebar.checkbox if box.label == label)
+            return widget.set_value(not widget.value)
+        return toggle
+
+    def refinement_button(at):
+        widget = next(button for button in at.button if button.label == "Water hardness concerns")
+        return widget.click()
+
+    def chat(at):
+        widget = at.chat_input[0]
+        widget.set_value("what about maintenance?")
+        return widget
+
+    return [
+        ("compare slider", slider),
+        ("latency panel checkbox", checkbox("Show latency debug panel")),
+        ("Amazon checkbox", checkbox("Search Amazon directly")),
+        ("refinement button", refinement_button),
+        ("chat message", chat),
+    ]
+
+
+def time_interactions(app_path, repeat=REPEAT):
+    """
+    Median seconds of the script run each interaction triggers
+
+    Returns:
+    dict: interaction -> (scope, seconds), scope 'fragment' or 'app'
+    """
+    from streamlit.testing.v1 import AppTest
+    from streamlit.testing.v1 import app_test as app_test_module
+
+    runner = _fragment_runner()
+    app_test_module.LocalScriptRunner = runner
+    at = AppTest.from_file(app_path, default_timeout=60).run()
+    at.selectbox(key="ownership_input").select("Yes")
+    at.text_input(key="location_input").input("London, UK").run()
+    for message in CHAT:
+        at.chat_input[0].set_value(message).run()
+
+    results = {}
+    for name, interact in _interactions():
+        timings = []
+        scope = 'app'
+        for _ in range(repeat):
+            widget = interact(at)
+            runner.fragment_id = runner.widget_fragments.get((widget.type, getattr(widget, 'label', None)))
+            scope = 'fragment' if runner.fragment_id else 'app'
+            start = time.perf_counter()
+            at.run()
+            timings.append(time.perf_counter() - start)
+            if runner.fragment_id:
+                # A fragment run's tree holds only the fragment; a full run restores the rest
+                runner.fragment_id = None
+                at.run()
+        results[name] = (scope, statistics.median(timings))
+    return results
+
+
+def _app_at(ref):
+    """
+    Write app.py as of a git ref next to the current one (so its imports resolve), returns its path
+    """
+    source = subprocess.run(['git', 'show', f'{ref}:app.py'], capture_output=True, check=True, cwd=ROOT).stdout
+    path = os.path.join(ROOT, f".bench_ui_app_{os.getpid()}.py")
+    with open(path, 'wb') as f:
+        f.write(source)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the script run of each Streamlit UI interaction")
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'), help="App script to time")
+    parser.add_argument('--before', default=None, help="Also time app.py at this git ref, for comparison")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    args = parser.parse_args(argv)
+
+    from benchmarks.bench_extraction import load_fixtures
+    from utils.stub_server import StubServer
+
+    server = StubServer({"/trade/search": (200, next(iter(load_fixtures().values())), 0)}).start()
+    os.environ["ALIBABA_SEARCH_URL"] = server.url("/trade/search")
+    # The scripted chat needs the mock conversation, even where ANTHROPIC_API_KEY is set
+    os.environ["LLM_BACKEND"] = "mock"
+    before_path = None
+    try:
+        # The app prints progress (e.g. Alibaba fallbacks); keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            after = time_interactions(args.app, args.repeat)
+            before = None
+            if args.before:
+                before_path = _app_at(args.before)
+                before = time_interactions(before_path, args.repeat)
+    finally:
+        if before_path:
+            os.remove(before_path)
+        server.stop()
+
+    if before is None:
+        print(f"{'interaction':<26} {'reruns':<9} {'script run (ms)':>16}")
+        for name, (scope, seconds) in after.items():
+            print(f"{name:<26} {scope:<9} {seconds * 1000:>16.1f}")
+        return
+    print(f"{'interaction':<26} {'before (' + args.before + ')':>24} {'after':>22} {'speedup':>8}")
+    for name, (scope, seconds) in after.items():
+        before_scope, before_seconds = before[name]
+        print(f"{name:<26} {before_scope:>9} {before_seconds * 1000:>10.1f} ms "
+              f"{scope:>9} {seconds * 1000:>8.1f} ms {before_seconds / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
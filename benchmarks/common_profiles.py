@@ -0,0 +1,72 @@
+"""
+Write the most common requirement profiles of scripted conversations, to
+precompute into the recommendation cache in load tests.
+
+Conversations are the load test's (random user phrases for every MockClaude
+question), so the profiles are synthetic: they say nothing about what real
+users ask for, and are only representative of the load test itself.
+Profiles that share a RecommendationCache entry are counted together; the
+output is JSONL in the batch_matcher input format, most common first,
+written to benchmarks/results/common_profiles.jsonl by default.
+
+    python -m benchmarks.common_profiles
+    python -m benchmarks.load_test --precompute benchmarks/results/common_profiles.jsonl
+"""
+import argparse
+import json
+import os
+import random
+from collections import Counter
+
+from benchmarks.load_test import scripted_dialogue
+from utils.mock_claude import ConversationEngine
+from utils.recommendation_cache import requirements_key
+from utils.recommendation_service import extract_requirements
+
+DIALOGUES = 20_000
+TOP = 500
+
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'common_profiles.jsonl')
+
+
+def common_profiles(dialogues=DIALOGUES, top=TOP, seed=0):
+    """
+    The top most common profiles of dialogues scripted conversations
+
+    Returns:
+    list: (count, requirements) pairs, most common first
+    """
+    rng = random.Random(seed)
+    engine = ConversationEngine()
+    counts = Counter()
+    examples = {}
+    for _ in range(dialogues):
+        for _, user_input in scripted_dialogue(rng):
+            requirements = extract_requirements(engine.get_response("profiles", user_input))
+        engine.reset("profiles")
+        key = requirements_key(requirements)
+        counts[key] += 1
+        examples.setdefault(key, requirements)
+    return [(count, examples[key]) for key, count in counts.most_common(top)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the most common requirement profiles as JSONL")
+    parser.add_argument('--dialogues', type=int, default=DIALOGUES, help="Scripted conversations to replay")
+    parser.add_argument('--top', type=int, default=TOP, help="Profiles to write")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default=OUTPUT_PATH, help="JSONL file to write")
+    args = parser.parse_args(argv)
+
+    profiles = common_profiles(args.dialogues, args.top, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for number, (count, requirements) in enumerate(profiles, 1):
+            f.write(json.dumps({'id': number, 'count': count, 'requirements': requirements}) + "\n")
+    covered = sum(count for count, _ in profiles)
+    print(f"Wrote {len(profiles)} profiles covering {covered / args.dialogues:.0%} of {args.dialogues} scripted conversations "
+          f"to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
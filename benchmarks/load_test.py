@@ -0,0 +1,262 @@
+"""
+Replay many concurrent scripted conversations through the full chat pipeline
+and report throughput and tail latency.
+
+Every dialogue walks the MockClaude states (greeting, installation, budget,
+contaminants, eco, remineralization, household) with randomly chosen user
+phrases. Each turn does what a chat turn in the app does: the reply is
+streamed through stream_reply, requirements are read from the last reply,
+and the catalogue is ranked and rendered, with a RankingState per
+conversation. As in the app, the Alibaba search is prefetched once the
+installation question is answered (--no-prefetch turns that off). Alibaba is
+served by a local stub server with the saved search page, so no turn touches
+the internet; --cold-search makes every conversation fetch it.
+
+    python -m benchmarks.load_test                                # shipped catalogue
+    python -m benchmarks.load_test --rows 1000000 --users 32      # a generated catalogue
+    python -m benchmarks.load_test --catalogue data/products_1m.columns --alibaba off -o load.json
+    python -m benchmarks.load_test --cold-search --think-time 0.1 --no-prefetch   # compare with prefetch
+    python -m benchmarks.load_test --rows 1000000 --alibaba off --precompute benchmarks/results/common_profiles.jsonl
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.bench_extraction import load_fixtures
+from benchmarks.synthetic import realistic_catalogue
+from utils.alibaba_scraper import alibaba_search_async
+from utils.async_fetcher import AsyncFetcher
+from utils.catalogue import CatalogueStore
+from utils.data_loader import write_product_data
+from utils.incremental_ranking import RankingState
+from utils.llm_backend import MockBackend
+from utils.mock_claude import ConversationEngine
+from utils.recommendation_cache import RecommendationCache, load_profiles
+from utils.recommendation_service import RecommendationService, extract_requirements
+from utils.response_stream import stream_reply
+from utils.search_cache import SearchCache
+from utils.stub_server import StubServer
+from utils.tracing import tracer
+
+# User phrases per conversation state, in the order MockClaude asks
+SCRIPT = [
+    ("greeting", ["hi", "hello", "I need a water filter"]),
+    ("installation", ["under the sink", "countertop please", "a pitcher or jug", "something portable for travel",
+                      "for the shower", "whole house", "in the kitchen", "not sure"]),
+    ("budget", ["about £100", "under 50 pounds", "$250", "something cheap", "mid range", "premium is fine", "400"]),
+    ("contaminants", ["chlorine", "lead and bacteria", "fluoride", "everything", "just the taste",
+                      "health and safety", "chlorine and lead"]),
+    ("eco", ["yes", "eco matters a lot", "no", "not really"]),
+    ("remineralization", ["yes", "minerals for taste", "no", "don't care"]),
+    ("household", ["just me", "a couple", "family of 4", "2", "5 people"]),
+]
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+USERS = 8
+DIALOGUES = 200
+
+
+def scripted_dialogue(rng):
+    """
+    One conversation: a user phrase for each MockClaude state
+    """
+    return [(state, rng.choice(phrases)) for state, phrases in SCRIPT]
+
+
+class _NoAlibaba:
+    """
+    A resolved search with no rows
+    """
+    def done(self):
+        return True
+
+    def result(self, timeout=None):
+        return None
+
+
+def _requirements(reply):
+    try:
+        return extract_requirements(reply)
+    except ValueError:
+        return None
+
+
+def run_dialogue(service, backend, session_id, dialogue, think_time=0.0, prefetch=True):
+    """
+    Send every turn of a dialogue through the pipeline, prefetching the
+    Alibaba search after each turn as the app does unless prefetch is False
+
+    Returns:
+    list: (kind, seconds) per turn, kind 'recommend' for the turn that ranks products and 'question' otherwise
+    """
+    timings = []
+    ranking_state = RankingState()
+    for state, user_input in dialogue:
+        start = time.perf_counter()
+        with tracer.turn("load_turn"):
+            recommended = []
+            for _ in stream_reply(service, backend.stream_response(session_id, user_input),
+                                  catalogue=service.catalogue(), extract=_requirements,
+                                  on_recommendation=recommended.append, state=ranking_state):
+                pass
+        timings.append(('recommend' if recommended else 'question', time.perf_counter() - start))
+        if prefetch:
+            service.prefetch_alibaba(backend.known_requirements(session_id), ranking_state)
+        if think_time:
+            time.sleep(think_time)
+    backend.reset(session_id)
+    return timings
+
+
+def percentiles(seconds):
+    if not seconds:
+        return {}
+    values = np.quantile(seconds, QUANTILES)
+    stats = {f"p{round(quantile * 100)}": float(value) for quantile, value in zip(QUANTILES, values)}
+    stats.update(count=len(seconds), mean=statistics.fmean(seconds), max=max(seconds))
+    return stats
+
+
+def run_load(service, users=USERS, dialogues=DIALOGUES, think_time=0.0, seed=0, prefetch=True):
+    """
+    Run dialogues scripted conversations, users of them at a time
+
+    Returns:
+    dict: Wall time, throughput, and latency per turn kind in seconds
+    """
+    rng = random.Random(seed)
+    scripts = [scripted_dialogue(rng) for _ in range(dialogues)]
+    backend = MockBackend(ConversationEngine(max_sessions=max(users * 2, 1000)))
+
+    timings = {'question': [], 'recommend': []}
+    lock = threading.Lock()
+
+    def worker(i):
+        turns = run_dialogue(service, backend, f"load-{i}", scripts[i], think_time, prefetch)
+        with lock:
+            for kind, seconds in turns:
+                timings[kind].append(seconds)
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=users) as executor:
+        for future in [executor.submit(worker, i) for i in range(dialogues)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    n_turns = sum(len(seconds) for seconds in timings.values())
+    return {
+        'users': users,
+        'dialogues': dialogues,
+        'prefetch': prefetch,
+        'turns': n_turns,
+        'seconds': elapsed,
+        'turns_per_second': n_turns / elapsed,
+        'dialogues_per_second': dialogues / elapsed,
+        'latency': {kind: percentiles(seconds) for kind, seconds in timings.items()},
+        'all_turns': percentiles(timings['question'] + timings['recommend']),
+    }
+
+
+def print_report(report, stages):
+    print(f"{report['dialogues']} dialogues, {report['turns']} turns, {report['users']} concurrent users "
+          f"in {report['seconds']:.2f} s, Alibaba prefetch {'on' if report['prefetch'] else 'off'}")
+    print(f"throughput: {report['turns_per_second']:.1f} turns/s, {report['dialogues_per_second']:.1f} dialogues/s")
+    print()
+    print(f"{'turn (ms)':<24} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    rows = dict(report['latency'], all=report['all_turns'])
+    for kind, stats in rows.items():
+        if stats:
+            print(f"{kind:<24} {stats['count']:>7} " + " ".join(
+                f"{stats[key] * 1000:>9.2f}" for key in ('mean', 'p50', 'p95', 'p99', 'max')))
+    cache = report.get('recommendation_cache')
+    if cache:
+        lookups = cache['hits'] + cache['misses']
+        print(f"recommendation cache: {cache['hits']} hits, {cache['misses']} misses "
+              f"({cache['hits'] / max(lookups, 1):.0%} hit rate), {cache['shallow']} shallow, "
+              f"{cache['precomputed']} precomputed, {cache['entries']} entries")
+    print()
+    print(f"{'stage (ms)':<24} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for stage, stats in stages.items():
+        print(f"{stage:<24} {stats['count']:>7} " + " ".join(
+            f"{stats[key] * 1000:>9.2f}" for key in ('p50', 'p95', 'p99')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay concurrent scripted conversations through the chat pipeline")
+    parser.add_argument('--catalogue', default=None, help="Catalogue file (default: the shipped one, or --rows)")
+    parser.add_argument('--rows', type=int, default=None, help="Generate a realistic catalogue with this many rows")
+    parser.add_argument('--users', type=int, default=USERS, help="Concurrent conversations")
+    parser.add_argument('--dialogues', type=int, default=DIALOGUES, help="Conversations in total")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Seconds a user waits between turns")
+    parser.add_argument('--alibaba', choices=['stub', 'off'], default='stub', help="Serve Alibaba from a local stub")
+    parser.add_argument('--alibaba-delay', type=float, default=0.2, help="Seconds the Alibaba stub takes to answer")
+    parser.add_argument('--no-prefetch', action='store_true', help="Search Alibaba only on the final turn")
+    parser.add_argument('--cold-search', action='store_true',
+                        help="Do not cache Alibaba pages, so every conversation waits for the stub")
+    parser.add_argument('--no-cache', action='store_true', help="Turn the recommendation cache off")
+    parser.add_argument('--precompute', default=None, help="JSONL profiles to rank into the cache before the run")
+    parser.add_argument('--shard-workers', type=int, default=0, help="Processes for sharded matching")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default=None, help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.catalogue
+        if args.rows:
+            start = time.perf_counter()
+            path = os.path.join(workdir, f"products_{args.rows}.columns")
+            write_product_data(realistic_catalogue(args.rows, seed=args.seed), path)
+            print(f"Generated {args.rows} products in {time.perf_counter() - start:.1f} s")
+
+        server = fetcher = None
+        if args.alibaba == 'stub':
+            html = next(iter(load_fixtures().values()))
+            server = StubServer({"/trade/search": (200, html, args.alibaba_delay)}).start()
+            fetcher = AsyncFetcher()
+            cache = SearchCache(ttl_seconds=0, stale_seconds=0) if args.cold_search else SearchCache()
+            base_url = server.url("/trade/search")
+            search = lambda requirements: alibaba_search_async(requirements, cache=cache, fetcher=fetcher,
+                                                               base_url=base_url)
+        else:
+            search = lambda requirements: _NoAlibaba()
+
+        try:
+            recommendation_cache = RecommendationCache(max_entries=0) if args.no_cache else RecommendationCache()
+            service = RecommendationService(CatalogueStore(path), search=search, shard_workers=args.shard_workers,
+                                            cache=recommendation_cache)
+            if args.precompute:
+                service.precompute(load_profiles(args.precompute))
+            tracer.reset()
+            # Searches with no matching offers print a note each time; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = run_load(service, args.users, args.dialogues, args.think_time, args.seed,
+                                  prefetch=not args.no_prefetch)
+            if not args.no_cache:
+                report['recommendation_cache'] = service.cache.stats()
+        finally:
+            if fetcher is not None:
+                fetcher.close()
+            if server is not None:
+                server.stop()
+
+    stages = tracer.summary()
+    print_report(report, stages)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict(report, stages=stages), f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Offline benchmark suite for the recommendation pipeline.
+
+Every case runs against synthetic catalogues or saved fixtures, never the
+network, and the timings are written to a JSON results file. Comparing a
+results file with an earlier one flags regressions:
+
+    python -m benchmarks.suite                                   # all cases, 10 to 1M rows
+    python -m benchmarks.suite --sizes 10,1000 --only match      # a quick subset
+    python -m benchmarks.suite --compare benchmarks/results/baseline.json
+
+Cases (asv style: a name, parameters, and the timed call):
+    load_product_data         csv / column store / parquet, per catalogue size
+    match_products            every combination of priorities, per catalogue size
+    format_comparison_table   top 3 / top 10, with and without the render cache
+    get_detailed_comparison   with and without the render cache
+    fallback_products         a few requirement sets
+    extract_offers            each saved Alibaba page, each installed parser
+    offers_to_products        each saved Alibaba page
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_extraction import load_fixtures
+from benchmarks.synthetic import synthetic_catalogue
+from utils.alibaba_scraper import extract_offers, fallback_products, offers_to_products
+from utils.column_store import write_column_store
+from utils.data_loader import load_product_data
+from utils.offer_extractors import available_backends
+from utils.product_index import build_product_index
+from utils.product_matcher import format_comparison_table, get_detailed_comparison, match_products
+from utils.rendering import render_cache
+from utils.scoring import PRIORITY_FEATURES
+
+SIZES = [10, 1_000, 100_000, 1_000_000]
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+REQUIREMENTS = {
+    "installation": ["under_sink", "countertop"],
+    "max_price": 300,
+    "remove_chlorine": True,
+    "remove_lead": True,
+    "remove_fluoride": False,
+    "remove_bacteria": False,
+    "eco_friendly": False,
+    "remineralization": False,
+}
+
+FALLBACK_REQUIREMENTS = {
+    'any': {},
+    'countertop_under_100': {'installation': ['countertop'], 'max_price': 100},
+    'under_sink_lead': {'installation': ['under_sink', 'whole_house'], 'remove_lead': 'yes', 'max_price': 400},
+}
+
+# Median slowdown against a baseline that counts as a regression
+REGRESSION_THRESHOLD = 1.25
+
+# Each case is run at least MIN_RUNS times and until MIN_TIME seconds have passed
+MIN_RUNS = 3
+MAX_RUNS = 1000
+MIN_TIME = 0.2
+
+_catalogues = {}
+
+
+def catalogue(n_rows):
+    if n_rows not in _catalogues:
+        _catalogues[n_rows] = synthetic_catalogue(n_rows)
+    return _catalogues[n_rows]
+
+
+def priority_combinations():
+    """
+    Every subset of PRIORITY_FEATURES, from none to all four
+    """
+    for size in range(len(PRIORITY_FEATURES) + 1):
+        yield from itertools.combinations(PRIORITY_FEATURES, size)
+
+
+def load_product_data_cases(sizes, workdir):
+    formats = ['csv', 'columns']
+    try:
+        import pyarrow  # noqa: F401
+        formats.append('parquet')
+    except ImportError:
+        pass
+
+    for n_rows in sizes:
+        products_df = catalogue(n_rows)
+        paths = {'csv': os.path.join(workdir, f"products_{n_rows}.csv")}
+        products_df.to_csv(paths['csv'], index=False)
+        paths['columns'] = os.path.join(workdir, f"products_{n_rows}.columns")
+        write_column_store(products_df, paths['columns'])
+        if 'parquet' in formats:
+            paths['parquet'] = os.path.join(workdir, f"products_{n_rows}.parquet")
+            products_df.to_parquet(paths['parquet'], index=False)
+        for data_format in formats:
+            yield {'rows': n_rows, 'format': data_format}, lambda path=paths[data_format]: load_product_data(path)
+
+
+def match_products_cases(sizes, workdir):
+    for n_rows in sizes:
+        products_df = catalogue(n_rows)
+        index = build_product_index(products_df)
+        for priorities in priority_combinations():
+            requirements = dict(REQUIREMENTS, priorities=list(priorities))
+            params = {'rows': n_rows, 'priorities': "+".join(priorities) or "none"}
+            yield params, lambda requirements=requirements: match_products(
+                products_df, requirements, index=index, top_k=10
+            )
+
+
+def _top_products():
+    products_df = catalogue(1_000)
+    return match_products(products_df, dict(REQUIREMENTS, priorities=['health']), top_k=10)
+
+
+def _uncached(render):
+    render_cache.clear()
+    return render()
+
+
+def format_comparison_table_cases(sizes, workdir):
+    top_products = _top_products()
+    for top_n, cached in itertools.product([3, 10], [False, True]):
+        render = lambda top_n=top_n: format_comparison_table(top_products, top_n=top_n)
+        yield {'top_n': top_n, 'cached': cached}, render if cached else (lambda render=render: _uncached(render))
+
+
+def get_detailed_comparison_cases(sizes, workdir):
+    top_products = _top_products()
+    product1, product2 = top_products.iloc[0], top_products.iloc[1]
+    render = lambda: get_detailed_comparison(product1, product2)
+    yield {'cached': False}, lambda: _uncached(render)
+    yield {'cached': True}, render
+
+
+def fallback_products_cases(sizes, workdir):
+    for name, requirements in FALLBACK_REQUIREMENTS.items():
+        yield {'requirements': name}, lambda requirements=requirements: fallback_products(requirements)
+
+
+def extract_offers_cases(sizes, workdir):
+    for file_name, html in load_fixtures().items():
+        for backend in available_backends():
+            yield {'fixture': file_name, 'backend': backend}, \
+                lambda html=html, backend=backend: extract_offers(html, 100, backend=backend)
+
+
+def offers_to_products_cases(sizes, workdir):
+    for file_name, html in load_fixtures().items():
+        offers = extract_offers(html, 100)
+        yield {'fixture': file_name}, lambda offers=offers: offers_to_products(offers, REQUIREMENTS)
+
+
+BENCHMARKS = {
+    'load_product_data': load_product_data_cases,
+    'match_products': match_products_cases,
+    'format_comparison_table': format_comparison_table_cases,
+    'get_detailed_comparison': get_detailed_comparison_cases,
+    'fallback_products': fallback_products_cases,
+    'extract_offers': extract_offers_cases,
+    'offers_to_products': offers_to_products_cases,
+}
+
+
+def measure(func, min_runs=MIN_RUNS, max_runs=MAX_RUNS, min_time=MIN_TIME):
+    """
+    Time func after one warm-up call
+
+    Returns:
+    list[float]: Seconds per call
+    """
+    func()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or (len(timings) < max_runs and time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def run_suite(sizes=SIZES, only=None, log=sys.stdout):
+    """
+    Run the benchmark cases whose name contains one of only (all when None)
+
+    Returns:
+    dict: Environment and one result per case, timings in seconds
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, cases in BENCHMARKS.items():
+            if only and not any(part in name for part in only):
+                continue
+            for params, func in cases(sizes, workdir):
+                # Some code paths print progress; keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    timings = measure(func)
+                result = {
+                    'name': name,
+                    'params': params,
+                    'runs': len(timings),
+                    'min': min(timings),
+                    'median': statistics.median(timings),
+                    'mean': statistics.fmean(timings),
+                    'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+                }
+                results.append(result)
+                print(f"{case_id(result):<70} {result['median'] * 1000:>10.3f} ms  ({result['runs']} runs)", file=log)
+    return {'environment': environment(), 'results': results}
+
+
+def case_id(result):
+    return result['name'] + "[" + ",".join(f"{key}={value}" for key, value in result['params'].items()) + "]"
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Cases whose median got slower than threshold times the baseline's
+
+    Returns:
+    list: (case id, baseline median, current median) for each regression
+    """
+    baseline_medians = {case_id(result): result['median'] for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = baseline_medians.get(case_id(result))
+        if before and result['median'] > before * threshold:
+            regressions.append((case_id(result), before, result['median']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark suite; writes a JSON results file")
+    parser.add_argument('--sizes', default=",".join(str(size) for size in SIZES), help="Catalogue sizes in rows")
+    parser.add_argument('--only', default=None, help="Comma-separated substrings of the benchmark names to run")
+    parser.add_argument('-o', '--output', default=None, help="Results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument('--compare', default=None, help="Earlier results file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Median slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    only = [part for part in args.only.split(",") if part] if args.only else None
+    report = run_suite(sizes, only)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({after / before:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Synthetic product catalogues with the columns of data/products.csv.
+
+synthetic_catalogue draws every column independently and uniformly, for
+micro-benchmarks. realistic_catalogue follows the shape of the real
+catalogue: prices, capacities, lifespans and filtration media depend on the
+product type, and what a filter removes depends on its media. To write one
+to disk for load tests or the app:
+
+    python -m benchmarks.synthetic 1000000 -o data/products_1m.columns
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+INSTALLATIONS = ['under_sink', 'countertop', 'portable', 'shower', 'whole_house']
+TYPES = ['reverse_osmosis', 'pitcher', 'countertop', 'portable', 'under_sink', 'shower', 'whole_house']
+FILTRATION_TYPES = ['RO', 'carbon', 'multi-stage', 'UV-carbon', 'KDF-carbon', 'ceramic-carbon', 'RO-UV', 'carbon-ion']
+CAPABILITY_VALUES = ['yes', 'partial', 'no']
+
+
+def synthetic_catalogue(n_rows, seed=0):
+    """
+    Generate a random product catalogue with the same columns as data/products.csv
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'product_id': np.arange(1, n_rows + 1),
+        'name': [f"Synthetic Filter {i}" for i in range(1, n_rows + 1)],
+        'type': rng.choice(TYPES, n_rows),
+        'price_gbp': np.round(rng.uniform(10, 600, n_rows), 2),
+        'installation': rng.choice(INSTALLATIONS, n_rows),
+        'capacity_liters': np.round(rng.uniform(0.5, 500, n_rows), 1),
+        'filtration_type': rng.choice(FILTRATION_TYPES, n_rows),
+        'remineralization': rng.choice(['yes', 'no'], n_rows),
+        'removes_chlorine': rng.choice(CAPABILITY_VALUES, n_rows, p=[0.7, 0.2, 0.1]),
+        'removes_lead': rng.choice(CAPABILITY_VALUES, n_rows),
+        'removes_fluoride': rng.choice(CAPABILITY_VALUES, n_rows),
+        'removes_bacteria': rng.choice(CAPABILITY_VALUES, n_rows),
+        'ecofriendly_rating': rng.integers(1, 6, n_rows),
+        'maintenance_cost_yearly_gbp': rng.integers(10, 150, n_rows),
+        'filter_lifespan_months': rng.choice([1, 2, 3, 4, 6, 12], n_rows),
+        'dimensions_cm': '30x20x40',
+        'weight_kg': np.round(rng.uniform(0.3, 25, n_rows), 1),
+        'warranty_years': rng.choice([1, 2, 3, 5], n_rows),
+        'amazon_url': 'https://amazon.co.uk/synthetic',
+    })
+
+
+# Share of each product type in a large catalogue
+TYPE_SHARES = {
+    'pitcher': 0.22, 'countertop': 0.18, 'under_sink': 0.16, 'reverse_osmosis': 0.12,
+    'portable': 0.14, 'shower': 0.12, 'whole_house': 0.06,
+}
+
+# Per type: installation, median price (GBP), capacity range (liters, None for
+# flow-through), filtration media with their shares, filter lifespans in months,
+# eco rating mean, weight range (kg), name suffix
+TYPE_PROFILES = {
+    'pitcher': ('countertop', 30, (1.5, 3.5), {'carbon': 0.7, 'carbon-ion': 0.3}, [1, 2, 3], 4.3, (0.8, 1.8), "Jug"),
+    'countertop': ('countertop', 120, (4, 12), {'multi-stage': 0.4, 'UV-carbon': 0.2, 'ceramic-carbon': 0.25, 'carbon': 0.15},
+                   [3, 4, 6], 3.8, (2, 5), "Countertop"),
+    'under_sink': ('under_sink', 150, (40, 90), {'carbon': 0.45, 'multi-stage': 0.55}, [6, 12], 3.5, (4, 10), "Under-Sink"),
+    'reverse_osmosis': ('under_sink', 280, (75, 150), {'RO': 0.7, 'RO-UV': 0.3}, [6, 12], 2.6, (10, 16), "RO System"),
+    'portable': ('portable', 25, (0.4, 1), {'carbon': 0.8, 'ceramic-carbon': 0.2}, [1, 2, 3], 4.7, (0.2, 0.6), "Bottle"),
+    'shower': ('shower', 40, None, {'KDF-carbon': 0.7, 'carbon': 0.3}, [3, 6], 4.6, (0.4, 1), "Shower Filter"),
+    'whole_house': ('whole_house', 550, (300, 800), {'multi-stage': 0.8, 'carbon': 0.2}, [12], 2.3, (18, 35), "Whole House"),
+}
+
+# Chance of yes / partial / no per filtration media, for chlorine, lead, fluoride and bacteria
+REMOVAL_PROFILES = {
+    'RO': [(0.98, 0.02, 0), (0.95, 0.05, 0), (0.9, 0.1, 0), (0.9, 0.1, 0)],
+    'RO-UV': [(1, 0, 0), (0.97, 0.03, 0), (0.92, 0.08, 0), (1, 0, 0)],
+    'carbon': [(0.95, 0.05, 0), (0.1, 0.5, 0.4), (0, 0.05, 0.95), (0, 0.1, 0.9)],
+    'carbon-ion': [(0.95, 0.05, 0), (0.3, 0.5, 0.2), (0, 0.1, 0.9), (0, 0.05, 0.95)],
+    'multi-stage': [(1, 0, 0), (0.8, 0.2, 0), (0.2, 0.6, 0.2), (0.5, 0.4, 0.1)],
+    'UV-carbon': [(0.95, 0.05, 0), (0.5, 0.4, 0.1), (0, 0.1, 0.9), (0.98, 0.02, 0)],
+    'ceramic-carbon': [(0.9, 0.1, 0), (0.3, 0.6, 0.1), (0.1, 0.5, 0.4), (0.9, 0.1, 0)],
+    'KDF-carbon': [(0.95, 0.05, 0), (0.2, 0.6, 0.2), (0, 0, 1), (0, 0.2, 0.8)],
+}
+REMOVAL_COLUMNS = ['removes_chlorine', 'removes_lead', 'removes_fluoride', 'removes_bacteria']
+
+# Chance that a filter with this media adds minerals back
+REMINERALIZATION_SHARES = {'RO': 0.6, 'RO-UV': 0.6, 'multi-stage': 0.45, 'carbon-ion': 0.3}
+
+BRANDS = [
+    'AquaPure', 'ClearStream', 'PureFlow', 'HydroMax', 'PureDrop', 'AquaFresh', 'CleanWater', 'PureStream',
+    'EcoFilter', 'AquaLife', 'MiniPure', 'HydroPlus', 'UltraPure', 'EcoDrink', 'PureHome', 'BluePeak',
+    'CrystalSpring', 'NordAqua', 'ThamesClear', 'Highland',
+]
+SERIES = ['', 'Pro', 'Plus', 'Max', 'Lite', 'Eco', 'Ultra', 'Compact', 'Elite', 'Classic']
+
+
+def _draw(rng, shares, n):
+    return rng.choice(list(shares), n, p=np.array(list(shares.values())) / sum(shares.values()))
+
+
+def realistic_catalogue(n_rows, seed=0):
+    """
+    Generate a catalogue with the columns of data/products.csv and
+    type-dependent distributions (see TYPE_PROFILES and REMOVAL_PROFILES)
+    """
+    rng = np.random.default_rng(seed)
+    types = _draw(rng, TYPE_SHARES, n_rows)
+
+    installation = np.empty(n_rows, dtype=object)
+    price = np.empty(n_rows)
+    capacity = np.full(n_rows, np.nan)
+    filtration = np.empty(n_rows, dtype=object)
+    lifespan = np.empty(n_rows, dtype=np.int64)
+    eco_rating = np.empty(n_rows)
+    weight = np.empty(n_rows)
+    suffix = np.empty(n_rows, dtype=object)
+    for product_type, profile in TYPE_PROFILES.items():
+        rows = np.flatnonzero(types == product_type)
+        n = len(rows)
+        type_installation, median_price, capacity_range, media, lifespans, eco_mean, weight_range, name = profile
+        installation[rows] = type_installation
+        # Prices are right-skewed around the type's median and end in .99
+        price[rows] = np.maximum(np.round(median_price * rng.lognormal(0, 0.35, n)), 5) - 0.01
+        if capacity_range is not None:
+            capacity[rows] = np.round(rng.uniform(*capacity_range, n), 1)
+        filtration[rows] = _draw(rng, media, n)
+        lifespan[rows] = rng.choice(lifespans, n)
+        eco_rating[rows] = rng.normal(eco_mean, 0.7, n)
+        weight[rows] = np.round(rng.uniform(*weight_range, n), 1)
+        suffix[rows] = name
+
+    removals = {column: np.empty(n_rows, dtype=object) for column in REMOVAL_COLUMNS}
+    remineralization = np.full(n_rows, 'no', dtype=object)
+    for media, profile in REMOVAL_PROFILES.items():
+        rows = np.flatnonzero(filtration == media)
+        for column, shares in zip(REMOVAL_COLUMNS, profile):
+            removals[column][rows] = rng.choice(CAPABILITY_VALUES, len(rows), p=shares)
+        share = REMINERALIZATION_SHARES.get(media, 0.05)
+        remineralization[rows[rng.random(len(rows)) < share]] = 'yes'
+
+    # A replacement cartridge costs 10-30% of the unit
+    cartridge = price * rng.uniform(0.1, 0.3, n_rows)
+    maintenance = np.maximum(np.round(cartridge * 12 / lifespan / 5) * 5, 5).astype(np.int64)
+    warranty = np.where(price >= 250, rng.choice([3, 5], n_rows), np.where(price >= 80, rng.choice([1, 2, 3], n_rows), 1))
+
+    product_ids = np.arange(1, n_rows + 1)
+    brands = rng.choice(BRANDS, n_rows)
+    series = rng.choice(SERIES, n_rows)
+    models = rng.integers(100, 1000, n_rows)
+    names = [
+        f"{brand} {model_series + ' ' if model_series else ''}{name} {model}"
+        for brand, model_series, name, model in zip(brands.tolist(), series.tolist(), suffix.tolist(), models.tolist())
+    ]
+    dimensions = [
+        f"{width}x{depth}x{height}"
+        for width, depth, height in zip(*(rng.integers(low, high, n_rows).tolist() for low, high in [(10, 60), (5, 40), (8, 90)]))
+    ]
+
+    return pd.DataFrame({
+        'product_id': product_ids,
+        'name': names,
+        'type': types,
+        'price_gbp': price,
+        'installation': installation,
+        'capacity_liters': capacity,
+        'filtration_type': filtration,
+        'remineralization': remineralization,
+        **removals,
+        'ecofriendly_rating': np.clip(np.round(eco_rating), 1, 5).astype(np.int64),
+        'maintenance_cost_yearly_gbp': maintenance,
+        'filter_lifespan_months': lifespan,
+        'dimensions_cm': dimensions,
+        'weight_kg': weight,
+        'warranty_years': warranty,
+        'amazon_url': [f"https://amazon.co.uk/dp/B{product_id:09d}" for product_id in product_ids.tolist()],
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a realistic synthetic product catalogue")
+    parser.add_argument('rows', type=int, help="Number of products")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Output file (.csv, .parquet, .feather) or column store directory")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from utils.data_loader import write_product_data
+
+    start = time.perf_counter()
+    products_df = realistic_catalogue(args.rows, seed=args.seed)
+    write_product_data(products_df, args.output)
+    print(f"Wrote {len(products_df)} products to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,42 @@
 # utils/alibaba_scraper.py
+import os
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
-import re
 import time
 import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from fake_useragent import UserAgent
+from utils import offer_extractors
+from utils.async_fetcher import async_fetcher
+from utils.name_classifier import classify_names
+from utils.search_cache import search_cache, normalize_search_url
+from utils.tracing import current_turn, tracer
 
-def alibaba_search(requirements, max_results=5):
+# Search endpoint; override (e.g. with a local stub server) for testing
+ALIBABA_SEARCH_URL = os.environ.get("ALIBABA_SEARCH_URL", "https://www.alibaba.com/trade/search")
+
+# Shared HTTP session so connections are kept alive between searches
+http_session = requests.Session()
+
+# Pages fetched asynchronously are parsed here, off the fetcher's event loop
+# thread, so a slow parse does not hold up the other pooled requests
+parse_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="alibaba-parse")
+
+_user_agent_source = None
+_user_agent_lock = threading.Lock()
+
+def random_user_agent():
     """
-    Searches Alibaba for water filters based on the given requirements,
-    filtering for delivery to the UK. Uses requests instead of Selenium.
+    Returns a random browser user agent. The UserAgent database is loaded
+    once per process.
     """
-    # Create a user agent to mimic a browser
+    global _user_agent_source
     try:
-        ua = UserAgent()
-        user_agent = ua.random
+        with _user_agent_lock:
+            if _user_agent_source is None:
+                _user_agent_source = UserAgent()
+        return _user_agent_source.random
     except:
         # Fallback if fake_useragent fails
         user_agents = [
@@ -23,170 +44,216 @@ def alibaba_search(requirements, max_results=5):
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36'
         ]
-        user_agent = random.choice(user_agents)
-    
-    # Construct search term based on requirements
-    search_term = "water filter"  # Base search term
-    if "installation" in requirements and requirements["installation"]:
-        search_term += " " + " ".join(requirements["installation"]).replace("_", " ")
-    
-    # Construct Alibaba search URL
-    base_url = "https://www.alibaba.com/trade/search"
-    url = f"{base_url}?fsb=y&IndexArea=product_en&keywords={search_term.replace(' ', '+')}&country=GB"
-    
-    # Set up headers to mimic a browser request
-    headers = {
-        'User-Agent': user_agent,
+        return random.choice(user_agents)
+
+def browser_headers():
+    """
+    Headers that mimic a browser request
+    """
+    return {
+        'User-Agent': random_user_agent(),
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.5',
         'Referer': 'https://www.alibaba.com/',
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1',
     }
+
+def build_search_url(requirements, base_url=None):
+    """
+    Builds the Alibaba search URL for the given requirements. Only the
+    installation types affect the search term.
+    """
+    # Construct search term based on requirements
+    search_term = "water filter"  # Base search term
+    if "installation" in requirements and requirements["installation"]:
+        # Sorted so that the same set of installation types gives the same URL
+        search_term += " " + " ".join(sorted(set(requirements["installation"]))).replace("_", " ")
+    
+    # Construct Alibaba search URL
+    base_url = base_url or ALIBABA_SEARCH_URL
+    return f"{base_url}?fsb=y&IndexArea=product_en&keywords={search_term.replace(' ', '+')}&country=GB"
+
+def alibaba_search(requirements, max_results=5, cache=search_cache):
+    """
+    Searches Alibaba for water filters based on the given requirements,
+    filtering for delivery to the UK. Uses requests instead of Selenium.
+    
+    Raw offers are cached by normalized search URL, so requests that only
+    differ in other requirements (e.g. max_price) reuse the same fetch and
+    are filtered locally.
+    """
+    url = build_search_url(requirements)
+    cache_key = f"{normalize_search_url(url)}#{max_results}"
+    
+    offers = cache.get_or_fetch(cache_key, lambda: fetch_offers(url, max_results))
+    if offers is None:
+        return fallback_products(requirements)
+    
+    return offers_to_products(offers, requirements)
+
+def alibaba_search_async(requirements, max_results=5, cache=search_cache, fetcher=async_fetcher, base_url=None):
+    """
+    Non-blocking version of alibaba_search. Returns a concurrent.futures.Future
+    that resolves to the same DataFrame alibaba_search would return.
+    
+    Cached offers resolve the future immediately; otherwise the page is
+    fetched on the shared async fetcher's connection pool and parsed on
+    parse_pool when it arrives. Fetch errors and timeouts resolve to
+    fallback_products.
+    base_url overrides ALIBABA_SEARCH_URL, e.g. for a local stub server.
+    """
+    url = build_search_url(requirements, base_url)
+    cache_key = f"{normalize_search_url(url)}#{max_results}"
+    result = Future()
+    
+    offers = cache.get(cache_key, refresh=lambda: fetch_offers(url, max_results))
+    if offers is not None:
+        with tracer.span("alibaba.parse"):
+            result.set_result(offers_to_products(offers, requirements))
+        return result
+    
+    # The response is handled on other threads, so its spans are recorded against this turn explicitly
+    turn = current_turn()
+    requested_at = tracer.clock()
     
+    def on_response(response_future):
+        # Runs on the fetcher's event loop thread: hand the parse over
+        tracer.record("alibaba.network", tracer.clock() - requested_at, turn)
+        parse_pool.submit(parse_response, response_future)
+    
+    def parse_response(response_future):
+        parse_start = tracer.clock()
+        try:
+            status_code, html = response_future.result()
+            if status_code != 200:
+                print(f"Failed to retrieve page, status code: {status_code}")
+                offers = None
+            else:
+                offers = extract_offers(html, max_results)
+            if offers is None:
+                result.set_result(fallback_products(requirements))
+                return
+            cache.put(cache_key, offers)
+            result.set_result(offers_to_products(offers, requirements))
+        except Exception as e:
+            print(f"Exception in alibaba_search: {e!r}")
+            result.set_result(fallback_products(requirements))
+        finally:
+            tracer.record("alibaba.parse", tracer.clock() - parse_start, turn)
+    
+    fetcher.fetch(url, headers=browser_headers()).add_done_callback(on_response)
+    return result
+
+def fetch_offers(url, max_results=5):
+    """
+    Downloads an Alibaba search page and extracts the raw offers
+    (name, url, price_usd). Returns None if the page could not be used.
+    """
     try:
         # Make the request
-        response = requests.get(url, headers=headers, timeout=10)
+        with tracer.span("alibaba.network"):
+            response = http_session.get(url, headers=browser_headers(), timeout=10)
         
         if response.status_code != 200:
             print(f"Failed to retrieve page, status code: {response.status_code}")
-            return fallback_products(requirements)
+            return None
         
-        # Parse the page content
-        soup = BeautifulSoup(response.text, 'html.parser')
+        with tracer.span("alibaba.parse"):
+            return extract_offers(response.text, max_results)
         
-        # Find product listings
-        product_divs = soup.find_all('div', class_='organic-list-offer-outter')
-        
-        if not product_divs:
-            product_divs = soup.find_all('div', class_='J-offer-wrapper')
-        
-        if not product_divs:
-            print("No product divs found, falling back to mock data")
-            return fallback_products(requirements)
+    except Exception as e:
+        print(f"Exception in alibaba_search: {e}")
+        return None
+
+def extract_offers(html, max_results=5, backend=None):
+    """
+    Extracts up to max_results raw offers from an Alibaba search results page.
+    Returns None if no product listings were found.
+    
+    backend selects the HTML parser (see utils.offer_extractors); by default
+    the fastest installed one is used, with BeautifulSoup as the fallback.
+    """
+    offers = offer_extractors.extract_offers(html, max_results, backend=backend)
+    
+    if offers is None:
+        print("No product divs found, falling back to mock data")
+    return offers
+
+def offers_to_products(offers, requirements):
+    """
+    Turns raw offers into product rows matching the products.csv schema,
+    inferring capabilities from the product name, and applies the
+    installation and max_price filters.
+    """
+    # Infer filter capabilities, filter type and installation from the names in one batch
+    inferred_attributes = classify_names([offer['name'] for offer in offers]).to_dict('records')
+    
+    products = []
+    for offer, inferred in zip(offers, inferred_attributes):
+        try:
+            product_name = offer['name']
+            product_url = offer['url']
+            min_price = offer['price_usd']
             
-        products = []
-        for div in product_divs[:max_results]:
-            try:
-                # Try to extract product details
-                product_name_element = div.find('h2', class_='organic-list-offer__heading') or div.find('p', class_='elements-title-normal__content')
-                if not product_name_element:
-                    continue
-                    
-                product_name = product_name_element.text.strip()
-                
-                # Try to find the product URL
-                url_element = div.find('a', class_='organic-list-offer__img-wrap') or div.find('a', class_='elements-title-normal')
-                product_url = "https:" + url_element['href'] if url_element and 'href' in url_element.attrs else "https://www.alibaba.com"
-                
-                # Try to extract price
-                price_element = div.find('span', class_='elements-offer-price-normal__price') or div.find('div', class_='price')
-                if price_element:
-                    price_text = price_element.text.strip()
-                    # Extract numeric value from price text
-                    price_match = re.search(r'[0-9,.]+', price_text)
-                    min_price = float(price_match.group().replace(',', '')) if price_match else 50.0
-                else:
-                    min_price = 50.0  # Default price if not found
-                
-                # Infer filter capabilities based on product name and requirements
-                removes_chlorine = 'yes' if ('chlor' in product_name.lower() or 
-                                           requirements.get('remove_chlorine') == 'yes') else 'partial'
-                removes_lead = 'yes' if ('lead' in product_name.lower() or 
-                                       'heavy metal' in product_name.lower() or
-                                       requirements.get('remove_lead') == 'yes') else 'partial'
-                removes_fluoride = 'yes' if ('fluor' in product_name.lower() or 
-                                           requirements.get('remove_fluoride') == 'yes') else 'no'
-                removes_bacteria = 'yes' if ('bacteria' in product_name.lower() or 
-                                           'microbe' in product_name.lower() or
-                                           'germ' in product_name.lower() or
-                                           'uv' in product_name.lower() or
-                                           requirements.get('remove_bacteria') == 'yes') else 'no'
-                
-                # Determine filter type from product name
-                filter_type = 'carbon'  # Default type
-                if 'ro' in product_name.lower() or 'reverse osm' in product_name.lower():
-                    filter_type = 'reverse_osmosis'
-                    filter_lifespan = 12
-                elif 'ceramic' in product_name.lower():
-                    filter_type = 'ceramic'
-                    filter_lifespan = 6
-                elif 'uv' in product_name.lower():
-                    filter_type = 'uv'
-                    filter_lifespan = 12
-                elif 'multi' in product_name.lower() or 'stage' in product_name.lower():
-                    filter_type = 'multi_stage'
-                    filter_lifespan = 9
-                else:
-                    filter_lifespan = 6
-                
-                # Determine installation type
-                installation_type = 'countertop'  # Default installation
-                if 'sink' in product_name.lower() or 'under' in product_name.lower():
-                    installation_type = 'under_sink'
-                elif 'whole' in product_name.lower() or 'house' in product_name.lower():
-                    installation_type = 'whole_house'
-                elif 'pitcher' in product_name.lower() or 'jug' in product_name.lower():
-                    installation_type = 'pitcher'
-                elif 'shower' in product_name.lower():
-                    installation_type = 'shower'
-                elif 'portable' in product_name.lower() or 'bottle' in product_name.lower():
-                    installation_type = 'portable'
-                elif 'ro' in product_name.lower() or 'reverse osm' in product_name.lower():
-                    installation_type = 'under_sink'
-                
-                # Check if product matches requested installation type
-                if ('installation' in requirements and 
-                    requirements['installation'] and 
-                    installation_type not in requirements['installation']):
-                    continue
-                
-                products.append({
-                    'name': product_name,
-                    'url': product_url,
-                    'price_usd': min_price,
-                    'type': installation_type,
-                    'installation': installation_type,
-                    'capacity_liters': random.choice([10, 15, 20, 30, 50]),
-                    'filtration_type': filter_type,
-                    'remineralization': 'yes' if 'mineral' in product_name.lower() else 'no',
-                    'removes_chlorine': removes_chlorine,
-                    'removes_lead': removes_lead,
-                    'removes_fluoride': removes_fluoride,
-                    'removes_bacteria': removes_bacteria,
-                    'filter_lifespan_months': filter_lifespan,
-                    'maintenance_cost_yearly_gbp': round(min_price * 0.8 * 12 / filter_lifespan, 2),
-                    'warranty_years': random.choice([1, 2, 3]),
-                    'is_alibaba': True
-                })
-                
-            except Exception as e:
-                print(f"Error parsing product: {e}")
-        
-        # Create DataFrame from products list
-        alibaba_df = pd.DataFrame(products)
-        
-        # Convert USD to GBP
-        usd_to_gbp = 0.80  # Approximate conversion rate
-        if not alibaba_df.empty:
-            alibaba_df['price_gbp'] = alibaba_df['price_usd'] * usd_to_gbp
+            # A requirement of 'yes' overrides what the name suggests
+            removes_chlorine = 'yes' if requirements.get('remove_chlorine') == 'yes' else inferred['removes_chlorine']
+            removes_lead = 'yes' if requirements.get('remove_lead') == 'yes' else inferred['removes_lead']
+            removes_fluoride = 'yes' if requirements.get('remove_fluoride') == 'yes' else inferred['removes_fluoride']
+            removes_bacteria = 'yes' if requirements.get('remove_bacteria') == 'yes' else inferred['removes_bacteria']
             
-            # Filter by max_price if available
-            if 'max_price' in requirements and requirements['max_price']:
-                alibaba_df = alibaba_df[alibaba_df['price_gbp'] <= float(requirements['max_price'])]
-        
-        if alibaba_df.empty:
-            return fallback_products(requirements)
+            filter_type = inferred['filtration_type']
+            filter_lifespan = inferred['filter_lifespan_months']
+            installation_type = inferred['installation']
+            
+            # Check if product matches requested installation type
+            if ('installation' in requirements and 
+                requirements['installation'] and 
+                installation_type not in requirements['installation']):
+                continue
             
-        return alibaba_df
+            products.append({
+                'name': product_name,
+                'url': product_url,
+                'price_usd': min_price,
+                'type': installation_type,
+                'installation': installation_type,
+                'capacity_liters': random.choice([10, 15, 20, 30, 50]),
+                'filtration_type': filter_type,
+                'remineralization': inferred['remineralization'],
+                'removes_chlorine': removes_chlorine,
+                'removes_lead': removes_lead,
+                'removes_fluoride': removes_fluoride,
+                'removes_bacteria': removes_bacteria,
+                'filter_lifespan_months': filter_lifespan,
+                'maintenance_cost_yearly_gbp': round(min_price * 0.8 * 12 / filter_lifespan, 2),
+                'warranty_years': random.choice([1, 2, 3]),
+                'is_alibaba': True
+            })
+            
+        except Exception as e:
+            print(f"Error parsing product: {e}")
+    
+    # Create DataFrame from products list
+    alibaba_df = pd.DataFrame(products)
+    
+    # Convert USD to GBP
+    usd_to_gbp = 0.80  # Approximate conversion rate
+    if not alibaba_df.empty:
+        alibaba_df['price_gbp'] = alibaba_df['price_usd'] * usd_to_gbp
         
-    except Exception as e:
-        print(f"Exception in alibaba_search: {e}")
+        # Filter by max_price if available
+        if 'max_price' in requirements and requirements['max_price']:
+            alibaba_df = alibaba_df[alibaba_df['price_gbp'] <= float(requirements['max_price'])]
+    
+    if alibaba_df.empty:
         return fallback_products(requirements)
+        
+    return alibaba_df
 
 def fallback_products(requirements):
     """
-    Returns mock product data when web scraping fails.
+    Returns mock product data when web scraping fails, marked for is_fallback.
     """
     print("Using fallback product data")
     
@@ -378,4 +445,11 @@ def fallback_products(requirements):
     if not alibaba_df.empty:
         alibaba_df['price_gbp'] = alibaba_df['price_usd'] * 0.80
     
+    alibaba_df.attrs['fallback'] = True
     return alibaba_df
+
+def is_fallback(products):
+    """
+    Whether a search result is fallback_products' mock data rather than fetched offers
+    """
+    return products is not None and products.attrs.get('fallback', False)
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import aiohttp
+
+
+class AsyncFetcher:
+    """
+    Non-blocking HTTP fetcher for synchronous callers such as the Streamlit
+    script.
+
+    An asyncio event loop runs in a daemon thread and owns one aiohttp
+    session, so connections are kept alive and reused across requests and
+    sessions. The connector caps concurrent connections overall and per host,
+    and every request has a hard total timeout.
+    """
+    def __init__(self, limit=32, limit_per_host=4, timeout=10):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._loop = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def fetch(self, url, headers=None):
+        """
+        Start a GET request and return a concurrent.futures.Future that
+        resolves to (status_code, body_text)
+        """
+        return asyncio.run_coroutine_threadsafe(self._fetch(url, headers), self._ensure_loop())
+
+    def close(self):
+        """
+        Close the pooled session and stop the event loop
+        """
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(timeout=self.timeout)
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="async-fetcher", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _get_session(self):
+        # Only ever called on the fetcher's loop, so no locking is needed
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _fetch(self, url, headers):
+        session = await self._get_session()
+        async with session.get(url, headers=headers) as response:
+            return response.status, await response.text()
+
+    async def _close_session(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# Shared fetcher for the whole process
+async_fetcher = AsyncFetcher()
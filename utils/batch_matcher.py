@@ -0,0 +1,253 @@
+"""
+Score many requirement profiles against one catalogue at once.
+
+    python -m utils.batch_matcher profiles.jsonl --top-k 5 > results.jsonl
+
+Each input line is a requirements object, or {"id": ..., "requirements": {...}}.
+Each output line has the id (when given) and the ranked products.
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from utils.data_loader import load_product_data
+from utils.product_index import CAPABILITY_REQUIREMENTS, build_product_index
+from utils.scoring import priority_weights, score_rows
+
+# Filter keys besides installation and max_price, in a fixed order for profile keys
+FLAG_REQUIREMENTS = list(CAPABILITY_REQUIREMENTS) + ['eco_friendly', 'remineralization']
+
+# Upper bound on profiles x products cells scored at once
+MAX_CHUNK_CELLS = 1 << 22
+
+# Profiles read from the input stream per batch
+STREAM_BATCH_SIZE = 10_000
+
+# Product columns written by the CLI
+OUTPUT_FIELDS = ['product_id', 'name', 'price_gbp']
+
+
+def filter_key(user_requirements):
+    """
+    Hashable key of the filters except max_price; profiles with equal keys
+    share one filter mask
+    """
+    installation = user_requirements.get('installation')
+    if isinstance(installation, str):
+        # A lone installation type, as validate_requirements accepts it
+        installation = [installation]
+    installation = tuple(sorted(set(installation))) if installation else ()
+    flags = tuple(bool(user_requirements.get(flag)) for flag in FLAG_REQUIREMENTS)
+    return installation, flags
+
+
+def weight_key(user_requirements):
+    return tuple(priority_weights(user_requirements.get('priorities')).tolist())
+
+
+def profile_key(user_requirements):
+    """
+    Hashable key of everything that affects ranking; profiles with equal
+    keys get identical results and are ranked once
+    """
+    max_price = user_requirements.get('max_price')
+    return filter_key(user_requirements), float(max_price) if max_price else None, weight_key(user_requirements)
+
+
+def _score_order(scores):
+    """
+    Product positions sorted by descending score, ties in catalogue order
+    and NaN scores last (the order scoring.top_k_order ranks in)
+    """
+    keys = -scores
+    keys[np.isnan(keys)] = np.inf
+    return np.argsort(keys, kind='stable')
+
+
+def _first_passing(passed, k):
+    """
+    Column indices of the first k True cells of every row of passed
+
+    Returns:
+    (rows, columns): Row-major arrays, at most k entries per row
+    """
+    rows, columns = np.nonzero(passed)
+    row_starts = np.searchsorted(rows, np.arange(passed.shape[0]))
+    keep = np.arange(len(rows)) - row_starts[rows] < k
+    return rows[keep], columns[keep]
+
+
+def rank_batch(index, requirements_list, top_k=10):
+    """
+    Rank the catalogue for many requirement profiles
+
+    Profiles are reduced to their distinct filter sets, weight vectors and
+    complete keys. Each filter mask is computed once, and the catalogue is
+    sorted once per distinct weight vector (at most 16). A profile's top_k
+    is then the first top_k products in its weight vector's order that
+    pass its filters and budget. These are found for many profiles at once
+    on a profiles x products matrix over a prefix of that order, widened
+    only for the profiles that have not yet found top_k products.
+
+    Parameters:
+    index (ProductIndex): Index over the catalogue
+    requirements_list (list[dict]): Requirement profiles
+    top_k (int): Products to return per profile
+
+    Returns:
+    list: One (positions, scores) pair of arrays per profile, best first,
+        equal to match_products(..., index=index, top_k=top_k)
+    """
+    profile_keys = [profile_key(requirements) for requirements in requirements_list]
+    unique_keys = list(dict.fromkeys(profile_keys))
+    if not unique_keys:
+        return []
+
+    # Shared filter masks, score vectors and score orders
+    filter_ids = {}
+    masks = []
+    weight_ids = {}
+    score_vectors = []
+    all_positions = np.arange(index.size)
+    unique_filters = []
+    unique_weights = []
+    for filters, _, weights in unique_keys:
+        if filters not in filter_ids:
+            installation, flags = filters
+            requirements = dict(zip(FLAG_REQUIREMENTS, flags))
+            requirements['installation'] = list(installation)
+            filter_ids[filters] = len(masks)
+            masks.append(index.filter_mask(requirements, include_price=False))
+        if weights not in weight_ids:
+            weight_ids[weights] = len(score_vectors)
+            score_vectors.append(score_rows(index.features, all_positions, np.array(weights)))
+        unique_filters.append(filter_ids[filters])
+        unique_weights.append(weight_ids[weights])
+
+    masks = np.array(masks).reshape(len(masks), index.size)
+    unique_filters = np.array(unique_filters)
+    unique_weights = np.array(unique_weights)
+    # No max_price is an infinite budget; NaN prices only pass without one
+    max_prices = np.array([np.inf if key[1] is None else key[1] for key in unique_keys])
+    if index.prices is not None:
+        prices = np.where(np.isnan(index.prices), np.inf, index.prices)
+        unbounded = np.isinf(max_prices)
+    else:
+        prices = None
+
+    k = min(top_k, index.size)
+    results = [None] * len(unique_keys)
+    for weight_id, scores in enumerate(score_vectors):
+        order = _score_order(scores)
+        pending = np.flatnonzero(unique_weights == weight_id)
+        width = min(index.size, max(4 * k, 64))
+        while len(pending):
+            columns = order[:width]
+            done = []
+            chunk_size = max(1, MAX_CHUNK_CELLS // max(width, 1))
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                passed = masks[np.ix_(unique_filters[chunk], columns)]
+                if prices is not None:
+                    passed &= (prices[columns][None, :] <= max_prices[chunk, None]) | unbounded[chunk, None]
+
+                found = passed.sum(axis=1) >= k
+                if width < index.size:
+                    chunk, passed = chunk[found], passed[found]
+                rows, selected = _first_passing(passed, k)
+                bounds = np.searchsorted(rows, np.arange(len(chunk) + 1))
+                positions = columns[selected]
+                for row, profile in enumerate(chunk):
+                    profile_positions = positions[bounds[row]:bounds[row + 1]]
+                    results[profile] = (profile_positions, scores[profile_positions])
+                done.append(chunk)
+
+            pending = np.setdiff1d(pending, np.concatenate(done), assume_unique=True)
+            width = min(index.size, width * 4)
+
+    by_key = dict(zip(unique_keys, results))
+    return [by_key[key] for key in profile_keys]
+
+
+def _read_profiles(lines):
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e}") from None
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_batch(input_lines, output, index, fields=OUTPUT_FIELDS, top_k=10, batch_size=STREAM_BATCH_SIZE):
+    """
+    Rank JSONL profiles from input_lines and write one JSONL result per profile
+
+    Returns:
+    int: Number of profiles processed
+    """
+    columns = {field: index.products_df[field].tolist() for field in fields if field in index.products_df.columns}
+    count = 0
+    for records in _batches(_read_profiles(input_lines), batch_size):
+        requirements_list = [record.get('requirements', record) for record in records]
+        lines = []
+        for record, (positions, scores) in zip(records, rank_batch(index, requirements_list, top_k)):
+            products = []
+            for position, score in zip(positions.tolist(), scores.tolist()):
+                product = {field: values[position] for field, values in columns.items()}
+                product['match_score'] = None if score != score else score
+                products.append(product)
+            result = {'id': record['id']} if 'requirements' in record and 'id' in record else {}
+            result['products'] = products
+            lines.append(json.dumps(result, default=str))
+        output.write("\n".join(lines) + "\n")
+        count += len(records)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank saved requirement profiles in bulk (JSONL in, JSONL out)")
+    parser.add_argument('input', nargs='?', default='-', help="Profiles file, - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="Results file, - for stdout")
+    parser.add_argument('--catalogue', default=None, help="Catalogue path (see utils.data_loader)")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--fields', default=",".join(OUTPUT_FIELDS), help="Product columns to output")
+    parser.add_argument('--batch-size', type=int, default=STREAM_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fields = [field for field in args.fields.split(",") if field]
+    products_df = load_product_data(args.catalogue, columns=fields)
+    if products_df.empty:
+        parser.exit(1, "No product data loaded\n")
+    index = build_product_index(products_df)
+
+    input_file = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        count = stream_batch(input_file, output_file, index, fields, args.top_k, args.batch_size)
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    print(f"Ranked {count} profiles", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
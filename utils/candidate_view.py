@@ -0,0 +1,179 @@
+"""
+Rank the catalogue and per-request sources (the Alibaba rows) together
+without concatenating them.
+
+Each source is filtered and scored on its own ProductIndex, a block of
+rows at a time, keeping a running top K. Only those K rows are taken out of
+each source, and they are merged by score in the order match_products
+would rank the concatenated sources. A turn's scratch memory is therefore
+bounded by the block size and K, whatever the size of the catalogue.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.product_index import build_product_index
+from utils.scoring import priority_weights, score_rows, top_k_order
+
+# Rows filtered and scored at a time (a multiple of 8, for the packed bitsets)
+BLOCK_ROWS = 1 << 16
+
+
+def rank_source(index, positions, scores, top_k):
+    """
+    The best top_k of a source's candidate rows
+
+    Returns:
+    tuple: (index, positions, scores) of those rows, best first, for merge_top_k
+    """
+    order = top_k_order(scores, top_k)
+    return index, positions[order], scores[order]
+
+
+def rank_index(index, requirements, weights, top_k, block_rows=BLOCK_ROWS):
+    """
+    Filter and score a source block by block, keeping each block's top_k
+
+    Returns:
+    tuple: (index, positions, scores) of the source's top_k, best first, for merge_top_k
+    """
+    positions = [np.array([], dtype=np.intp)]
+    scores = [np.array([], dtype=float)]
+    for start in range(0, index.size, block_rows):
+        block = np.flatnonzero(index.block_mask(requirements, start, min(start + block_rows, index.size))) + start
+        block_scores = score_rows(index.features, block, weights)
+        order = top_k_order(block_scores, top_k)
+        positions.append(block[order])
+        scores.append(block_scores[order])
+    # Blocks are in catalogue order, so ties still go to the earlier row
+    return rank_source(index, np.concatenate(positions), np.concatenate(scores), top_k)
+
+
+def _with_missing(dtype):
+    # numpy integers and booleans cannot hold a missing value; concat makes them float (NaN) and object
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        return np.dtype('float64')
+    if isinstance(dtype, np.dtype) and dtype.kind == 'b':
+        return object
+    return dtype
+
+
+def combine_rows(frames, order=None):
+    """
+    The rows of frames as one DataFrame, with the union of their columns in
+    the order they are first seen
+
+    A column a frame lacks is NaN (or None) in its rows, in the dtype the
+    other frames use, integers becoming floats as with pd.concat; the
+    renderers and comparisons read a missing NaN rating as concat left it,
+    where pandas' NA would raise on comparison. Columns whose dtypes
+    differ between frames get the dtype pandas infers for their values.
+    The frame is built column by column from the values, as on a few rows
+    pandas' own alignment (concat, astype) costs far more than the rows.
+
+    Parameters:
+    frames (list): DataFrames
+    order (array): Optional row order: row i of the result is row order[i]
+        of the frames one after the other
+
+    Returns:
+    DataFrame
+    """
+    frame_dtypes = [frame.dtypes.to_dict() for frame in frames]
+    columns = list(dict.fromkeys(column for dtypes in frame_dtypes for column in dtypes))
+    labels = np.concatenate([frame.index.to_numpy() for frame in frames])
+    order = np.arange(len(labels)) if order is None else np.asarray(order)
+
+    data = {}
+    for column in columns:
+        values = []
+        for frame, dtypes in zip(frames, frame_dtypes):
+            values.extend(frame[column].tolist() if column in dtypes else [None] * len(frame))
+        values = [values[i] for i in order]
+
+        present = {dtypes[column] for dtypes in frame_dtypes if column in dtypes}
+        if len(present) == 1:
+            dtype = present.pop()
+            if any(column not in dtypes for dtypes in frame_dtypes):
+                dtype = _with_missing(dtype)
+            data[column] = pd.array(values, dtype=dtype)
+        else:
+            data[column] = pd.Series(values).array
+    return pd.DataFrame(data, index=labels[order])
+
+
+def merge_top_k(ranked, top_k):
+    """
+    Merge the per-source top rows into the overall top_k
+
+    Ties go to the earlier source, then the earlier row, as when sorting the
+    concatenated sources. With several sources, rows are labelled by their
+    position in that concatenation.
+
+    Parameters:
+    ranked (list): (ProductIndex, positions, scores) per source, from rank_source
+    top_k (int): Number of products to return
+
+    Returns:
+    DataFrame: The top_k products with their match_score, best first
+    """
+    if len(ranked) == 1:
+        index, positions, scores = ranked[0]
+        top_df = index.take(positions[:top_k])
+        top_df['match_score'] = scores[:top_k]
+        return top_df
+
+    scores = np.concatenate([source_scores for _, _, source_scores in ranked])
+    lengths = [len(positions) for _, positions, _ in ranked]
+    starts = np.cumsum([0] + lengths[:-1])
+    order = top_k_order(scores, top_k)
+    source = np.repeat(np.arange(len(ranked)), lengths)[order]
+
+    # Take each source's rows in one go; combine_rows puts them back in rank order
+    frames = []
+    offset = 0
+    rank_order = np.empty(len(order), dtype=np.intp)
+    taken = 0
+    for number, (index, positions, _) in enumerate(ranked):
+        chosen = np.flatnonzero(source == number)
+        rows = positions[order[chosen] - starts[number]]
+        frame = index.take(rows)
+        frame.index = rows + offset
+        frames.append(frame)
+        rank_order[chosen] = np.arange(taken, taken + len(chosen))
+        taken += len(chosen)
+        offset += index.size
+
+    top_df = combine_rows(frames, rank_order)
+    top_df['match_score'] = scores[order]
+    return top_df
+
+
+class CandidateView:
+    """
+    The catalogue's prebuilt index plus the small DataFrames of a single
+    request, ranked as one table
+    """
+    def __init__(self, catalogue_index, sources=()):
+        self.indexes = [catalogue_index] + [
+            build_product_index(source.reset_index(drop=True)) for source in sources if source is not None
+        ]
+
+    def match(self, requirements, top_k, catalogue_top=None):
+        """
+        Same products, scores and order as match_products on the
+        concatenated sources with top_k
+
+        Parameters:
+        requirements (dict): User requirements
+        top_k (int): Number of products to return
+        catalogue_top (tuple): The catalogue's top_k as (index, positions, scores)
+            if already ranked, e.g. by a RecommendationCache
+
+        Returns:
+        DataFrame: The top_k products with their match_score, best first
+        """
+        weights = priority_weights(requirements.get('priorities'))
+        ranked = [rank_index(index, requirements, weights, top_k) for index in self.indexes[1:]]
+        if catalogue_top is None:
+            catalogue_top = rank_index(self.indexes[0], requirements, weights, top_k)
+        return merge_top_k([catalogue_top] + ranked, top_k)
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+import time
+
+from utils.column_store import column_store_sha256
+from utils.data_loader import default_data_path, load_product_data
+from utils.product_index import build_product_index
+from utils.rendering import prepare_display
+from utils.tracing import tracer
+
+
+class CatalogueSnapshot:
+    """
+    One immutable version of the product catalogue and everything derived
+    from it. Callers keep a reference for the whole turn, so a reload in
+    the middle of a turn never mixes two versions.
+    """
+    __slots__ = ("version", "products_df", "index", "path", "sha256")
+
+    def __init__(self, version, products_df, path, sha256):
+        self.version = version
+        self.products_df = products_df
+        self.index = build_product_index(products_df)
+        self.path = path
+        self.sha256 = sha256
+        prepare_display(products_df)
+
+
+def file_sha256(path):
+    if os.path.isdir(path):
+        # Written with its content hash, no need to read the columns
+        return column_store_sha256(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CatalogueStore:
+    """
+    Process-wide holder of the current CatalogueSnapshot.
+
+    get() only stats the file (at most once per check_interval seconds).
+    A column store directory is replaced as a whole when rewritten, so its
+    stat changes the same way.
+    The catalogue is re-read when the mtime or size changed and the content
+    hash differs. The new snapshot is published with a single reference
+    swap. While one thread reloads, other callers keep getting the previous
+    snapshot instead of waiting. If a reload fails, the previous snapshot
+    stays in place.
+    """
+    def __init__(self, path=None, loader=load_product_data, check_interval=1.0):
+        self.path = path or default_data_path()
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._file_stat = None
+        self._snapshot = None
+        self.reload()
+
+    def get(self):
+        """
+        Return the current snapshot, reloading first if the file changed
+        """
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._reload_if_changed()
+                finally:
+                    self._lock.release()
+        return self._snapshot
+
+    def reload(self, force=False):
+        """
+        Check the file now (waiting for any reload in progress)
+        """
+        with self._lock:
+            self._reload_if_changed(force=force)
+        return self._snapshot
+
+    def _load(self):
+        with tracer.span("load_product_data"):
+            return self.loader(self.path)
+
+    def _reload_if_changed(self, force=False):
+        current = self._snapshot
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            print(f"Error checking product data: {e}")
+            if current is None:
+                self._snapshot = CatalogueSnapshot(1, self._load(), self.path, None)
+            return
+
+        file_stat = (stat.st_mtime_ns, stat.st_size)
+        if not force and current is not None and file_stat == self._file_stat:
+            return
+        self._file_stat = file_stat
+
+        try:
+            sha256 = file_sha256(self.path)
+        except (OSError, ValueError) as e:
+            print(f"Error checking product data: {e}")
+            sha256 = None
+        if not force and current is not None and sha256 == current.sha256:
+            return
+
+        products_df = self._load()
+        if products_df.empty and current is not None:
+            print("Reloaded product data is empty, keeping the previous catalogue")
+            return
+
+        version = 1 if current is None else current.version + 1
+        self._snapshot = CatalogueSnapshot(version, products_df, self.path, sha256)
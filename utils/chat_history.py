@@ -0,0 +1,178 @@
+"""
+Bounded chat history for a session, stored compactly and shown a page at a time.
+
+A reply's product blocks are kept as the products they show (CompactRows:
+catalogue product ids, and small records for rows from elsewhere) rather
+than their markdown. A block is rendered again from the current catalogue
+when shown, and the markdown is memoized in the shared render cache, so a
+rerun renders only what is new.
+
+Only the latest page_size messages are shown; load_older() shows one more
+page. When the stored history outgrows the session's byte budget, the
+oldest messages are compacted to a short summary (the start of the text
+and the names of the products), and once everything is compacted the
+oldest are dropped. The latest message is always kept whole.
+"""
+import os
+from collections import deque
+
+from utils.compact_rows import compact_rows
+from utils.rendering import render_cache
+from utils.response_stream import TEMPLATE_ROWS, TEMPLATES
+
+# Messages shown at once, and added by each "load older"
+PAGE_SIZE = 20
+
+# Bytes of stored history per session before old messages are compacted
+BUDGET_BYTES = int(os.environ.get("CHAT_HISTORY_BYTES", 64 * 1024))
+
+# Characters of a message's text kept in its summary
+SUMMARY_CHARS = 160
+
+
+class ProductBlock:
+    """
+    The products of one block of a reply, their names (for summaries) and the template that renders them
+    """
+    __slots__ = ("template", "rows", "names")
+
+    def __init__(self, template, rows, names):
+        self.template = template
+        self.rows = rows
+        self.names = names
+
+
+class ChatMessage:
+    __slots__ = ("role", "text", "blocks", "size", "compacted")
+
+    def __init__(self, role, text, blocks=()):
+        self.role = role
+        self.text = text
+        self.blocks = tuple(blocks)
+        self.compacted = False
+        self.size = _message_size(self)
+
+
+def _message_size(message):
+    # Bytes of the text plus a rough size of each block
+    size = len(message.text.encode('utf-8'))
+    for block in message.blocks:
+        size += block.rows.size() + sum(len(name.encode('utf-8')) for name in block.names)
+    return size
+
+
+def product_block(template, products, catalogue=None):
+    """
+    A ProductBlock for the rows of products the template reads, ranked
+    against the catalogue snapshot given
+    """
+    top = products.head(TEMPLATE_ROWS)
+    names = tuple(str(name) for name in top['name'].tolist()) if 'name' in top.columns else ()
+    return ProductBlock(template, compact_rows(top, catalogue), names)
+
+
+def render_block(block, catalogue):
+    """
+    Markdown of a block, memoized by its rows and the catalogue version
+    """
+    key = ('block', block.template, catalogue.version, block.rows.key())
+    return render_cache.get_or_render(key, lambda: TEMPLATES[block.template](block.rows.products(catalogue)))
+
+
+def summarize(message):
+    """
+    Short form of a message: the start of its text and the names of its products
+    """
+    text = message.text.strip()
+    if len(text) > SUMMARY_CHARS:
+        text = text[:SUMMARY_CHARS].rsplit(' ', 1)[0] + " …"
+    names = [name for block in message.blocks for name in block.names]
+    if names:
+        text += "\n\n*Recommended: " + ", ".join(dict.fromkeys(names)) + "*"
+    return text
+
+
+class ChatHistory:
+    """
+    One session's messages, within a byte budget; see the module docstring
+    """
+    def __init__(self, budget_bytes=BUDGET_BYTES, page_size=PAGE_SIZE):
+        self.budget_bytes = budget_bytes
+        self.page_size = page_size
+        self.window = page_size
+        self.messages = deque()
+        self.size = 0
+        self.dropped = 0
+        # Messages before this position are compacted
+        self._compacted = 0
+
+    def add(self, role, text, blocks=()):
+        """
+        Append a message, then compact or drop old ones to fit the budget
+        """
+        message = ChatMessage(role, text, blocks)
+        self.messages.append(message)
+        self.size += message.size
+        self._fit_budget()
+        return message
+
+    def add_reply(self, parts, catalogue=None):
+        """
+        Append an assistant reply from stream_reply's on_part calls: (template, value)
+        pairs, its products ranked against the catalogue snapshot given
+        """
+        text = "".join(value for template, value in parts if template == 'text')
+        blocks = [product_block(template, value, catalogue) for template, value in parts if template != 'text']
+        return self.add("assistant", text, blocks)
+
+    def _fit_budget(self):
+        while self.size > self.budget_bytes and self._compacted < len(self.messages) - 1:
+            message = self.messages[self._compacted]
+            message.text = summarize(message)
+            message.blocks = ()
+            message.compacted = True
+            self.size -= message.size
+            message.size = _message_size(message)
+            self.size += message.size
+            self._compacted += 1
+        while self.size > self.budget_bytes and len(self.messages) > 1:
+            self.size -= self.messages.popleft().size
+            self._compacted = max(self._compacted - 1, 0)
+            self.dropped += 1
+
+    def visible(self):
+        """
+        The messages to show, oldest first
+        """
+        start = max(len(self.messages) - self.window, 0)
+        return [self.messages[position] for position in range(start, len(self.messages))]
+
+    def has_older(self):
+        return len(self.messages) > self.window
+
+    def load_older(self):
+        """
+        Show one more page of older messages
+        """
+        self.window += self.page_size
+
+    def render(self, message, catalogue):
+        """
+        Markdown of a message, its product blocks rendered from the catalogue snapshot
+        """
+        return message.text + "".join(render_block(block, catalogue) for block in message.blocks)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def stats(self):
+        """
+        Returns:
+        dict: messages, bytes (estimated size of what is stored), compacted and dropped counts
+        """
+        return {
+            'messages': len(self.messages),
+            'bytes': self.size,
+            'compacted': self._compacted,
+            'dropped': self.dropped,
+        }
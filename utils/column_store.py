@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# On-disk layout of a column store directory:
+#   schema.json            row count, column order, kinds, categories and a content hash
+#   <column>.npy           numeric values
+#   <column>.codes.npy     category codes (-1 for missing), categories are kept in schema.json
+#   <column>.utf8          text: all values UTF-8 encoded, joined with a record separator (0x1e)
+#   <column>.offsets.npy   text: only if some value contains the separator, the start offset of
+#                          every value in <column>.utf8 (rows + 1 entries) instead of separators
+#   <column>.nulls.npy     text: missing-value mask, only written if the column has missing values
+# Numeric arrays and category codes are memory-mapped read-only on load, so
+# every process reading the same store shares one copy through the page cache.
+FORMAT_VERSION = 1
+SCHEMA_FILE = 'schema.json'
+
+COLUMN_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_]+$')
+
+TEXT_SEPARATOR = '\x1e'
+
+
+def _codes_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _column_files(name, kind, has_nulls=False, separated=True):
+    if kind == 'numeric':
+        return [f"{name}.npy"]
+    if kind == 'category':
+        return [f"{name}.codes.npy"]
+    files = [f"{name}.utf8"]
+    if not separated:
+        files.append(f"{name}.offsets.npy")
+    if has_nulls:
+        files.append(f"{name}.nulls.npy")
+    return files
+
+
+def _write_column(directory, name, series):
+    """
+    Write one column and return its schema entry
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        codes = series.cat.codes.to_numpy().astype(_codes_dtype(len(categories)))
+        np.save(os.path.join(directory, f"{name}.codes.npy"), codes)
+        return {'name': name, 'kind': 'category', 'categories': categories.tolist()}
+
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy()
+        np.save(os.path.join(directory, f"{name}.npy"), values)
+        return {'name': name, 'kind': 'numeric', 'dtype': values.dtype.str}
+
+    nulls = series.isna().to_numpy()
+    values = ['' if null else str(value) for value, null in zip(series.tolist(), nulls)]
+    # Separated text is decoded with one split; offsets are the fallback
+    separated = not any(TEXT_SEPARATOR in value for value in values)
+    if separated:
+        data = TEXT_SEPARATOR.join(values).encode('utf-8')
+    else:
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+        data = b''.join(encoded)
+    with open(os.path.join(directory, f"{name}.utf8"), 'wb') as f:
+        f.write(data)
+    has_nulls = bool(nulls.any())
+    if has_nulls:
+        np.save(os.path.join(directory, f"{name}.nulls.npy"), nulls)
+    return {'name': name, 'kind': 'text', 'has_nulls': has_nulls, 'separated': separated}
+
+
+def _content_sha256(directory, columns):
+    digest = hashlib.sha256()
+    for column in columns:
+        files = _column_files(column['name'], column['kind'], column.get('has_nulls', False), column.get('separated', True))
+        for file_name in files:
+            digest.update(file_name.encode('utf-8'))
+            with open(os.path.join(directory, file_name), 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_column_store(products_df, path):
+    """
+    Write a DataFrame as a memory-mappable column store directory
+
+    The store is built next to path and then swapped in, so readers see
+    either the old or the new catalogue, never a half-written one.
+
+    Parameters:
+    products_df (DataFrame): Catalogue to write
+    path (str): Directory to create or replace
+
+    Returns:
+    str: SHA-256 of the stored column data
+    """
+    for name in products_df.columns:
+        if not COLUMN_NAME_PATTERN.match(str(name)):
+            raise ValueError(f"Column name {name!r} cannot be used as a file name")
+
+    path = os.path.abspath(path)
+    staging = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        columns = [_write_column(staging, name, products_df[name]) for name in products_df.columns]
+        sha256 = _content_sha256(staging, columns)
+        schema = {
+            'format_version': FORMAT_VERSION,
+            'rows': len(products_df),
+            'sha256': sha256,
+            'columns': columns,
+        }
+        with open(os.path.join(staging, SCHEMA_FILE), 'w', encoding='utf-8') as f:
+            json.dump(schema, f, indent=2)
+
+        previous = None
+        if os.path.exists(path):
+            previous = f"{path}.old-{os.getpid()}"
+            os.rename(path, previous)
+        os.rename(staging, path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if previous is not None:
+        # Processes that still map the old files keep them until they unmap
+        shutil.rmtree(previous, ignore_errors=True)
+    return sha256
+
+
+def read_schema(path):
+    with open(os.path.join(path, SCHEMA_FILE), encoding='utf-8') as f:
+        schema = json.load(f)
+    if schema.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported column store version: {schema.get('format_version')}")
+    return schema
+
+
+def is_column_store(path):
+    return os.path.isfile(os.path.join(path, SCHEMA_FILE))
+
+
+def column_store_sha256(path):
+    """
+    Content hash recorded when the store was written
+    """
+    return read_schema(path)['sha256']
+
+
+def _read_text(path, column, rows):
+    name = column['name']
+    with open(os.path.join(path, f"{name}.utf8"), 'rb') as f:
+        data = f.read()
+    values = np.empty(rows, dtype=object)
+    if rows == 0:
+        return values
+    if column['separated']:
+        decoded = data.decode('utf-8').split(TEXT_SEPARATOR)
+    else:
+        offsets = np.load(os.path.join(path, f"{name}.offsets.npy")).tolist()
+        decoded = [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+    if len(decoded) != rows:
+        raise ValueError(f"Column store column {name} has {len(decoded)} values, expected {rows}")
+    values[:] = decoded
+    if column['has_nulls']:
+        values[np.load(os.path.join(path, f"{name}.nulls.npy"))] = np.nan
+    return values
+
+
+def _map_array(file_path):
+    # A plain ndarray view of the map, so pandas and numpy results are not np.memmap
+    return np.load(file_path, mmap_mode='r').view(np.ndarray)
+
+
+def read_column_store(path, columns=None):
+    """
+    Load a column store written by write_column_store
+
+    Parameters:
+    path (str): Column store directory
+    columns (list, optional): Columns to load, in this order; None loads all
+
+    Returns:
+    DataFrame: Numeric columns and category codes are read-only memory maps
+    """
+    schema = read_schema(path)
+    stored = {column['name']: column for column in schema['columns']}
+    if columns is None:
+        columns = list(stored)
+    missing = [name for name in columns if name not in stored]
+    if missing:
+        raise ValueError(f"Columns not in the column store: {', '.join(missing)}")
+
+    rows = schema['rows']
+    data = {}
+    for name in columns:
+        column = stored[name]
+        if column['kind'] == 'numeric':
+            data[name] = _map_array(os.path.join(path, f"{name}.npy"))
+        elif column['kind'] == 'category':
+            codes = _map_array(os.path.join(path, f"{name}.codes.npy"))
+            data[name] = pd.Categorical.from_codes(codes, categories=column['categories'])
+        else:
+            # Explicit object dtype, matching what the CSV loader produces for text
+            data[name] = pd.Series(_read_text(path, column, rows), dtype=object)
+
+    # copy=False keeps the memory maps as the frame's column storage
+    return pd.DataFrame(data, index=pd.RangeIndex(rows), copy=False)
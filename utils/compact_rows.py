@@ -0,0 +1,145 @@
+"""
+Ranked products kept per session without copying catalogue rows.
+
+Rows from the catalogue are stored as an int32 array of product ids; other
+rows (e.g. from Alibaba) as small records of the columns the app renders.
+The DataFrame is rebuilt from the shared catalogue snapshot when it is
+needed, through an id lookup built once per catalogue version. Products no
+longer in the catalogue are left out, and rows rebuilt from a newer
+version show its values.
+"""
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.candidate_view import combine_rows
+
+# Columns the app renders for a product (tables, specifications, comparisons)
+RECORD_COLUMNS = (
+    'name', 'type', 'price_gbp', 'installation', 'capacity_liters', 'filtration_type', 'remineralization',
+    'removes_chlorine', 'removes_lead', 'removes_fluoride', 'removes_bacteria', 'filter_lifespan_months',
+    'maintenance_cost_yearly_gbp', 'ecofriendly_rating', 'warranty_years',
+)
+
+# Marks a row stored as a record in the product id array
+RECORD = -1
+
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+class CompactRows:
+    """
+    Products in rank order: product_ids holds the catalogue product id of
+    each row, or RECORD for the next of records. dtypes holds (column, dtype)
+    pairs: with records, one for each of their columns, in the order of a
+    record's values; otherwise for any column whose dtype ranking changed
+    from the catalogue's (an int column with missing values becomes float),
+    so rebuilt rows render as they did.
+    """
+    __slots__ = ("catalogue_version", "product_ids", "records", "dtypes")
+
+    def __init__(self, catalogue_version, product_ids, records=(), dtypes=()):
+        self.catalogue_version = catalogue_version
+        self.product_ids = product_ids
+        self.records = records
+        self.dtypes = dtypes
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def key(self):
+        """
+        Hashable identity of the rows, for memoizing what is rendered from them
+        """
+        return self.product_ids.tobytes(), self.records, self.dtypes
+
+    def size(self):
+        """
+        Rough bytes stored: the id array plus the records and dtypes as text
+        """
+        return self.product_ids.nbytes + sum(len(repr(record)) for record in self.records) + len(repr(self.dtypes))
+
+    def products(self, catalogue):
+        """
+        The rows as a DataFrame, catalogue rows taken from the given CatalogueSnapshot
+        """
+        from_catalogue = self.product_ids != RECORD
+        positions = catalogue_positions(catalogue, self.product_ids[from_catalogue])
+        dtypes = dict(self.dtypes)
+        catalogue_rows = catalogue.index.take(positions[positions >= 0])
+        if not self.records:
+            return catalogue_rows.astype({column: dtype for column, dtype in dtypes.items()
+                                          if column in catalogue_rows.columns})
+        record_rows = pd.DataFrame(list(self.records), columns=list(dtypes)).astype(dtypes)
+        if not from_catalogue.any():
+            return record_rows
+
+        # Put the rows back in rank order, without the products the catalogue no longer has
+        kept = np.ones(len(self), dtype=bool)
+        kept[from_catalogue] = positions >= 0
+        from_catalogue = from_catalogue[kept]
+        order = np.empty(len(from_catalogue), dtype=np.intp)
+        order[from_catalogue] = np.arange(len(catalogue_rows))
+        order[~from_catalogue] = len(catalogue_rows) + np.arange(len(record_rows))
+        record_rows.index = np.arange(len(record_rows)) + catalogue.index.size
+        return combine_rows([catalogue_rows, record_rows], order)
+
+
+def compact_rows(products, catalogue=None):
+    """
+    CompactRows for a ranked DataFrame
+
+    Parameters:
+    products (DataFrame): Ranked products, e.g. Recommendation.products
+    catalogue (CatalogueSnapshot): The snapshot they were ranked against
+
+    Returns:
+    CompactRows
+    """
+    version = catalogue.version if catalogue is not None else None
+    if products.empty:
+        return CompactRows(version, np.empty(0, dtype=np.int32))
+    ids = products['product_id'].tolist() if 'product_id' in products.columns else [None] * len(products)
+    alibaba = products['is_alibaba'].eq(True).tolist() if 'is_alibaba' in products.columns else [False] * len(products)
+    columns = [column for column in RECORD_COLUMNS if column in products.columns]
+    product_ids = np.full(len(products), RECORD, dtype=np.int32)
+    for row, (product_id, from_alibaba) in enumerate(zip(ids, alibaba)):
+        if not (from_alibaba or product_id is None or pd.isna(product_id) or not 0 <= product_id <= _INT32_MAX):
+            product_ids[row] = product_id
+    record_rows = products[product_ids == RECORD]
+    records = [tuple(record[column] for column in columns) for record in record_rows[columns].to_dict('records')]
+
+    catalogue_dtypes = catalogue.products_df.dtypes if catalogue is not None else {}
+    # Interned, so sessions share one copy of each dtype name
+    dtypes = tuple(
+        (column, sys.intern(str(products[column].dtype))) for column in columns
+        if records or column not in catalogue_dtypes or products[column].dtype != catalogue_dtypes[column]
+    )
+    return CompactRows(version, product_ids, tuple(records), dtypes)
+
+
+_id_index = {}
+_id_index_lock = threading.Lock()
+
+
+def catalogue_positions(catalogue, product_ids):
+    """
+    Row positions of product ids in a CatalogueSnapshot, -1 where it has no
+    such product. The id lookup is built once per catalogue version.
+    """
+    if not len(product_ids):
+        return np.empty(0, dtype=np.intp)
+    with _id_index_lock:
+        version, ids, positions = _id_index.get('latest', (None, None, None))
+        if version != catalogue.version:
+            ids = pd.Index(catalogue.products_df['product_id'].to_numpy())
+            positions = np.arange(len(ids))
+            if not ids.is_unique:
+                # The first row of a repeated id, as a filter on the id would list it first
+                first = ~ids.duplicated()
+                ids, positions = ids[first], positions[first]
+            _id_index['latest'] = (catalogue.version, ids, positions)
+    found = ids.get_indexer(product_ids)
+    return np.where(found >= 0, positions[found], -1)
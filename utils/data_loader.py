@@ -1,16 +1,193 @@
-import pandas as pd
+import argparse
 import os
 
-def load_product_data():
+import numpy as np
+import pandas as pd
+
+from utils.column_store import is_column_store, read_column_store, write_column_store
+
+# Explicit column types so loads never re-infer them; low-cardinality text
+# columns are categoricals. A CSV's int64 columns are read as float64, so a
+# blank cell loads as NaN, and become int64 again when they have no blanks
+PRODUCT_DTYPES = {
+    'product_id': 'int64',
+    'name': 'object',
+    'type': 'category',
+    'price_gbp': 'float64',
+    'installation': 'category',
+    'capacity_liters': 'float64',
+    'filtration_type': 'category',
+    'remineralization': 'category',
+    'removes_chlorine': 'category',
+    'removes_lead': 'category',
+    'removes_fluoride': 'category',
+    'removes_bacteria': 'category',
+    'ecofriendly_rating': 'int64',
+    'maintenance_cost_yearly_gbp': 'int64',
+    'filter_lifespan_months': 'int64',
+    'dimensions_cm': 'object',
+    'weight_kg': 'float64',
+    'warranty_years': 'int64',
+    'amazon_url': 'object',
+}
+
+# Columns match_products filters and scores on; a catalogue without them is rejected
+MATCH_COLUMNS = [
+    'installation', 'price_gbp',
+    'removes_chlorine', 'removes_lead', 'removes_fluoride', 'removes_bacteria',
+    'remineralization', 'ecofriendly_rating', 'filter_lifespan_months', 'maintenance_cost_yearly_gbp',
+]
+NUMERIC_MATCH_COLUMNS = ['price_gbp', 'ecofriendly_rating', 'filter_lifespan_months', 'maintenance_cost_yearly_gbp']
+
+# Columns the app displays on top of MATCH_COLUMNS
+DISPLAY_COLUMNS = ['product_id', 'name', 'type', 'capacity_liters', 'filtration_type', 'warranty_years']
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+FEATHER_SUFFIXES = ('.feather', '.arrow')
+
+
+def default_data_path():
     """
-    Load product data from CSV file
+    Path of the product catalogue: PRODUCT_DATA_PATH if set, otherwise the
+    bundled data/products.csv
     """
+    if os.environ.get('PRODUCT_DATA_PATH'):
+        return os.environ['PRODUCT_DATA_PATH']
     script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(script_dir, 'data', 'products.csv')
-    
+    return os.path.join(script_dir, 'data', 'products.csv')
+
+
+def validate_product_schema(products_df, required_columns=MATCH_COLUMNS):
+    """
+    Raise ValueError if the catalogue lacks a column match_products needs or
+    a numeric column holds non-numeric values
+    """
+    missing = [column for column in required_columns if column not in products_df.columns]
+    if missing:
+        raise ValueError(f"Product data is missing columns: {', '.join(missing)}")
+
+    not_numeric = [
+        column for column in NUMERIC_MATCH_COLUMNS
+        if column in required_columns and not pd.api.types.is_numeric_dtype(products_df[column].dtype)
+    ]
+    if not_numeric:
+        raise ValueError(f"Product data columns must be numeric: {', '.join(not_numeric)}")
+
+
+def _read_products(data_path, columns=None):
+    """
+    Read a catalogue in any supported format: a column store directory,
+    Parquet, Feather or CSV (chosen by path)
+    """
+    if os.path.isdir(data_path):
+        if not is_column_store(data_path):
+            raise ValueError(f"{data_path} is not a column store directory")
+        return read_column_store(data_path, columns=columns)
+
+    lower_path = data_path.lower()
+    if lower_path.endswith(PARQUET_SUFFIXES):
+        return pd.read_parquet(data_path, columns=columns)
+    if lower_path.endswith(FEATHER_SUFFIXES):
+        return pd.read_feather(data_path, columns=columns)
+
+    if columns is None:
+        return _restore_integers(pd.read_csv(data_path, dtype=_csv_dtypes(PRODUCT_DTYPES)))
+    dtypes = {column: dtype for column, dtype in PRODUCT_DTYPES.items() if column in columns}
+    products_df = pd.read_csv(data_path, dtype=_csv_dtypes(dtypes), usecols=lambda column: column in columns)
+    # usecols keeps file order; return the columns in the order they were asked for
+    return _restore_integers(products_df[[column for column in columns if column in products_df.columns]])
+
+
+def _csv_dtypes(dtypes):
+    # numpy integers cannot hold a blank cell, which would fail the whole read
+    return {column: 'float64' if dtype == 'int64' else dtype for column, dtype in dtypes.items()}
+
+
+def _restore_integers(products_df):
+    """
+    Make the int64 columns of PRODUCT_DTYPES read as float64 int64 again,
+    unless they have blank (NaN) or fractional values, as pd.read_csv would
+    infer them
+    """
+    for column, dtype in PRODUCT_DTYPES.items():
+        if dtype != 'int64' or column not in products_df.columns:
+            continue
+        values = products_df[column].to_numpy()
+        if not np.isnan(values).any() and np.array_equal(values, np.floor(values)):
+            products_df[column] = values.astype('int64')
+    return products_df
+
+
+def load_product_data(data_path=None, columns=None):
+    """
+    Load product data from a CSV, Parquet or Feather file, or a column store
+    directory
+
+    Parameters:
+    data_path (str, optional): Catalogue location, see default_data_path
+    columns (list, optional): Columns to load besides MATCH_COLUMNS; None loads every column
+
+    Returns:
+    DataFrame: The catalogue, or an empty DataFrame if it cannot be loaded or fails validation
+    """
+    data_path = data_path or default_data_path()
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + MATCH_COLUMNS))
+
     try:
-        products_df = pd.read_csv(data_path)
+        products_df = _read_products(data_path, columns=columns)
+        validate_product_schema(products_df)
         return products_df
     except Exception as e:
         print(f"Error loading product data: {e}")
         return pd.DataFrame()
+
+
+def write_product_data(products_df, output_path):
+    """
+    Write a catalogue in the format given by output_path's suffix (.csv,
+    .parquet, .feather) or, for any other path, as a column store directory
+    """
+    lower_path = output_path.lower()
+    if lower_path.endswith('.csv'):
+        products_df.to_csv(output_path, index=False)
+    elif lower_path.endswith(PARQUET_SUFFIXES):
+        products_df.to_parquet(output_path, index=False)
+    elif lower_path.endswith(FEATHER_SUFFIXES):
+        products_df.to_feather(output_path)
+    else:
+        write_column_store(products_df, output_path)
+
+
+def convert_product_data(source_path, output_path):
+    """
+    Convert a catalogue to the format given by output_path's suffix, see
+    write_product_data
+
+    Returns:
+    int: Number of products written
+    """
+    products_df = _read_products(source_path)
+    validate_product_schema(products_df)
+    write_product_data(products_df, output_path)
+    return len(products_df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Product catalogue tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help="Convert a catalogue to Parquet, Feather or a column store")
+    convert.add_argument('source', help="Catalogue to read, e.g. data/products.csv")
+    convert.add_argument('output', help="Output file (.parquet, .feather) or column store directory")
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        try:
+            count = convert_product_data(args.source, args.output)
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"Conversion failed: {e}\n")
+        print(f"Wrote {count} products to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Per-session ranking state for refinement turns.
+
+A user refining a recommendation usually changes one requirement at a time.
+The catalogue is ranked again from scratch on every turn, through the
+RecommendationCache shared by every session when there is one: keeping
+per-key filter bitsets in the session to re-rank it incrementally cost
+about 400 KB per session at 1M rows and measured no faster than ranking
+block by block (benchmarks/bench_incremental).
+
+What a RankingState keeps are the session's Alibaba rows and their index,
+reused for as long as the installation types (the only part of the
+requirements in the search URL) stay the same, so a refinement neither
+searches nor parses the offers again. Fallback rows, from a search that
+failed or timed out, are not kept, so the next turn searches again.
+They are requested without the price cap, which is applied when they are
+ranked, so a new budget does not need a new search. That also
+lets the search start before the requirements are final: as soon as the
+conversation has settled the installation types, a prefetched search is
+attached to the state, and the turn that sends the requirements collects it.
+"""
+from utils.alibaba_scraper import is_fallback
+from utils.candidate_view import merge_top_k, rank_index
+from utils.product_index import build_product_index
+from utils.scoring import priority_weights
+
+
+def filter_value(requirements, requirement):
+    """
+    A requirement's value as far as filtering goes: None when it does not
+    filter, installation types as a sorted tuple
+    """
+    value = requirements.get(requirement)
+    if not value:
+        return None
+    if requirement == 'installation':
+        return tuple(sorted({value} if isinstance(value, str) else set(value)))
+    if requirement == 'max_price':
+        return float(value)
+    return True
+
+
+def uncapped(requirements):
+    """
+    requirements without max_price, for an Alibaba search whose rows are reused across budgets
+    """
+    return dict(requirements, max_price=None)
+
+
+class RankingState:
+    """
+    What a session's last ranking left behind; see the module docstring.
+    Not thread-safe: each session ranks one turn at a time.
+    """
+    __slots__ = ("alibaba_installation", "alibaba_rows", "alibaba", "prefetch_installation", "prefetched")
+
+    def __init__(self):
+        self.alibaba_installation = None
+        self.alibaba_rows = None
+        self.alibaba = None
+        self.prefetch_installation = None
+        self.prefetched = None
+
+    def alibaba_rows_for(self, requirements):
+        """
+        The kept Alibaba rows if they were searched for the same installation types, else None
+        """
+        if self.alibaba_rows is not None and \
+                self.alibaba_installation == filter_value(requirements, 'installation'):
+            return self.alibaba_rows
+        return None
+
+    def prefetch(self, requirements, future):
+        """
+        Keep an Alibaba search started early for requirements' installation types
+
+        Parameters:
+        requirements (dict): The requirements settled so far
+        future (Future): The search, started with uncapped(requirements)
+        """
+        self.prefetch_installation = filter_value(requirements, 'installation')
+        self.prefetched = future
+
+    def prefetched_for(self, requirements):
+        """
+        The prefetched search, running or finished, if it was started for the
+        same installation types and has not fallen back to mock rows, else None
+        """
+        if self.prefetched is None or self.prefetch_installation != filter_value(requirements, 'installation'):
+            return None
+        if self.prefetched.done() and self.prefetched.exception() is None and is_fallback(self.prefetched.result()):
+            self.prefetched = None
+            return None
+        return self.prefetched
+
+    def rank(self, catalogue, requirements, alibaba_results_df=None, top_k=10, cache=None):
+        """
+        Rank the catalogue, plus any Alibaba rows, the way match_products
+        ranks the two concatenated, reusing the index of Alibaba rows ranked before
+
+        Parameters:
+        catalogue (CatalogueSnapshot): The catalogue to rank
+        requirements (dict): User requirements
+        alibaba_results_df (DataFrame): Optional Alibaba rows, searched with uncapped(requirements)
+        top_k (int): Number of products to return
+        cache (RecommendationCache): Optional cache of catalogue rankings shared by every session
+
+        Returns:
+        DataFrame: The top_k products with their match_score, best first
+        """
+        weights = priority_weights(requirements.get('priorities'))
+        if cache is not None:
+            ranked = [cache.rank(catalogue, requirements, top_k)]
+        else:
+            ranked = [rank_index(catalogue.index, requirements, weights, top_k)]
+
+        if alibaba_results_df is not None:
+            if alibaba_results_df is not self.alibaba_rows:
+                self.alibaba = build_product_index(alibaba_results_df.reset_index(drop=True))
+                # Fallback rows are ranked this turn but not reused, so the next turn searches again
+                self.alibaba_rows = None if is_fallback(alibaba_results_df) else alibaba_results_df
+                self.alibaba_installation = filter_value(requirements, 'installation')
+            ranked.append(rank_index(self.alibaba, requirements, weights, top_k))
+        return merge_top_k(ranked, top_k)
@@ -0,0 +1,270 @@
+"""
+Conversation backends: the scripted MockClaude, or Claude through the
+Anthropic API.
+
+    backend = get_llm_backend()  # LLM_BACKEND=mock|anthropic
+    for piece in backend.stream_response(session_id, user_input):
+        ...
+
+Both keep each session's conversation themselves, so callers only send the
+new user turn.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import anthropic
+
+from utils.mock_claude import conversation_engine
+from utils.response_stream import stream_text
+from utils.search_cache import SearchCache
+from utils.session_store import SessionStore
+from utils.tracing import current_turn, tracer
+
+DEFAULT_MODEL = "claude-sonnet-4-5"
+MAX_TOKENS = 1024
+
+# Retries of failed Anthropic requests, with full-jitter exponential backoff
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 8
+
+# Identical conversations get the cached reply for this long
+RESPONSE_CACHE_TTL_SECONDS = 24 * 3600
+
+FALLBACK_REPLY = "Sorry, I couldn't reach the assistant just now. Please try again in a moment."
+
+SYSTEM_PROMPT = """You are a friendly shopping assistant that helps people in the UK choose a water filter.
+
+Ask one short question at a time to learn:
+- where they want to install it (under_sink, countertop, pitcher, portable, shower, whole_house or reverse_osmosis)
+- their budget in pounds
+- which contaminants worry them (chlorine, lead, fluoride, bacteria)
+- whether eco-friendliness and remineralization matter to them
+- what they care about most: health, eco, price or maintenance
+
+Once you know enough, summarise their requirements in a short bulleted list, then end your reply with exactly one block in this format:
+
+```json
+{
+  "installation": ["countertop"],
+  "max_price": 150,
+  "remove_chlorine": true,
+  "remove_lead": false,
+  "remove_fluoride": false,
+  "remove_bacteria": false,
+  "eco_friendly": true,
+  "remineralization": false,
+  "priorities": ["health", "price"]
+}
+```
+
+Do not recommend specific products yourself; the shop adds them below your reply."""
+
+
+class LLMBackend:
+    """
+    A conversation backend. Subclasses implement stream_response and reset.
+    """
+    name = None
+
+    def stream_response(self, session_id, user_input):
+        """
+        Yield the assistant's reply to user_input as it is produced
+        """
+        raise NotImplementedError
+
+    def get_response(self, session_id, user_input):
+        return "".join(self.stream_response(session_id, user_input))
+
+    def reset(self, session_id):
+        """
+        Forget a session's conversation
+        """
+        raise NotImplementedError
+
+    def known_requirements(self, session_id):
+        """
+        Requirements the conversation has settled before the final reply
+        sends them all, so slow work such as the Alibaba search can start
+        early; None when the backend cannot tell
+        """
+        return None
+
+
+class MockBackend(LLMBackend):
+    """
+    The scripted MockClaude conversation; needs no network or API key
+    """
+    name = "mock"
+
+    def __init__(self, engine=conversation_engine):
+        self.engine = engine
+
+    def stream_response(self, session_id, user_input):
+        with tracer.span("llm"):
+            response = self.engine.get_response(session_id, user_input)
+        return stream_text(response)
+
+    def reset(self, session_id):
+        self.engine.reset(session_id)
+
+    def known_requirements(self, session_id):
+        return self.engine.known_requirements(session_id)
+
+
+class Conversation:
+    """
+    Per-session message history sent to the Anthropic API
+    """
+    __slots__ = ("messages", "last_access", "lock")
+
+    def __init__(self):
+        self.messages = []
+        self.last_access = 0.0
+        self.lock = threading.Lock()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def anthropic_client(api_key=None, base_url=None):
+    """
+    Shared Anthropic client for an API key and base URL. Its HTTP
+    connection pool is reused by every backend and session in the process.
+    The SDK's own retries are off; ClaudeBackend retries with jitter.
+    """
+    api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+    base_url = base_url or os.environ.get("ANTHROPIC_BASE_URL")
+    with _clients_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+            _clients[(api_key, base_url)] = client
+        return client
+
+
+def conversation_key(model, system, messages):
+    """
+    Cache key of a conversation prefix: its hash and the model that answers it
+    """
+    prefix = json.dumps([system, messages], sort_keys=True, ensure_ascii=False)
+    return f"{model}#{hashlib.sha256(prefix.encode('utf-8')).hexdigest()}"
+
+
+def _retryable(error):
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(error, anthropic.APIStatusError):
+        return status == 429 or status >= 500
+    # Errors sent inside a stream (e.g. overloaded_error) carry no status
+    return isinstance(error, anthropic.APIError) and status is None
+
+
+class ClaudeBackend(LLMBackend):
+    """
+    Claude through the Anthropic Messages API.
+
+    Replies are streamed, and cached by (conversation prefix hash, model),
+    so repeating an identical conversation, such as the turn that produces
+    the requirements JSON, costs no API call. Set LLM_CACHE_PATH to share the cache across
+    processes and restarts. Failed requests are retried with jittered
+    backoff as long as no text has been streamed yet; when every attempt
+    fails the user gets FALLBACK_REPLY and the turn is not recorded.
+    """
+    name = "anthropic"
+
+    def __init__(self, client=None, model=None, max_tokens=MAX_TOKENS, system=SYSTEM_PROMPT, cache=None,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS,
+                 max_sessions=1000, ttl_seconds=3600):
+        self.client = client or anthropic_client()
+        self.model = model or os.environ.get("ANTHROPIC_MODEL", DEFAULT_MODEL)
+        self.max_tokens = max_tokens
+        self.system = system
+        self.cache = cache if cache is not None else SearchCache(
+            ttl_seconds=RESPONSE_CACHE_TTL_SECONDS, stale_seconds=0, path=os.environ.get("LLM_CACHE_PATH")
+        )
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sessions = SessionStore(Conversation, max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+
+    def stream_response(self, session_id, user_input):
+        conversation = self.sessions.get(session_id)
+        with conversation.lock:
+            messages = conversation.messages + [{"role": "user", "content": user_input}]
+            key = conversation_key(self.model, self.system, messages)
+
+            reply = self.cache.get(key)
+            if reply is not None:
+                yield from stream_text(reply)
+            else:
+                # Timed to the first piece and to the last; the latter includes the caller's time between pieces
+                start = tracer.clock()
+                pieces = []
+                try:
+                    for piece in self._stream_with_retries(messages):
+                        if not pieces:
+                            tracer.record("llm.first_token", tracer.clock() - start, current_turn())
+                        pieces.append(piece)
+                        yield piece
+                except Exception as e:
+                    print(f"Error calling the Anthropic API: {e!r}")
+                    if not pieces:
+                        yield FALLBACK_REPLY
+                    return
+                tracer.record("llm", tracer.clock() - start, current_turn())
+                reply = "".join(pieces)
+                self.cache.put(key, reply)
+
+            conversation.messages = messages + [{"role": "assistant", "content": reply}]
+
+    def _stream_with_retries(self, messages):
+        attempt = 0
+        while True:
+            streamed = False
+            try:
+                for piece in self._stream(messages):
+                    streamed = True
+                    yield piece
+                return
+            except Exception as e:
+                if streamed or attempt >= self.max_retries or not _retryable(e):
+                    raise
+            # Full jitter: concurrent sessions hitting the same outage spread their retries
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+            attempt += 1
+
+    def _stream(self, messages):
+        stream = self.client.messages.create(
+            model=self.model, max_tokens=self.max_tokens, system=self.system,
+            messages=messages, stream=True,
+        )
+        try:
+            for event in stream:
+                if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                    yield event.delta.text
+        finally:
+            stream.close()
+
+    def reset(self, session_id):
+        self.sessions.discard(session_id)
+
+
+BACKENDS = {backend.name: backend for backend in (MockBackend, ClaudeBackend)}
+
+
+def get_llm_backend(name=None):
+    """
+    Backend named by name or LLM_BACKEND; without either, Claude when
+    ANTHROPIC_API_KEY is set and the mock otherwise
+    """
+    name = name or os.environ.get("LLM_BACKEND") or ("anthropic" if os.environ.get("ANTHROPIC_API_KEY") else "mock")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend {name!r}, expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -1,11 +1,18 @@
 import re
 import json
 import random
+import threading
+from utils.session_store import SessionStore
 
-class MockClaude:
+# States that come after the installation question; the requirements are sent at the last of them
+ANSWERED_INSTALLATION = ("ask_budget", "ask_contaminants", "ask_eco", "ask_remineralization", "ask_household")
+
+class ConversationState:
     """
-    A class that simulates Claude's responses for water filter recommendations
+    Per-session conversation state driven by MockClaude
     """
+    __slots__ = ("conversation_state", "gathered_info", "last_access", "lock")
+
     def __init__(self):
         self.conversation_state = "greeting"
         self.gathered_info = {
@@ -16,6 +23,31 @@ class MockClaude:
             "remineralization": None,
             "household_size": None
         }
+        self.last_access = 0.0
+        self.lock = threading.Lock()
+
+class MockClaude:
+    """
+    A class that simulates Claude's responses for water filter recommendations
+    """
+    def __init__(self, state=None):
+        self.state = state if state is not None else ConversationState()
+
+    @property
+    def conversation_state(self):
+        return self.state.conversation_state
+
+    @conversation_state.setter
+    def conversation_state(self, value):
+        self.state.conversation_state = value
+
+    @property
+    def gathered_info(self):
+        return self.state.gathered_info
+
+    @gathered_info.setter
+    def gathered_info(self, value):
+        self.state.gathered_info = value
     
     def get_response(self, user_input):
         """
@@ -226,11 +258,50 @@ class MockClaude:
             
             return response
 
+class ConversationEngine:
+    """
+    Runs MockClaude conversations for many sessions in one process.
+
+    Each session id gets its own ConversationState from a bounded LRU/TTL
+    store, and a session's turns are serialized by the state's lock, so
+    concurrent users never see each other's answers.
+    """
+    def __init__(self, max_sessions=1000, ttl_seconds=3600):
+        self.sessions = SessionStore(ConversationState, max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+
+    def get_response(self, session_id, user_input):
+        state = self.sessions.get(session_id)
+        with state.lock:
+            return MockClaude(state).get_response(user_input)
+
+    def known_requirements(self, session_id):
+        """
+        Requirements this session's conversation has settled so far
+
+        Returns:
+        dict: {'installation': [...]} once the installation question has been
+            answered, until the requirements are sent; None before that
+        """
+        state = self.sessions.get(session_id)
+        with state.lock:
+            if state.conversation_state not in ANSWERED_INSTALLATION:
+                return None
+            return {"installation": list(state.gathered_info["installation"])}
+
+    def reset(self, session_id):
+        self.sessions.discard(session_id)
+
 # Initialize mock Claude
 mock_claude = MockClaude()
+conversation_engine = ConversationEngine()
 
-def get_mock_response(user_input):
+def get_mock_response(user_input, session_id=None):
     """
     Get a response from mock Claude
+
+    When session_id is given the conversation state is kept per session;
+    otherwise the process-wide mock_claude instance is used.
     """
-    return mock_claude.get_response(user_input)
\ No newline at end of file
+    if session_id is None:
+        return mock_claude.get_response(user_input)
+    return conversation_engine.get_response(session_id, user_input)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Contaminants a name can advertise: (output column, pattern, value if matched, value otherwise).
+# Stems match anywhere ('dechlorination', 'antibacterial'); short words only as whole words,
+# so 'lead' is not found in 'leading' nor 'uv' in 'fluvial'
+CONTAMINANT_RULES = [
+    ('removes_chlorine', r'chlor', 'yes', 'partial'),
+    ('removes_lead', r'\blead\b|\bheavy[\s-]*metals?\b', 'yes', 'partial'),
+    ('removes_fluoride', r'fluor', 'yes', 'no'),
+    ('removes_bacteria', r'bacteri|microb|\bgerms?\b|germicid|\buv\b', 'yes', 'no'),
+]
+
+# Filtration types in priority order: (value, pattern, filter lifespan in months)
+FILTRATION_RULES = [
+    ('reverse_osmosis', r'\bro\b|\breverse[\s-]*osmo\w*', 12),
+    ('ceramic', r'\bceramic\b', 6),
+    ('uv', r'\buv\b', 12),
+    ('multi_stage', r'\bmulti\w*|\bstages?\b', 9),
+]
+DEFAULT_FILTRATION = ('carbon', 6)
+
+# Installation types in priority order; RO systems without another hint are under-sink
+INSTALLATION_RULES = [
+    ('under_sink', r'\bunder[\s-]*sinks?\b|\bsinks?\b|\bunder\b'),
+    ('whole_house', r'\bwhole\b|\bhouse\b'),
+    ('pitcher', r'\bpitchers?\b|\bjugs?\b'),
+    ('shower', r'\bshower\w*'),
+    ('portable', r'\bportable\b|\bbottles?\b'),
+    ('under_sink', r'\bro\b|\breverse[\s-]*osmo\w*'),
+]
+DEFAULT_INSTALLATION = 'countertop'
+
+# Batches at least this large are scanned with Arrow's regex kernels; below it their
+# fixed cost is more than classifying the names one at a time (an Alibaba page has up to 100)
+VECTORIZED_MIN_NAMES = 1000
+
+REMINERALIZATION_PATTERN = re.compile(r'mineral')
+
+OUTPUT_COLUMNS = [rule[0] for rule in CONTAMINANT_RULES] + [
+    'filtration_type', 'filter_lifespan_months', 'installation', 'remineralization'
+]
+
+
+def _combined_pattern(patterns):
+    """
+    One alternation with a named group per rule, so a single scan of the
+    name finds every rule that matches
+    """
+    return re.compile("|".join(f"(?P<r{i}>{pattern})" for i, pattern in enumerate(patterns)))
+
+
+_CONTAMINANT_PATTERNS = [re.compile(rule[1]) for rule in CONTAMINANT_RULES]
+_FILTRATION_PATTERN = _combined_pattern([rule[1] for rule in FILTRATION_RULES])
+_INSTALLATION_PATTERN = _combined_pattern([rule[1] for rule in INSTALLATION_RULES])
+
+
+def _first_rule(pattern, name):
+    """
+    Index of the highest-priority rule matching anywhere in name, or None
+    """
+    matched = [int(match.lastgroup[1:]) for match in pattern.finditer(name)]
+    return min(matched) if matched else None
+
+
+def classify_name(name):
+    """
+    Infer catalogue attributes from one product name
+
+    Returns:
+    dict: Values for OUTPUT_COLUMNS
+    """
+    name = name.lower()
+    attributes = {}
+
+    for (column, _, matched_value, default_value), pattern in zip(CONTAMINANT_RULES, _CONTAMINANT_PATTERNS):
+        attributes[column] = matched_value if pattern.search(name) else default_value
+
+    rule = _first_rule(_FILTRATION_PATTERN, name)
+    if rule is None:
+        attributes['filtration_type'], attributes['filter_lifespan_months'] = DEFAULT_FILTRATION
+    else:
+        attributes['filtration_type'], _, attributes['filter_lifespan_months'] = FILTRATION_RULES[rule]
+
+    rule = _first_rule(_INSTALLATION_PATTERN, name)
+    attributes['installation'] = DEFAULT_INSTALLATION if rule is None else INSTALLATION_RULES[rule][0]
+
+    attributes['remineralization'] = 'yes' if REMINERALIZATION_PATTERN.search(name) else 'no'
+    return attributes
+
+
+def _first_rule_values(names, rules, default):
+    # Each rule is one vectorized scan; rules are applied lowest priority first so the highest wins
+    values = np.full(len(names), default, dtype=object)
+    for value, pattern in reversed(rules):
+        values[names.str.contains(pattern, regex=True).to_numpy(dtype=bool)] = value
+    return values
+
+
+def classify_names(names):
+    """
+    Infer catalogue attributes for a batch of product names, the same as
+    classify_name on each
+
+    Batches of VECTORIZED_MIN_NAMES or more are scanned once per rule with
+    pyarrow-backed Series.str.contains, when pyarrow is installed; smaller
+    ones call classify_name per name.
+
+    Parameters:
+    names (list[str]): Product names, e.g. scraped offers or an imported feed
+
+    Returns:
+    DataFrame: One row per name with OUTPUT_COLUMNS, in input order
+    """
+    names = list(names)
+    if pyarrow is None or len(names) < VECTORIZED_MIN_NAMES:
+        return pd.DataFrame([classify_name(name) for name in names], columns=OUTPUT_COLUMNS)
+
+    names = pd.Series(names, dtype="string[pyarrow]").str.lower()
+    columns = {}
+    for column, pattern, matched_value, default_value in CONTAMINANT_RULES:
+        columns[column] = np.where(names.str.contains(pattern, regex=True).to_numpy(dtype=bool),
+                                   matched_value, default_value)
+
+    filtration = _first_rule_values(names, [(rule, pattern) for rule, (_, pattern, _) in enumerate(FILTRATION_RULES)],
+                                    None)
+    columns['filtration_type'] = [DEFAULT_FILTRATION[0] if rule is None else FILTRATION_RULES[rule][0]
+                                  for rule in filtration]
+    columns['filter_lifespan_months'] = [DEFAULT_FILTRATION[1] if rule is None else FILTRATION_RULES[rule][2]
+                                         for rule in filtration]
+    columns['installation'] = _first_rule_values(names, INSTALLATION_RULES, DEFAULT_INSTALLATION)
+    columns['remineralization'] = np.where(
+        names.str.contains(REMINERALIZATION_PATTERN.pattern, regex=True).to_numpy(dtype=bool), 'yes', 'no'
+    )
+    return pd.DataFrame({column: list(columns[column]) for column in OUTPUT_COLUMNS}, columns=OUTPUT_COLUMNS)
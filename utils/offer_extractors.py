@@ -0,0 +1,220 @@
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Listing containers, tried in order until one matches
+LISTING_CLASSES = ['organic-list-offer-outter', 'J-offer-wrapper']
+
+# (tag, class) alternatives for each field, first match wins
+FIELD_SELECTORS = {
+    'name': [('h2', 'organic-list-offer__heading'), ('p', 'elements-title-normal__content')],
+    'url': [('a', 'organic-list-offer__img-wrap'), ('a', 'elements-title-normal')],
+    'price': [('span', 'elements-offer-price-normal__price'), ('div', 'price')],
+}
+
+DEFAULT_URL = "https://www.alibaba.com"
+DEFAULT_PRICE = 50.0
+
+PRICE_PATTERN = re.compile(r'[0-9,.]+')
+
+
+def _parse_price(price_text):
+    # Extract numeric value from price text
+    price_match = PRICE_PATTERN.search(price_text)
+    return float(price_match.group().replace(',', '')) if price_match else DEFAULT_PRICE
+
+
+def _build_offers(listings, find_first, get_text, get_href, max_results):
+    """
+    Shared per-listing extraction; the backends only differ in how they
+    find elements and read text/attributes
+    """
+    offers = []
+    for listing in listings[:max_results]:
+        try:
+            name_element = find_first(listing, 'name')
+            if name_element is None:
+                continue
+            product_name = get_text(name_element).strip()
+
+            url_element = find_first(listing, 'url')
+            href = get_href(url_element) if url_element is not None else None
+            product_url = "https:" + href if href is not None else DEFAULT_URL
+
+            price_element = find_first(listing, 'price')
+            min_price = _parse_price(get_text(price_element).strip()) if price_element is not None else DEFAULT_PRICE
+
+            offers.append({'name': product_name, 'url': product_url, 'price_usd': min_price})
+
+        except Exception as e:
+            print(f"Error parsing product: {e}")
+
+    return offers
+
+
+def extract_offers_bs4(html, max_results):
+    """
+    Reference backend: BeautifulSoup with the stdlib html.parser
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    listings = []
+    for class_name in LISTING_CLASSES:
+        listings = soup.find_all('div', class_=class_name)
+        if listings:
+            break
+    if not listings:
+        return None
+
+    def find_first(listing, field):
+        for tag, class_name in FIELD_SELECTORS[field]:
+            element = listing.find(tag, class_=class_name)
+            if element is not None:
+                return element
+        return None
+
+    def get_href(element):
+        return element['href'] if 'href' in element.attrs else None
+
+    return _build_offers(listings, find_first, lambda element: element.text, get_href, max_results)
+
+
+# CSS selectors for selectolax, built once
+_CSS_LISTINGS = [f"div.{class_name}" for class_name in LISTING_CLASSES]
+_CSS_FIELDS = {
+    field: [f"{tag}.{class_name}" for tag, class_name in selectors]
+    for field, selectors in FIELD_SELECTORS.items()
+}
+
+
+def extract_offers_selectolax(html, max_results):
+    """
+    Fast backend: selectolax (lexbor engine) with CSS selectors
+    """
+    tree = LexborHTMLParser(html)
+
+    listings = []
+    for selector in _CSS_LISTINGS:
+        listings = tree.css(selector)
+        if listings:
+            break
+    if not listings:
+        return None
+
+    def find_first(listing, field):
+        for selector in _CSS_FIELDS[field]:
+            element = listing.css_first(selector)
+            if element is not None:
+                return element
+        return None
+
+    def get_text(element):
+        return element.text(deep=True)
+
+    def get_href(element):
+        attributes = element.attributes
+        if 'href' not in attributes:
+            return None
+        return attributes['href'] or ''
+
+    return _build_offers(listings, find_first, get_text, get_href, max_results)
+
+
+def _class_xpath(prefix, tag, class_name):
+    return etree.XPath(
+        f"{prefix}{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+    )
+
+
+if lxml_html is not None:
+    # Precompiled XPath expressions for lxml
+    _XPATH_LISTINGS = [_class_xpath('//', 'div', class_name) for class_name in LISTING_CLASSES]
+    _XPATH_FIELDS = {
+        field: [_class_xpath('.//', tag, class_name) for tag, class_name in selectors]
+        for field, selectors in FIELD_SELECTORS.items()
+    }
+
+
+def extract_offers_lxml(html, max_results):
+    """
+    Fast backend: lxml's HTML parser with precompiled XPath selectors
+    """
+    if not html or not html.strip():
+        return None
+    tree = lxml_html.document_fromstring(html)
+
+    listings = []
+    for xpath in _XPATH_LISTINGS:
+        listings = xpath(tree)
+        if listings:
+            break
+    if not listings:
+        return None
+
+    def find_first(listing, field):
+        for xpath in _XPATH_FIELDS[field]:
+            elements = xpath(listing)
+            if elements:
+                return elements[0]
+        return None
+
+    def get_text(element):
+        return element.text_content()
+
+    return _build_offers(listings, find_first, get_text, lambda element: element.get('href'), max_results)
+
+
+EXTRACTORS = {
+    'selectolax': extract_offers_selectolax,
+    'lxml': extract_offers_lxml,
+    'bs4': extract_offers_bs4,
+}
+
+
+def available_backends():
+    """
+    Names of the extraction backends whose parser is installed, fastest first
+    """
+    backends = []
+    if LexborHTMLParser is not None:
+        backends.append('selectolax')
+    if lxml_html is not None:
+        backends.append('lxml')
+    backends.append('bs4')
+    return backends
+
+
+def extract_offers(html, max_results=5, backend=None):
+    """
+    Extract up to max_results raw offers (name, url, price_usd) from an
+    Alibaba search results page with the given backend only, or else with
+    the installed backends fastest first: when one raises or finds no
+    offers, the next is tried, down to BeautifulSoup. Returns None if no
+    product listings were found, [] if listings were found but no offers.
+    """
+    if backend is not None:
+        return EXTRACTORS[backend](html, max_results)
+
+    offers = None
+    for name in available_backends():
+        try:
+            result = EXTRACTORS[name](html, max_results)
+        except Exception as e:
+            print(f"Error extracting offers with {name}: {e!r}")
+            continue
+        if result:
+            return result
+        if result is not None:
+            offers = result
+    return offers
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+from utils.scoring import build_feature_matrix
+
+# Columns stored as categorical codes
+CATEGORICAL_COLUMNS = ['installation', 'type', 'filtration_type']
+
+# yes/partial/no columns that get a bitset per accepted value set
+CAPABILITY_COLUMNS = ['removes_chlorine', 'removes_lead', 'removes_fluoride', 'removes_bacteria']
+
+# Requirement key -> capability column it filters on
+CAPABILITY_REQUIREMENTS = {
+    'remove_chlorine': 'removes_chlorine',
+    'remove_lead': 'removes_lead',
+    'remove_fluoride': 'removes_fluoride',
+    'remove_bacteria': 'removes_bacteria',
+}
+
+# Requirement keys that filter rows, in the order filters are applied
+FILTER_REQUIREMENTS = ['installation', 'max_price', *CAPABILITY_REQUIREMENTS, 'eco_friendly', 'remineralization']
+
+
+def _to_bitset(mask):
+    """
+    Pack a boolean row mask into a uint8 bitset (8 rows per byte)
+    """
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+
+class ProductIndex:
+    """
+    Prebuilt columnar index over a product catalogue.
+
+    Filters are evaluated as bitset intersections and a binary search on
+    the sorted price array, so matching never copies the full DataFrame.
+    Build it once per catalogue load and reuse it for every request.
+    """
+    def __init__(self, products_df):
+        self.products_df = products_df
+        self.size = len(products_df)
+
+        # Categorical codes for the low-cardinality text columns
+        self.codes = {}
+        self.categories = {}
+        for column in CATEGORICAL_COLUMNS:
+            if column in products_df.columns:
+                codes, categories = pd.factorize(products_df[column])
+                self.codes[column] = codes.astype(np.int32)
+                self.categories[column] = {value: code for code, value in enumerate(categories)}
+
+        # One bitset per installation type so that an installation filter
+        # is the union of the requested types
+        self.installation_bitsets = {}
+        if 'installation' in self.codes:
+            codes = self.codes['installation']
+            for value, code in self.categories['installation'].items():
+                self.installation_bitsets[value] = _to_bitset(codes == code)
+
+        # Contaminant removal bitsets ('yes' or 'partial' passes the filter)
+        self.capability_bitsets = {}
+        for column in CAPABILITY_COLUMNS:
+            if column in products_df.columns:
+                values = products_df[column]
+                self.capability_bitsets[column] = _to_bitset(values.isin(['yes', 'partial']).to_numpy())
+
+        if 'remineralization' in products_df.columns:
+            self.remineralization_bitset = _to_bitset((products_df['remineralization'] == 'yes').to_numpy(dtype=bool))
+        else:
+            self.remineralization_bitset = None
+
+        if 'ecofriendly_rating' in products_df.columns:
+            eco = pd.to_numeric(products_df['ecofriendly_rating'], errors='coerce').to_numpy(dtype=float)
+            self.eco_bitset = _to_bitset(eco >= 4)
+        else:
+            self.eco_bitset = None
+
+        # Sorted price array for binary search (NaN prices sort last)
+        if 'price_gbp' in products_df.columns:
+            prices = pd.to_numeric(products_df['price_gbp'], errors='coerce').to_numpy(dtype=float)
+            self.prices = prices
+            self.price_order = np.argsort(prices, kind='stable')
+            self.sorted_prices = prices[self.price_order]
+        else:
+            self.prices = None
+            self.price_order = None
+            self.sorted_prices = None
+
+        # One score column per priority for the top-K scoring engine
+        self.features = build_feature_matrix(products_df)
+
+        self._all_rows = _to_bitset(np.ones(self.size, dtype=bool))
+        self._no_rows = np.zeros_like(self._all_rows)
+
+    def _price_bitset(self, max_price):
+        """
+        Rows with price_gbp <= max_price, found by binary search
+        """
+        cutoff = np.searchsorted(self.sorted_prices, float(max_price), side='right')
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.price_order[:cutoff]] = True
+        return _to_bitset(mask)
+
+    def filter_positions(self, user_requirements):
+        """
+        Return the row positions (in catalogue order) that pass every filter
+        in user_requirements, using the same rules as match_products
+        """
+        return np.flatnonzero(self.filter_mask(user_requirements))
+
+    def filter_mask(self, user_requirements, include_price=True):
+        """
+        Boolean row mask of the products passing user_requirements' filters;
+        with include_price=False the max_price filter is left to the caller
+        """
+        bitset = self._all_rows.copy()
+        for requirement in FILTER_REQUIREMENTS:
+            if requirement == 'max_price' and not include_price:
+                continue
+            requirement_bitset = self.requirement_bitset(requirement, user_requirements.get(requirement))
+            if requirement_bitset is not None:
+                bitset &= requirement_bitset
+        return np.unpackbits(bitset, count=self.size).astype(bool)
+
+    def block_mask(self, user_requirements, start, stop):
+        """
+        filter_mask for rows start:stop only (start a multiple of 8, so the
+        block is a byte range of the bitsets); the scratch arrays are the
+        size of the block, not of the catalogue
+        """
+        first_byte, last_byte = start // 8, (stop + 7) // 8
+        bitset = self._all_rows[first_byte:last_byte].copy()
+        for requirement in FILTER_REQUIREMENTS:
+            value = user_requirements.get(requirement)
+            if not value:
+                continue
+            if requirement == 'max_price':
+                if self.prices is None:
+                    bitset[:] = 0
+                else:
+                    bitset &= np.packbits(self.prices[start:stop] <= float(value))
+            elif requirement == 'installation':
+                installation_bitset = np.zeros_like(bitset)
+                for installation in value:
+                    if installation in self.installation_bitsets:
+                        installation_bitset |= self.installation_bitsets[installation][first_byte:last_byte]
+                bitset &= installation_bitset
+            else:
+                bitset &= self.requirement_bitset(requirement, value)[first_byte:last_byte]
+        return np.unpackbits(bitset, count=stop - start).astype(bool)
+
+    def requirement_bitset(self, requirement, value):
+        """
+        Bitset of the rows passing one requirement's filter, or None when value
+        does not filter (missing, empty or false). Rows lacking the column a
+        filter needs never pass it, as with match_products. Do not modify the
+        result: it may be one of the index's own bitsets.
+        """
+        if not value:
+            return None
+
+        if requirement == 'installation':
+            bitset = self._no_rows.copy()
+            for installation in value:
+                if installation in self.installation_bitsets:
+                    bitset |= self.installation_bitsets[installation]
+            return bitset
+
+        if requirement == 'max_price':
+            return self._price_bitset(value) if self.prices is not None else self._no_rows
+
+        if requirement in CAPABILITY_REQUIREMENTS:
+            return self.capability_bitsets.get(CAPABILITY_REQUIREMENTS[requirement], self._no_rows)
+
+        if requirement == 'eco_friendly':
+            return self.eco_bitset if self.eco_bitset is not None else self._no_rows
+
+        if requirement == 'remineralization':
+            return self.remineralization_bitset if self.remineralization_bitset is not None else self._no_rows
+
+        return None
+
+    def take(self, positions):
+        """
+        Return the catalogue rows at the given positions as a new DataFrame
+        """
+        return self.products_df.take(positions)
+
+
+def build_product_index(products_df):
+    """
+    Build a ProductIndex for a product catalogue
+
+    Parameters:
+    products_df (DataFrame): DataFrame with product data
+
+    Returns:
+    ProductIndex: Index to pass to match_products
+    """
+    return ProductIndex(products_df)
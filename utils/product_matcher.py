@@ -1,16 +1,34 @@
+import numpy as np
 import pandas as pd
+from utils.scoring import build_feature_matrix, priority_weights, score_rows, top_k_order
+from utils.product_index import build_product_index
+from utils.batch_matcher import rank_batch
+from utils.rendering import (
+    COMPARISON_COLUMNS, display_label, yes_no, render_comparison_table, render_detailed_comparison
+)
 
-def match_products(products_df, user_requirements):
+def match_products(products_df, user_requirements, index=None, top_k=None):
     """
     Match products to user requirements
     
     Parameters:
     products_df (DataFrame): DataFrame with product data
     user_requirements (dict): Dictionary with user requirements
+    index (ProductIndex): Optional prebuilt index over products_df; when given,
+        filtering uses its bitsets and only the matching rows are copied
+    top_k (int): Optional number of products to return; when given, scores are
+        computed as a weight-vector dot product and only the best top_k rows
+        are selected (argpartition) instead of sorting every match
     
     Returns:
     DataFrame: Filtered and sorted products
     """
+    if index is not None:
+        positions = index.filter_positions(user_requirements)
+        if top_k is not None:
+            return _top_k(index.take, index.features, positions, user_requirements, top_k)
+        return _score_and_sort(index.take(positions), user_requirements)
+    
     # Start with all products
     filtered_df = products_df.copy()
     
@@ -43,6 +61,52 @@ def match_products(products_df, user_requirements):
     if 'remineralization' in user_requirements and user_requirements['remineralization']:
         filtered_df = filtered_df[filtered_df['remineralization'] == 'yes']
     
+    if top_k is not None:
+        features = build_feature_matrix(filtered_df)
+        positions = np.arange(len(filtered_df))
+        return _top_k(filtered_df.take, features, positions, user_requirements, top_k)
+    
+    return _score_and_sort(filtered_df, user_requirements)
+
+def match_products_batch(products_df, requirements_list, top_k=10, index=None):
+    """
+    Match many requirement profiles against the catalogue at once
+    
+    Parameters:
+    products_df (DataFrame): DataFrame with product data
+    requirements_list (list): Requirement dicts, e.g. saved user profiles
+    top_k (int): Number of products to return per profile
+    index (ProductIndex): Optional prebuilt index over products_df
+    
+    Returns:
+    list: One DataFrame per profile, the same as match_products(products_df,
+        requirements, top_k=top_k) would return for it
+    """
+    index = index or build_product_index(products_df)
+    
+    matches = []
+    for positions, scores in rank_batch(index, requirements_list, top_k):
+        top_df = index.take(positions)
+        top_df['match_score'] = scores
+        matches.append(top_df)
+    return matches
+
+def _top_k(take, features, positions, user_requirements, top_k):
+    """
+    Score candidate rows with the feature matrix and keep the best top_k
+    """
+    weights = priority_weights(user_requirements.get('priorities'))
+    scores = score_rows(features, positions, weights)
+    order = top_k_order(scores, top_k)
+    
+    top_df = take(positions[order])
+    top_df['match_score'] = scores[order]
+    return top_df
+
+def _score_and_sort(filtered_df, user_requirements):
+    """
+    Add the priority-based match_score column and sort by it (descending)
+    """
     # Calculate a match score for sorting
     filtered_df['match_score'] = 0
     
@@ -74,48 +138,25 @@ def match_products(products_df, user_requirements):
             # And lower annual maintenance costs
             filtered_df['match_score'] += (200 - filtered_df['maintenance_cost_yearly_gbp']) / 40
     
-    # Sort by match score (descending)
-    filtered_df = filtered_df.sort_values('match_score', ascending=False)
+    # Sort by match score (descending); stable, so tied products keep catalogue order as with top_k
+    filtered_df = filtered_df.sort_values('match_score', ascending=False, kind='stable')
     
     return filtered_df
 
-def format_comparison_table(matched_products, top_n=3):
+def format_comparison_table(matched_products, top_n=3, columns=COMPARISON_COLUMNS):
     """
     Format top matched products into a comparison table
     
     Parameters:
     matched_products (DataFrame): DataFrame with matched products
     top_n (int): Number of top products to include
+    columns (tuple): Keys of utils.rendering.TABLE_COLUMNS to show
     
     Returns:
     str: Markdown formatted comparison table
     """
-    top_products = matched_products.head(top_n)
-    
-    if top_products.empty:
-        return "No products found matching your requirements."
-    
-    # Create enhanced table header with more columns
-    header = "| Product | Type | Price (£) | Installation | Filtration | Removes Chlorine | Removes Lead | Removes Bacteria | Filter Life | Maintenance Cost | Eco Rating |\n"
-    separator = "|---------|------|-----------|-------------|------------|-----------------|-------------|-----------------|-------------|------------------|------------|\n"
-    
-    # Create table rows
-    rows = ""
-    for _, product in top_products.iterrows():
-        # Format removal capabilities with emojis for clarity
-        chlorine_icon = "✅" if product['removes_chlorine'] == 'yes' else "⚠️" if product['removes_chlorine'] == 'partial' else "❌"
-        lead_icon = "✅" if product['removes_lead'] == 'yes' else "⚠️" if product['removes_lead'] == 'partial' else "❌"
-        bacteria_icon = "✅" if product['removes_bacteria'] == 'yes' else "⚠️" if product['removes_bacteria'] == 'partial' else "❌"
-        
-        rows += f"| {product['name']} | {product['type'].replace('_', ' ').title()} | £{product['price_gbp']} | "
-        rows += f"{product['installation'].replace('_', ' ').title()} | {product['filtration_type'].replace('_', ' ').title()} | "
-        rows += f"{chlorine_icon} | {lead_icon} | {bacteria_icon} | "
-        rows += f"{product['filter_lifespan_months']} months | £{product['maintenance_cost_yearly_gbp']}/year | {product['ecofriendly_rating']}/5 |\n"
-    
-    # Add explanation for icons
-    legend = "\n**Legend**: ✅ Yes | ⚠️ Partial | ❌ No\n"
-    
-    return header + separator + rows + legend
+    # Rendered tables are memoized by (product ids, columns)
+    return render_comparison_table(matched_products, top_n=top_n, columns=columns)
 
 def get_detailed_comparison(product1, product2):
     """
@@ -128,6 +169,9 @@ def get_detailed_comparison(product1, product2):
     Returns:
     str: Detailed comparison markdown
     """
+    return render_detailed_comparison(product1, product2, _detailed_comparison)
+
+def _detailed_comparison(product1, product2):
     comparison = f"## Detailed Comparison: {product1['name']} vs {product2['name']}\n\n"
     
     # Feature comparison
@@ -137,15 +181,15 @@ def get_detailed_comparison(product1, product2):
     # Important features to compare
     features = [
         ('Price', f"£{product1['price_gbp']}", f"£{product2['price_gbp']}"),
-        ('Type', product1['type'].replace('_', ' ').title(), product2['type'].replace('_', ' ').title()),
-        ('Installation', product1['installation'].replace('_', ' ').title(), product2['installation'].replace('_', ' ').title()),
-        ('Filtration', product1['filtration_type'].replace('_', ' ').title(), product2['filtration_type'].replace('_', ' ').title()),
+        ('Type', display_label(product1['type']), display_label(product2['type'])),
+        ('Installation', display_label(product1['installation']), display_label(product2['installation'])),
+        ('Filtration', display_label(product1['filtration_type']), display_label(product2['filtration_type'])),
         ('Capacity', f"{product1['capacity_liters']} liters", f"{product2['capacity_liters']} liters"),
         ('Removes Chlorine', product1['removes_chlorine'].title(), product2['removes_chlorine'].title()),
         ('Removes Lead', product1['removes_lead'].title(), product2['removes_lead'].title()),
         ('Removes Fluoride', product1['removes_fluoride'].title(), product2['removes_fluoride'].title()),
         ('Removes Bacteria', product1['removes_bacteria'].title(), product2['removes_bacteria'].title()),
-        ('Remineralization', 'Yes' if product1['remineralization'] == 'yes' else 'No', 'Yes' if product2['remineralization'] == 'yes' else 'No'),
+        ('Remineralization', yes_no(product1['remineralization']), yes_no(product2['remineralization'])),
         ('Filter Lifespan', f"{product1['filter_lifespan_months']} months", f"{product2['filter_lifespan_months']} months"),
         ('Yearly Maintenance', f"£{product1['maintenance_cost_yearly_gbp']}", f"£{product2['maintenance_cost_yearly_gbp']}"),
         ('Eco-friendly Rating', f"{product1['ecofriendly_rating']}/5", f"{product2['ecofriendly_rating']}/5"),
@@ -0,0 +1,230 @@
+"""
+Materialized catalogue rankings for recurring requirement profiles.
+
+The requirements the assistant produces are nearly discrete (installation
+types, on/off filters, priorities and a budget), so many users ask for the
+same ranking. A profile is keyed by its filters and priority weights, as in
+batch_matcher, with the budget rounded up to the next of BUDGET_BUCKETS.
+Each entry holds the catalogue's best DEPTH rows for the bucket's budget as
+row positions and scores; a lookup drops the rows over the exact budget and
+takes the top K of the rest. When fewer than K are left and the entry does
+not hold every matching row, the profile is ranked exactly instead.
+
+Entries belong to one catalogue version; the first lookup against a new
+version clears them.
+
+Set RECOMMENDATION_PROFILES to a JSONL file of common profiles, in the
+batch_matcher input format, to rank them into the cache at startup.
+"""
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.batch_matcher import filter_key, rank_batch, weight_key
+from utils.candidate_view import rank_index
+from utils.scoring import priority_weights
+
+# Upper budget edges in pounds; a budget is cached under the smallest edge not below it
+BUDGET_BUCKETS = (25, 50, 75, 100, 150, 200, 250, 300, 400, 500, 750, 1000)
+
+# Ranked rows kept per profile
+DEPTH = 64
+
+# Profiles kept per catalogue version, least recently used dropped first
+MAX_ENTRIES = 4096
+
+# Profiles to precompute at startup, in the batch_matcher input format
+PROFILES_PATH = os.environ.get("RECOMMENDATION_PROFILES")
+
+METRIC_NAME = "water_filter_recommendation_cache"
+
+
+def budget_bucket(max_price):
+    """
+    The budget a profile's rows are cached for: the smallest bucket edge at
+    least max_price, or None (no cap) when there is no budget or it is above every edge
+    """
+    if not max_price:
+        return None
+    position = bisect.bisect_left(BUDGET_BUCKETS, float(max_price))
+    return BUDGET_BUCKETS[position] if position < len(BUDGET_BUCKETS) else None
+
+
+def requirements_key(requirements):
+    """
+    Hashable key shared by every requirements dict served from the same entry
+    """
+    return filter_key(requirements), budget_bucket(requirements.get('max_price')), weight_key(requirements)
+
+
+def bucketed(requirements):
+    """
+    requirements with the budget replaced by its bucket's, for ranking an entry
+    """
+    return dict(requirements, max_price=budget_bucket(requirements.get('max_price')))
+
+
+def load_profiles(path):
+    """
+    Requirement profiles from a JSONL file, in the batch_matcher input format
+
+    Returns:
+    list[dict]: One requirements dict per non-empty line
+    """
+    profiles = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                profile = json.loads(line)
+                profiles.append(profile['requirements'] if 'requirements' in profile else profile)
+    return profiles
+
+
+class RecommendationCache:
+    """
+    Bounded, thread-safe memo of catalogue rankings per requirements key;
+    see the module docstring. max_entries=0 turns it off.
+    """
+    def __init__(self, max_entries=MAX_ENTRIES, depth=DEPTH):
+        self.max_entries = max_entries
+        self.depth = depth
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'shallow': 0, 'invalidations': 0, 'precomputed': 0}
+
+    def get(self, catalogue, requirements, top_k):
+        """
+        The cached top_k for requirements, or None on a miss
+
+        Returns:
+        tuple: (index, positions, scores) of the catalogue's top_k, best first, for merge_top_k
+        """
+        if not self.max_entries or top_k > self.depth:
+            return None
+        entry = self._lookup(catalogue, requirements_key(requirements))
+        return None if entry is None else self._top(catalogue, entry, requirements, top_k)
+
+    def rank(self, catalogue, requirements, top_k):
+        """
+        The catalogue's top_k for requirements, from the cache or ranked
+        block by block (and cached) on a miss
+
+        Returns:
+        tuple: (index, positions, scores) of the catalogue's top_k, best first, for merge_top_k
+        """
+        weights = priority_weights(requirements.get('priorities'))
+        if not self.max_entries or top_k > self.depth:
+            return rank_index(catalogue.index, requirements, weights, top_k)
+
+        key = requirements_key(requirements)
+        entry = self._lookup(catalogue, key)
+        if entry is None:
+            _, positions, scores = rank_index(catalogue.index, bucketed(requirements), weights, self.depth)
+            entry = self._put(catalogue, key, positions, scores)
+        ranked = self._top(catalogue, entry, requirements, top_k)
+        if ranked is None:
+            # Too few of the entry's rows are within the exact budget
+            ranked = rank_index(catalogue.index, requirements, weights, top_k)
+        return ranked
+
+    def precompute(self, catalogue, profiles):
+        """
+        Rank profiles (e.g. the most common ones, at startup) into the cache in one batch
+
+        Returns:
+        int: Number of entries added
+        """
+        if not self.max_entries:
+            return 0
+        keys = {}
+        for requirements in profiles:
+            keys.setdefault(requirements_key(requirements), bucketed(requirements))
+        keys = list(keys.items())[:self.max_entries]
+        ranked = rank_batch(catalogue.index, [requirements for _, requirements in keys], self.depth)
+        for (key, _), (positions, scores) in zip(keys, ranked):
+            self._put(catalogue, key, positions, scores)
+        with self._lock:
+            self._counts['precomputed'] += len(keys)
+        return len(keys)
+
+    def _lookup(self, catalogue, key):
+        with self._lock:
+            self._check_version(catalogue)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counts['misses'] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._counts['hits'] += 1
+            return entry
+
+    def _top(self, catalogue, entry, requirements, top_k):
+        # An entry's top_k within the exact budget, or None if it does not hold that many
+        positions, scores, budget, complete = entry
+        max_price = requirements.get('max_price')
+        if max_price and float(max_price) != budget:
+            # NaN prices fail the comparison, as they fail the price filter
+            prices = catalogue.index.prices
+            within = prices[positions] <= float(max_price) if prices is not None else np.zeros(len(positions), bool)
+            positions, scores = positions[within], scores[within]
+        if len(positions) < top_k and not complete:
+            with self._lock:
+                self._counts['shallow'] += 1
+            return None
+        return catalogue.index, positions[:top_k].astype(np.intp), scores[:top_k]
+
+    def _put(self, catalogue, key, positions, scores):
+        # Fewer rows than the depth means the entry holds every matching row
+        budget = key[1]
+        entry = (positions.astype(np.int32), scores, budget, len(positions) < self.depth)
+        with self._lock:
+            self._check_version(catalogue)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _check_version(self, catalogue):
+        # Called with the lock held
+        if self._version != catalogue.version:
+            if self._entries:
+                self._counts['invalidations'] += 1
+            self._entries.clear()
+            self._version = catalogue.version
+
+    def stats(self):
+        """
+        Returns:
+        dict: entries, hits, misses, shallow (hits whose entry was too short for the
+            exact budget, ranked afresh), invalidations (catalogue version changes) and precomputed counts
+        """
+        with self._lock:
+            return dict(self._counts, entries=len(self._entries))
+
+    def prometheus_text(self):
+        """
+        The stats in the Prometheus text exposition format
+        """
+        stats = self.stats()
+        lines = [
+            f"# HELP {METRIC_NAME}_events_total Recommendation cache lookups and maintenance",
+            f"# TYPE {METRIC_NAME}_events_total counter",
+        ]
+        for event in ('hits', 'misses', 'shallow', 'invalidations', 'precomputed'):
+            lines.append(f'{METRIC_NAME}_events_total{{event="{event}"}} {stats[event]}')
+        lines += [
+            f"# HELP {METRIC_NAME}_entries Requirement profiles cached for the current catalogue",
+            f"# TYPE {METRIC_NAME}_entries gauge",
+            f"{METRIC_NAME}_entries {stats['entries']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,348 @@
+import concurrent.futures
+import contextlib
+import json
+import multiprocessing
+import numbers
+import threading
+
+from utils.alibaba_scraper import alibaba_search_async
+from utils.candidate_view import CandidateView, merge_top_k
+from utils.incremental_ranking import filter_value, uncapped
+from utils.product_matcher import format_comparison_table
+from utils.recommendation_cache import PROFILES_PATH, RecommendationCache, load_profiles
+from utils.rendering import render_product_details
+from utils.scoring import PRIORITY_FEATURES
+from utils.sharded_matcher import ShardedMatcher
+from utils.tracing import tracer
+
+# Largest number of ranked products a recommendation carries
+MAX_RESULTS = 10
+
+# How long a request waits for Alibaba before answering from the local catalogue
+ALIBABA_LATENCY_BUDGET_SECONDS = 1.5
+
+# Catalogues smaller than this are matched in-process even when shard workers are configured
+SHARDING_MIN_ROWS = 500_000
+
+# Requirement keys that are plain on/off filters
+REQUIREMENT_FLAGS = [
+    'remove_chlorine', 'remove_lead', 'remove_fluoride', 'remove_bacteria',
+    'eco_friendly', 'remineralization',
+]
+
+# Mock YouTube installation links (in a real app, these would come from the product database)
+INSTALLATION_GUIDES = {
+    "reverse_osmosis": "https://www.youtube.com/watch?v=_w-hpBq_Cbo",
+    "under_sink": "https://www.youtube.com/watch?v=NDMXLYEv0jU",
+    "countertop": "https://www.youtube.com/watch?v=t90RQMKMv3s",
+    "pitcher": "https://www.youtube.com/watch?v=ja0ioX6GSz0",
+    "portable": "https://www.youtube.com/watch?v=t-c9WjUxLg8",
+    "shower": "https://www.youtube.com/watch?v=OaG2RyDxQlk",
+    "whole_house": "https://www.youtube.com/watch?v=5DTMfz-MP-k"
+}
+DEFAULT_INSTALLATION_GUIDE = "https://www.youtube.com/results?search_query=water+filter+installation"
+
+
+def extract_requirements(content):
+    """
+    Requirements from the ```json block of an assistant reply
+
+    Returns:
+    dict: The requirements, or None if the reply has no JSON block
+
+    Raises:
+    ValueError: If the JSON block cannot be parsed
+    """
+    if "```json" not in content:
+        return None
+    json_start = content.find("```json") + 7
+    json_end = content.find("```", json_start)
+    json_str = content[json_start:json_end].strip()
+    return json.loads(json_str)
+
+
+def validate_requirements(requirements):
+    """
+    Check a requirements dict from an untrusted caller
+
+    Returns:
+    dict: The requirements with a lone installation string wrapped in a list
+
+    Raises:
+    ValueError: If a key has the wrong type or an unknown value
+    """
+    if not isinstance(requirements, dict):
+        raise ValueError("Requirements must be a JSON object")
+    requirements = dict(requirements)
+
+    installation = requirements.get('installation')
+    if isinstance(installation, str):
+        installation = requirements['installation'] = [installation]
+    if installation is not None and not (
+            isinstance(installation, list) and all(isinstance(value, str) for value in installation)):
+        raise ValueError("installation must be a list of installation types")
+
+    max_price = requirements.get('max_price')
+    if max_price is not None and (isinstance(max_price, bool) or not isinstance(max_price, numbers.Real)):
+        raise ValueError("max_price must be a number")
+
+    for flag in REQUIREMENT_FLAGS:
+        if requirements.get(flag) is not None and not isinstance(requirements[flag], bool):
+            raise ValueError(f"{flag} must be true or false")
+
+    priorities = requirements.get('priorities')
+    if priorities is not None:
+        if not isinstance(priorities, list) or not all(isinstance(priority, str) for priority in priorities):
+            raise ValueError("priorities must be a list")
+        unknown = [priority for priority in priorities if priority not in PRIORITY_FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown priorities: {', '.join(unknown)}")
+
+    return requirements
+
+
+def get_installation_guide(product_type):
+    return INSTALLATION_GUIDES.get(product_type, DEFAULT_INSTALLATION_GUIDE)
+
+
+def format_recommendations(matched_products):
+    """
+    Builds the recommendation markdown appended to the assistant's reply
+    """
+    response = ""
+
+    # Generate comparison table for top 3 alternatives
+    comparison_table = format_comparison_table(matched_products, top_n=3)
+
+    # Add product recommendations to response
+    response += "\n\n### Recommended Products\n\n"
+    response += comparison_table
+
+    # Add detailed specs for top recommendation
+    if not matched_products.empty:
+        top_product = matched_products.iloc[0]
+        response += f"\n\n### Top Recommendation: {top_product['name']}\n\n"
+        response += render_product_details(top_product)
+
+        # Add installation guide
+        installation_url = get_installation_guide(top_product['type'])
+        response += f"\n\n### Installation Guide\n\n"
+        response += f"[Watch Installation Tutorial on YouTube]({installation_url})\n"
+
+        # Add refinement prompt
+        response += f"\n\n### Need To Refine Further?\n\n"
+        response += "You can ask me more specific questions about these products or tell me if you have additional requirements or constraints."
+
+    return response
+
+
+class Recommendation:
+    """
+    Ranked products for one set of requirements
+
+    alibaba_status is 'included' (Alibaba rows were ranked too), 'pending'
+    (Alibaba missed the latency budget) or 'disabled'.
+    """
+    __slots__ = ("requirements", "products", "catalogue_version", "alibaba_status")
+
+    def __init__(self, requirements, products, catalogue_version, alibaba_status):
+        self.requirements = requirements
+        self.products = products
+        self.catalogue_version = catalogue_version
+        self.alibaba_status = alibaba_status
+
+    def markdown(self):
+        with tracer.span("render"):
+            return format_recommendations(self.products)
+
+    def to_dict(self, include_markdown=False):
+        """
+        JSON-ready result: NaN becomes null and numpy scalars plain numbers
+        """
+        result = {
+            'requirements': self.requirements,
+            'catalogue_version': self.catalogue_version,
+            'alibaba_status': self.alibaba_status,
+            'count': len(self.products),
+            'products': json.loads(self.products.to_json(orient='records')),
+        }
+        if include_markdown:
+            result['markdown'] = self.markdown()
+        return result
+
+
+class RecommendationService:
+    """
+    Requirements in, ranked products out. Shared by the Streamlit app and
+    the HTTP API (api.py); holds no per-user state, so one instance serves
+    every session and thread.
+
+    The catalogue's top rows per requirements profile are memoized in a
+    RecommendationCache (pass RecommendationCache(max_entries=0) to turn it
+    off). With shard_workers > 0, catalogues of at least SHARDING_MIN_ROWS
+    products are matched by a ShardedMatcher with that many processes when
+    the cache misses.
+    """
+    def __init__(self, catalogue_store, max_results=MAX_RESULTS, search=alibaba_search_async, shard_workers=0,
+                 cache=None):
+        self.catalogue_store = catalogue_store
+        self.max_results = max_results
+        self.search = search
+        self.shard_workers = shard_workers
+        self.cache = cache if cache is not None else RecommendationCache()
+        self._sharded = None
+        self._sharded_lock = threading.Lock()
+        # Requests in flight per ShardedMatcher, so a replaced one is closed after its last
+        self._sharded_users = {}
+
+    def catalogue(self):
+        """
+        Current catalogue snapshot; pass it back to recommend() to keep
+        several calls on the same version
+        """
+        return self.catalogue_store.get()
+
+    @contextlib.contextmanager
+    def sharded_matcher(self, catalogue):
+        """
+        Use the ShardedMatcher for a catalogue snapshot: yields it, or None
+        when sharding is off or the catalogue is small. A new snapshot gets a
+        new matcher; the previous one is closed (its worker processes and
+        shared memory released) once no request uses it.
+        """
+        if not self.shard_workers or len(catalogue.products_df) < SHARDING_MIN_ROWS:
+            yield None
+            return
+        retired = None
+        with self._sharded_lock:
+            if self._sharded is None or self._sharded[0] is not catalogue:
+                previous = self._sharded[1] if self._sharded is not None else None
+                # Fresh interpreters: the app and API processes run threads, which fork does not copy safely
+                matcher = ShardedMatcher(catalogue.index, workers=self.shard_workers,
+                                         mp_context=multiprocessing.get_context('spawn'))
+                self._sharded = (catalogue, matcher)
+                if previous is not None and previous not in self._sharded_users:
+                    retired = previous
+            matcher = self._sharded[1]
+            self._sharded_users[matcher] = self._sharded_users.get(matcher, 0) + 1
+        # Closing waits for the workers to exit, so it is done outside the lock
+        if retired is not None:
+            retired.close()
+        try:
+            yield matcher
+        finally:
+            with self._sharded_lock:
+                self._sharded_users[matcher] -= 1
+                retired = not self._sharded_users[matcher] and self._sharded[1] is not matcher
+                if not self._sharded_users[matcher]:
+                    del self._sharded_users[matcher]
+            if retired:
+                matcher.close()
+
+    def precompute(self, profiles=None):
+        """
+        Rank requirement profiles into the cache for the current catalogue
+
+        Parameters:
+        profiles (list): Requirements dicts; by default those in the RECOMMENDATION_PROFILES file, if set
+
+        Returns:
+        int: Number of cache entries added
+        """
+        if profiles is None:
+            if not PROFILES_PATH:
+                return 0
+            try:
+                profiles = load_profiles(PROFILES_PATH)
+            except (OSError, ValueError) as e:
+                print(f"Error reading requirement profiles {PROFILES_PATH}: {e}")
+                return 0
+        with tracer.span("precompute"):
+            return self.cache.precompute(self.catalogue(), profiles)
+
+    def search_alibaba(self, requirements, state=None):
+        """
+        Start an Alibaba search, returns a concurrent.futures.Future of its DataFrame.
+
+        With a session's RankingState, rows it kept for the same installation
+        types are returned without searching, as is a search prefetch_alibaba
+        started for them, whether or not it has finished. New searches leave
+        out the price cap, which the state applies itself.
+        """
+        if state is None:
+            return self.search(requirements)
+        alibaba_results_df = state.alibaba_rows_for(requirements)
+        if alibaba_results_df is None:
+            return state.prefetched_for(requirements) or self.search(uncapped(requirements))
+        future = concurrent.futures.Future()
+        future.set_result(alibaba_results_df)
+        return future
+
+    def prefetch_alibaba(self, requirements, state):
+        """
+        Start a session's Alibaba search before its requirements are final
+
+        The search depends only on the installation types, so it can run
+        while the conversation is still asking about budget, contaminants and
+        the rest; search_alibaba collects it on the turn that sends the
+        requirements. Nothing is started when the installation types are not
+        known yet, or when the state already has rows or a search for them.
+
+        Parameters:
+        requirements (dict): The requirements settled so far, e.g. from LLMBackend.known_requirements
+        state (RankingState): The session's state, which keeps the search
+
+        Returns:
+        concurrent.futures.Future: The search started, or None
+        """
+        if not requirements or filter_value(requirements, 'installation') is None:
+            return None
+        if state.alibaba_rows_for(requirements) is not None or state.prefetched_for(requirements) is not None:
+            return None
+        future = self.search(uncapped(requirements))
+        state.prefetch(requirements, future)
+        return future
+
+    def recommend(self, requirements, alibaba_results_df=None, alibaba_status='disabled', catalogue=None, top_k=None,
+                  state=None):
+        """
+        Rank the catalogue, plus any Alibaba rows, against requirements
+
+        Parameters:
+        requirements (dict): User requirements
+        alibaba_results_df (DataFrame): Optional Alibaba rows to rank with the catalogue
+        alibaba_status (str): Reported as is when alibaba_results_df is None
+        catalogue (CatalogueSnapshot): Optional snapshot to use instead of the current one
+        top_k (int): Number of products to return, at most max_results
+        state (RankingState): The session's state from its previous turn, updated in place;
+            alibaba_results_df must then come from search_alibaba(requirements, state)
+
+        Returns:
+        Recommendation
+        """
+        catalogue = catalogue or self.catalogue()
+        top_k = min(top_k or self.max_results, self.max_results)
+
+        # Match products with requirements (only the best few are ever shown)
+        with tracer.span("match_products"):
+            if state is not None:
+                matched_products = state.rank(catalogue, requirements, alibaba_results_df, top_k, cache=self.cache)
+            elif alibaba_results_df is not None:
+                # Alibaba rows are ranked on their own and merged with the catalogue's top rows
+                matched_products = CandidateView(catalogue.index, [alibaba_results_df]).match(
+                    requirements, top_k, catalogue_top=self.cache.rank(catalogue, requirements, top_k)
+                )
+            else:
+                with self.sharded_matcher(catalogue) as sharded:
+                    if sharded is None:
+                        top = self.cache.rank(catalogue, requirements, top_k)
+                    else:
+                        top = self.cache.get(catalogue, requirements, top_k)
+                    if top is None:
+                        matched_products = sharded.match(requirements, top_k)
+                    else:
+                        matched_products = merge_top_k([top], top_k)
+        if alibaba_results_df is not None:
+            alibaba_status = 'included'
+
+        return Recommendation(requirements, matched_products, catalogue.version, alibaba_status)
@@ -0,0 +1,210 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+
+NO_PRODUCTS_MESSAGE = "No products found matching your requirements."
+LEGEND = "\n**Legend**: ✅ Yes | ⚠️ Partial | ❌ No\n"
+
+# Distinct values each label formatter remembers; catalogue columns hold a
+# few dozen, Alibaba rows can bring new ones on every search
+LABEL_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def display_label(value):
+    """
+    'under_sink' -> 'Under Sink'
+    """
+    return str(value).replace('_', ' ').title()
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def capability_icon(value):
+    return "✅" if value == 'yes' else "⚠️" if value == 'partial' else "❌"
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def capability_text(value):
+    return 'Yes' if value == 'yes' else 'Partially' if value == 'partial' else 'No'
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def yes_no(value):
+    return 'Yes' if value == 'yes' else 'No'
+
+
+LABEL_FORMATTERS = (display_label, capability_icon, capability_text, yes_no)
+
+
+# Comparison table columns: key -> (header, separator width, source column, cell formatter)
+TABLE_COLUMNS = {
+    'name': ('Product', 9, 'name', str),
+    'type': ('Type', 6, 'type', display_label),
+    'price': ('Price (£)', 11, 'price_gbp', lambda value: f"£{value}"),
+    'installation': ('Installation', 13, 'installation', display_label),
+    'filtration': ('Filtration', 12, 'filtration_type', display_label),
+    'chlorine': ('Removes Chlorine', 17, 'removes_chlorine', capability_icon),
+    'lead': ('Removes Lead', 13, 'removes_lead', capability_icon),
+    'bacteria': ('Removes Bacteria', 17, 'removes_bacteria', capability_icon),
+    'lifespan': ('Filter Life', 13, 'filter_lifespan_months', lambda value: f"{value} months"),
+    'maintenance': ('Maintenance Cost', 18, 'maintenance_cost_yearly_gbp', lambda value: f"£{value}/year"),
+    'eco': ('Eco Rating', 12, 'ecofriendly_rating', lambda value: f"{value}/5"),
+}
+COMPARISON_COLUMNS = tuple(TABLE_COLUMNS)
+
+# Columns whose display strings come from a small set of values
+LABEL_COLUMNS = {
+    'type': display_label,
+    'installation': display_label,
+    'filtration_type': display_label,
+    'removes_chlorine': capability_icon,
+    'removes_lead': capability_icon,
+    'removes_fluoride': capability_icon,
+    'removes_bacteria': capability_icon,
+}
+
+
+class RenderCache:
+    """
+    Small thread-safe LRU of rendered markdown, shared by every session
+    """
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        try:
+            hash(key)
+        except TypeError:
+            return render()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        markdown = render()
+        with self._lock:
+            self._entries[key] = markdown
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return markdown
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+render_cache = RenderCache()
+
+
+def prepare_display(products_df):
+    """
+    Precompute the display labels and icons for every distinct value in a
+    catalogue, so rendering its rows later is only dictionary lookups.
+    Call once per catalogue load: the labels of the previous catalogue are
+    dropped first.
+    """
+    for formatter in LABEL_FORMATTERS:
+        formatter.cache_clear()
+    for column, formatter in LABEL_COLUMNS.items():
+        if column in products_df.columns:
+            for value in products_df[column].dropna().unique():
+                formatter(value)
+    for column in ['remineralization', 'removes_chlorine', 'removes_lead', 'removes_fluoride', 'removes_bacteria']:
+        if column in products_df.columns:
+            for value in products_df[column].dropna().unique():
+                capability_text(value)
+                yes_no(value)
+
+
+def _key_value(value):
+    # NaN != NaN would turn every lookup of a row with a missing value into a miss
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _row_key(values):
+    # Values and their types: the same product renders '3/5' from an int
+    # column but '3.0/5' once concatenated with rows lacking that column
+    return tuple((_key_value(value), type(value).__name__) for value in values)
+
+
+def row_keys(products, source_columns):
+    """
+    Cache keys for the rows of a DataFrame: the product id (when the
+    catalogue has one) plus the values that are rendered
+    """
+    if 'product_id' in products.columns:
+        source_columns = ['product_id'] + list(source_columns)
+    values = zip(*[products[column].tolist() for column in source_columns])
+    return tuple(_row_key(row) for row in values)
+
+
+def product_key(product):
+    """
+    Cache key for a single product (Series)
+    """
+    return _row_key(product.tolist())
+
+
+def render_comparison_table(products, top_n=3, columns=COMPARISON_COLUMNS):
+    """
+    Markdown comparison table of the first top_n products, memoized by the
+    rows' product ids and the requested columns
+    """
+    top_products = products.head(top_n)
+
+    if top_products.empty:
+        return NO_PRODUCTS_MESSAGE
+
+    columns = tuple(columns)
+    source_columns = [TABLE_COLUMNS[column][2] for column in columns]
+    key = ('table', columns, row_keys(top_products, source_columns))
+    return render_cache.get_or_render(key, lambda: _render_table(top_products, columns))
+
+
+def _render_table(top_products, columns):
+    specs = [TABLE_COLUMNS[column] for column in columns]
+    header = "| " + " | ".join(spec[0] for spec in specs) + " |\n"
+    separator = "|" + "|".join("-" * spec[1] for spec in specs) + "|\n"
+
+    # Format column by column, then join the cells of each row once
+    cells = [[formatter(value) for value in top_products[source].tolist()] for _, _, source, formatter in specs]
+    rows = "".join("| " + " | ".join(row) + " |\n" for row in zip(*cells))
+
+    return header + separator + rows + LEGEND
+
+
+def render_product_details(product):
+    """
+    Bullet list with the full specification of one product
+    """
+    return render_cache.get_or_render(('details', product_key(product)), lambda: _render_details(product))
+
+
+def _render_details(product):
+    return (
+        f"* Price: £{product['price_gbp']}\n"
+        f"* Type: {display_label(product['type'])}\n"
+        f"* Installation: {display_label(product['installation'])}\n"
+        f"* Capacity: {product['capacity_liters']} liters\n"
+        f"* Filtration: {display_label(product['filtration_type'])}\n"
+        f"* Remineralization: {yes_no(product['remineralization'])}\n"
+        f"* Removes Chlorine: {capability_text(product['removes_chlorine'])}\n"
+        f"* Removes Lead: {capability_text(product['removes_lead'])}\n"
+        f"* Removes Fluoride: {capability_text(product['removes_fluoride'])}\n"
+        f"* Removes Bacteria: {capability_text(product['removes_bacteria'])}\n"
+        f"* Filter Lifespan: {product['filter_lifespan_months']} months\n"
+        f"* Annual Maintenance Cost: £{product['maintenance_cost_yearly_gbp']}\n"
+        f"* Warranty: {product['warranty_years']} years\n"
+    )
+
+
+def render_detailed_comparison(product1, product2, render):
+    """
+    Memoize a two-product comparison by the products' keys
+    """
+    key = ('comparison', product_key(product1), product_key(product2))
+    return render_cache.get_or_render(key, lambda: render(product1, product2))
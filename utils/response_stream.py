@@ -0,0 +1,113 @@
+"""
+Assistant replies as generators of markdown pieces, for st.write_stream.
+
+The conversational text is yielded first, a word at a time. The
+recommendation from the local catalogue follows as soon as it is ranked.
+Alibaba rows, which can take seconds to arrive, come last.
+"""
+import concurrent.futures
+import re
+
+from utils.product_matcher import format_comparison_table
+from utils.recommendation_service import format_recommendations
+
+# A word with the whitespace after it, or leading whitespace
+_TOKEN = re.compile(r'\S+\s*|\s+')
+
+ALIBABA_HEADING = "\n\n### More Options from Alibaba\n\n"
+
+# Markdown of the product blocks of a reply, by template; ChatHistory renders them again from the same products
+TEMPLATES = {
+    'recommendations': format_recommendations,
+    'alibaba': lambda products: ALIBABA_HEADING + format_comparison_table(products, top_n=3),
+}
+
+# Products a template reads, from the top
+TEMPLATE_ROWS = 3
+
+
+def stream_text(text):
+    """
+    Yield text a word at a time; the pieces join back to text
+    """
+    for match in _TOKEN.finditer(text):
+        yield match.group()
+
+
+def alibaba_rows(products):
+    """
+    The Alibaba-sourced rows of a ranked DataFrame, in rank order
+    """
+    if 'is_alibaba' not in products.columns:
+        return products.iloc[:0]
+    return products[products['is_alibaba'].eq(True)]
+
+
+def stream_reply(service, text, requirements=None, catalogue=None, alibaba_timeout=10, on_recommendation=None,
+                 extract=None, state=None, on_part=None):
+    """
+    Yield an assistant reply piece by piece
+
+    When requirements are known up front, the Alibaba search starts before
+    anything is yielded, so it runs while the text streams; otherwise it
+    starts once extract has read them from the finished text. If it has
+    already finished when the catalogue is ranked (a cache hit), its rows
+    are ranked with the catalogue as one table. Otherwise the catalogue
+    table is yielded straight away, and the Alibaba rows that make the
+    combined top results are appended once the search returns.
+
+    Parameters:
+    service (RecommendationService): Ranks the products
+    text (str or iterable): Conversational part of the reply, or its pieces as a model streams them
+    requirements (dict): Requirements to recommend for, or None for text only
+    catalogue (CatalogueSnapshot): Optional snapshot to rank against
+    alibaba_timeout (float): Seconds to wait for Alibaba after the catalogue table
+    on_recommendation (callable): Called with every Recommendation, the last one being final
+    extract (callable): When requirements is None, called with the full text to get them
+    state (RankingState): The session's ranking state, to reuse its Alibaba rows
+    on_part (callable): Called with ('text', text) once the text has streamed, then with
+        (template, products) for each product block yielded, to store the reply compactly
+    """
+    alibaba_future = service.search_alibaba(requirements, state) if requirements else None
+
+    pieces = []
+    for piece in stream_text(text) if isinstance(text, str) else text:
+        pieces.append(piece)
+        yield piece
+    if on_part is not None:
+        on_part('text', "".join(pieces))
+    if requirements is None and extract is not None:
+        requirements = extract("".join(pieces))
+        alibaba_future = service.search_alibaba(requirements, state) if requirements else None
+    if not requirements:
+        return
+
+    alibaba_results_df = None
+    if alibaba_future.done():
+        alibaba_results_df = alibaba_future.result()
+        alibaba_future = None
+    recommendation = service.recommend(requirements, alibaba_results_df, alibaba_status='pending', catalogue=catalogue,
+                                       state=state)
+    if on_recommendation is not None:
+        on_recommendation(recommendation)
+    if on_part is not None:
+        on_part('recommendations', recommendation.products)
+    yield recommendation.markdown()
+
+    if alibaba_future is None:
+        return
+    try:
+        alibaba_results_df = alibaba_future.result(timeout=alibaba_timeout)
+    except concurrent.futures.TimeoutError:
+        return
+    if alibaba_results_df is None or alibaba_results_df.empty:
+        return
+
+    recommendation = service.recommend(requirements, alibaba_results_df, catalogue=catalogue, state=state)
+    if on_recommendation is not None:
+        on_recommendation(recommendation)
+    new_rows = alibaba_rows(recommendation.products)
+    if not new_rows.empty:
+        if on_part is not None:
+            on_part('alibaba', new_rows)
+        yield TEMPLATES['alibaba'](new_rows)
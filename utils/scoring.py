@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# Priorities in the order of the feature matrix columns
+PRIORITY_FEATURES = ['health', 'eco', 'price', 'maintenance']
+
+
+def _yes(products_df, column):
+    if column not in products_df.columns:
+        return np.zeros(len(products_df))
+    return (products_df[column] == 'yes').to_numpy(dtype=float)
+
+
+def _numeric(products_df, column):
+    if column not in products_df.columns:
+        return np.full(len(products_df), np.nan)
+    return pd.to_numeric(products_df[column], errors='coerce').to_numpy(dtype=float)
+
+
+def build_feature_matrix(products_df):
+    """
+    Precompute one score column per priority
+
+    Parameters:
+    products_df (DataFrame): DataFrame with product data
+
+    Returns:
+    ndarray: (n_products, len(PRIORITY_FEATURES)) float matrix whose columns
+        are the score terms match_products adds for each priority
+    """
+    features = np.empty((len(products_df), len(PRIORITY_FEATURES)))
+
+    # Health priority boosts products that remove more contaminants
+    features[:, 0] = (
+        _yes(products_df, 'removes_chlorine') +
+        _yes(products_df, 'removes_lead') * 2 +
+        _yes(products_df, 'removes_fluoride') * 2 +
+        _yes(products_df, 'removes_bacteria') * 2 +
+        _yes(products_df, 'remineralization')
+    )
+    # Eco priority boosts products with higher eco rating
+    features[:, 1] = _numeric(products_df, 'ecofriendly_rating')
+    # Price priority gives higher score to lower-priced options
+    features[:, 2] = (500 - _numeric(products_df, 'price_gbp')) / 100
+    # Low maintenance priority rewards longer filter life and lower annual cost
+    features[:, 3] = (
+        _numeric(products_df, 'filter_lifespan_months') / 2 +
+        (200 - _numeric(products_df, 'maintenance_cost_yearly_gbp')) / 40
+    )
+    return features
+
+
+def priority_weights(priorities):
+    """
+    Turn a list of priority names into a weight vector over PRIORITY_FEATURES
+    """
+    priorities = priorities or []
+    return np.array([1.0 if name in priorities else 0.0 for name in PRIORITY_FEATURES])
+
+
+def score_rows(features, positions, weights):
+    """
+    Score the given feature-matrix rows with one weight-vector dot product
+
+    Columns with zero weight are skipped so that missing values (e.g. no eco
+    rating on scraped rows) only matter when that priority is requested.
+    """
+    active = np.flatnonzero(weights)
+    if len(active) == 0:
+        return np.zeros(len(positions))
+    return features[np.ix_(positions, active)] @ weights[active]
+
+
+def top_k_order(scores, k):
+    """
+    Return the indices of the k highest scores, best first
+
+    Uses argpartition so the cost is O(n) plus O(k log k) for the final
+    ordering. Ties are broken by position and NaN scores rank last, which
+    matches a stable descending sort of the whole array.
+    """
+    keys = -np.asarray(scores, dtype=float)
+    keys[np.isnan(keys)] = np.inf
+
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    if k < len(keys):
+        threshold = keys[np.argpartition(keys, k - 1)[k - 1]]
+        better = np.flatnonzero(keys < threshold)
+        tied = np.flatnonzero(keys == threshold)[:k - len(better)]
+        candidates = np.concatenate([better, tied])
+    else:
+        candidates = np.arange(len(keys))
+
+    return candidates[np.lexsort((candidates, keys[candidates]))]
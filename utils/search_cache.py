@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def normalize_search_url(url):
+    """
+    Canonical form of a search URL for use as a cache key: lower-case scheme,
+    host and query values, whitespace collapsed, parameters sorted
+    """
+    parts = urlsplit(url)
+    params = sorted(
+        (name, " ".join(value.lower().split()))
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(params), ""))
+
+
+class SearchCache:
+    """
+    Two-level cache for scraped search results.
+
+    Results live in an in-memory LRU and, when a path is given, in a SQLite
+    file shared across processes and restarts. Entries younger than
+    ttl_seconds are served directly. Entries older than that but still within
+    stale_seconds are served immediately while a background thread refetches
+    them (stale-while-revalidate). Failed fetches (None) are never cached.
+    """
+    def __init__(self, max_entries=256, ttl_seconds=900, stale_seconds=3600, path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.path = path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS search_cache "
+                    "(key TEXT PRIMARY KEY, fetched_at REAL, payload TEXT)"
+                )
+
+    def get(self, key, refresh=None):
+        """
+        Return the cached value for key, or None on a miss or expiry.
+
+        A stale value is still returned; if refresh is given it is called in
+        a background thread to replace the entry.
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        fetched_at, value = entry
+        age = time.time() - fetched_at
+        if age < self.ttl_seconds:
+            return value
+        if age < self.ttl_seconds + self.stale_seconds:
+            if refresh is not None:
+                self._refresh_in_background(key, refresh)
+            return value
+        return None
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return the cached value for key, calling fetch() on a miss or expiry
+        """
+        value = self.get(key, refresh=fetch)
+        if value is not None:
+            return value
+
+        value = fetch()
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def put(self, key, value, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        self._remember(key, (fetched_at, value))
+        if self.path:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, fetched_at, payload) VALUES (?, ?, ?)",
+                    (key, fetched_at, json.dumps(value)),
+                )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM search_cache")
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        if not self.path:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fetched_at, payload FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = (row[0], json.loads(row[1]))
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _refresh_in_background(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = fetch()
+                if value is not None:
+                    self.put(key, value)
+            except Exception as e:
+                print(f"Error refreshing cached search {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+# Shared cache for Alibaba searches; set ALIBABA_CACHE_PATH to also persist to SQLite
+search_cache = SearchCache(path=os.environ.get("ALIBABA_CACHE_PATH"))
@@ -0,0 +1,110 @@
+"""
+Memory held per user session, for sizing servers.
+
+deep_size walks what an object references through the garbage collector's
+view of it, counting each object once: numpy arrays with the data they
+own, pandas objects by their parts (blocks, index, flags) rather than their
+reported deep usage, and Arrow arrays by their buffers. Code, classes and
+dtypes are left out, as are objects shared by every session (the catalogue
+snapshot, its index and DataFrame, services), passed as shared, and
+anything they reference, such as the index's filter bitsets. Interpreter allocator overhead is not
+counted, so figures are a little under what tracemalloc reports.
+"""
+import concurrent.futures
+import gc
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+
+# Shared by every session (code, classes, dtypes, which categoricals share with the catalogue), never counted
+_NOT_COUNTED = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, types.CodeType,
+    np.dtype, pd.api.extensions.ExtensionDtype,
+)
+
+
+def deep_size(obj, shared=()):
+    """
+    Bytes referenced by obj, each object counted once
+
+    Parameters:
+    obj: Object to measure
+    shared (iterable): Objects not to count, nor walk into
+
+    Returns:
+    int: Size in bytes
+    """
+    return _walk(obj, _shared_ids(shared))
+
+
+def _shared_ids(shared):
+    # Ids of the shared objects and everything they reference; the elements
+    # of object arrays are not followed, so a large catalogue is quick to mark
+    seen = set()
+    stack = list(shared)
+    while stack:
+        value = stack.pop()
+        if id(value) in seen or isinstance(value, _NOT_COUNTED):
+            continue
+        seen.add(id(value))
+        if not isinstance(value, np.ndarray):
+            stack.extend(gc.get_referents(value))
+    return seen
+
+
+def _walk(obj, seen):
+    # Adds the ids of what it counts to seen
+    total = 0
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen or isinstance(value, _NOT_COUNTED):
+            continue
+        seen.add(id(value))
+
+        if isinstance(value, np.ndarray):
+            # Includes the data when the array owns it; a view's base is counted where it is reached
+            total += sys.getsizeof(value)
+            if value.dtype == object:
+                stack.extend(value.ravel().tolist())
+        elif type(value).__module__.startswith('pyarrow'):
+            # Arrow buffers live outside Python objects
+            total += object.__sizeof__(value) + getattr(value, 'nbytes', 0)
+        elif isinstance(value, concurrent.futures.Future):
+            total += sys.getsizeof(value)
+            if value.done() and not value.cancelled() and value.exception() is None:
+                stack.append(value.result())
+        else:
+            # pandas objects add their data to __sizeof__; it is counted when the walk reaches it
+            pandas_object = isinstance(value, (pd.DataFrame, pd.Series, pd.Index))
+            total += object.__sizeof__(value) if pandas_object else sys.getsizeof(value)
+            stack.extend(gc.get_referents(value))
+    return total
+
+
+def session_report(session_state, shared=()):
+    """
+    Bytes held by each entry of a session's state
+
+    Parameters:
+    session_state (Mapping): e.g. st.session_state.to_dict()
+    shared (iterable): Objects every session shares, not counted
+
+    Returns:
+    dict: Key -> bytes, largest first, then 'total'; an object reachable
+        from several keys is counted under the first
+    """
+    seen = _shared_ids(shared)
+    report = {key: _walk(value, seen) for key, value in session_state.items()}
+    report = dict(sorted(report.items(), key=lambda item: item[1], reverse=True))
+    report['total'] = sum(report.values())
+    return report
+
+
+def catalogue_objects(catalogue):
+    """
+    The objects of a CatalogueSnapshot that sessions share
+    """
+    return [catalogue, catalogue.index, catalogue.products_df]
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionStore:
+    """
+    Bounded, thread-safe store of per-session objects keyed by session id.
+
+    Entries are kept in least-recently-used order. An entry is dropped when it
+    has not been touched for ttl_seconds, or when max_sessions is exceeded
+    (the least recently used one goes first).
+    """
+    def __init__(self, factory, max_sessions=1000, ttl_seconds=3600, clock=time.monotonic):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """
+        Return the object for session_id, creating it if needed
+        """
+        now = self.clock()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(session_id)
+            if entry is None:
+                entry = self.factory()
+                self._entries[session_id] = entry
+                while len(self._entries) > self.max_sessions:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(session_id)
+            entry.last_access = now
+            return entry
+
+    def discard(self, session_id):
+        """
+        Forget a session (e.g. when the user resets the conversation)
+        """
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, session_id):
+        with self._lock:
+            return session_id in self._entries
+
+    def _evict_expired(self, now):
+        # Oldest entries are at the front, so stop at the first live one
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if now - entry.last_access < self.ttl_seconds:
+                break
+            del self._entries[session_id]
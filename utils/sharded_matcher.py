@@ -0,0 +1,188 @@
+import concurrent.futures
+import heapq
+import itertools
+import weakref
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from utils.product_index import CAPABILITY_COLUMNS, CAPABILITY_REQUIREMENTS
+from utils.scoring import priority_weights, score_rows, top_k_order
+
+# Arrays attached by a worker process: name -> ndarray over shared memory
+_worker_arrays = {}
+_worker_memory = []
+
+
+def _shared_columns(index):
+    """
+    The packed filter bitsets, prices and feature matrix of a ProductIndex,
+    as the arrays placed in shared memory
+    """
+    n_bytes = len(index._all_rows)
+    empty = np.zeros(n_bytes, dtype=np.uint8)
+
+    installation_codes = index.categories.get('installation', {})
+    installation = np.zeros((max(len(installation_codes), 1), n_bytes), dtype=np.uint8)
+    for value, code in installation_codes.items():
+        installation[code] = index.installation_bitsets[value]
+
+    capabilities = np.array([index.capability_bitsets.get(column, empty) for column in CAPABILITY_COLUMNS])
+    return {
+        'installation': installation,
+        'capabilities': capabilities.reshape(len(CAPABILITY_COLUMNS), n_bytes),
+        'remineralization': index.remineralization_bitset if index.remineralization_bitset is not None else empty,
+        'eco': index.eco_bitset if index.eco_bitset is not None else empty,
+        'prices': index.prices if index.prices is not None else np.full(index.size, np.nan),
+        'features': index.features,
+    }
+
+
+def _attach(layout):
+    """
+    Worker initializer: map the parent's shared-memory columns once per process
+    """
+    for name, (memory_name, shape, dtype) in layout.items():
+        memory = SharedMemory(name=memory_name)
+        _worker_memory.append(memory)
+        _worker_arrays[name] = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def _match_shard(start, stop, user_requirements, installation_codes, top_k):
+    """
+    Filter and score rows start:stop (start a multiple of 8, so the shard
+    is a byte range of the bitsets) with the same rules as
+    ProductIndex.filter_mask and match_products
+
+    Returns:
+    (positions, scores): The shard's top_k, catalogue positions, best first
+    """
+    arrays = _worker_arrays
+    first_byte, last_byte = start // 8, (stop + 7) // 8
+    bitset = np.full(last_byte - first_byte, 0xFF, dtype=np.uint8)
+
+    if installation_codes is not None:
+        installation_bitset = np.zeros_like(bitset)
+        for code in installation_codes:
+            installation_bitset |= arrays['installation'][code, first_byte:last_byte]
+        bitset &= installation_bitset
+
+    if 'max_price' in user_requirements and user_requirements['max_price']:
+        bitset &= np.packbits(arrays['prices'][start:stop] <= float(user_requirements['max_price']))
+
+    for i, requirement in enumerate(CAPABILITY_REQUIREMENTS):
+        if requirement in user_requirements and user_requirements[requirement]:
+            bitset &= arrays['capabilities'][i, first_byte:last_byte]
+
+    if 'eco_friendly' in user_requirements and user_requirements['eco_friendly']:
+        bitset &= arrays['eco'][first_byte:last_byte]
+
+    if 'remineralization' in user_requirements and user_requirements['remineralization']:
+        bitset &= arrays['remineralization'][first_byte:last_byte]
+
+    positions = np.flatnonzero(np.unpackbits(bitset, count=stop - start))
+    weights = priority_weights(user_requirements.get('priorities'))
+    scores = score_rows(arrays['features'][start:stop], positions, weights)
+    order = top_k_order(scores, top_k)
+    return positions[order] + start, scores[order]
+
+
+def _merge_key(score):
+    # Same order as top_k_order: higher score first, NaN last
+    return float('inf') if score != score else -score
+
+
+def _release(executor, memory):
+    # Wait for the workers: one still starting would otherwise map memory already unlinked
+    executor.shutdown(wait=True, cancel_futures=True)
+    for block in memory:
+        block.close()
+        block.unlink()
+
+
+class ShardedMatcher:
+    """
+    Top-K matching split across worker processes.
+
+    The packed filter bitsets, prices and feature matrix of a ProductIndex
+    are copied once into shared memory. Every worker maps them when it
+    starts, so requests only send the requirements and receive row
+    positions. Each shard (a contiguous, byte-aligned slice of the
+    catalogue) computes its local top_k, and the sorted shard results are
+    merged with a heap. Results are identical to
+    match_products(products_df, requirements, index=index, top_k=top_k).
+
+    Shared memory is released by close(), or when the matcher is garbage
+    collected.
+    """
+    def __init__(self, index, workers=4, shards=None, mp_context=None):
+        self.index = index
+        self.workers = workers
+        # Shard boundaries fall on whole bytes of the packed bitsets
+        n_bytes = (index.size + 7) // 8
+        shards = max(1, min(shards or workers, n_bytes or 1))
+        bounds = np.minimum(np.linspace(0, n_bytes, shards + 1).astype(int) * 8, index.size)
+        self.shards = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+        self._memory = []
+        layout = {}
+        try:
+            for name, array in _shared_columns(index).items():
+                array = np.ascontiguousarray(array)
+                memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._memory.append(memory)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[...] = array
+                layout[name] = (memory.name, array.shape, array.dtype.str)
+
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=mp_context, initializer=_attach, initargs=(layout,)
+            )
+        except BaseException:
+            for memory in self._memory:
+                memory.close()
+                memory.unlink()
+            raise
+        self._finalizer = weakref.finalize(self, _release, self._executor, self._memory)
+
+    def top_k_positions(self, user_requirements, top_k):
+        """
+        Catalogue positions and scores of the best top_k matches, best first
+        """
+        installation_codes = None
+        if 'installation' in user_requirements and user_requirements['installation']:
+            categories = self.index.categories.get('installation', {})
+            installation_codes = [categories[value] for value in user_requirements['installation'] if value in categories]
+
+        futures = [
+            self._executor.submit(_match_shard, start, stop, user_requirements, installation_codes, top_k)
+            for start, stop in self.shards
+        ]
+        shard_results = [future.result() for future in futures]
+
+        # Each shard is sorted by (score, position); merging keeps that order globally
+        merged = heapq.merge(*[
+            zip(map(_merge_key, scores.tolist()), positions.tolist(), scores.tolist())
+            for positions, scores in shard_results
+        ])
+        best = list(itertools.islice(merged, top_k))
+        positions = np.array([position for _, position, _ in best], dtype=np.intp)
+        scores = np.array([score for _, _, score in best], dtype=float)
+        return positions, scores
+
+    def match(self, user_requirements, top_k):
+        """
+        Same result as match_products(..., index=self.index, top_k=top_k)
+        """
+        positions, scores = self.top_k_positions(user_requirements, top_k)
+        top_df = self.index.take(positions)
+        top_df['match_score'] = scores
+        return top_df
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,137 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class StubServer:
+    """
+    Local HTTP server with canned responses, for testing network code offline.
+
+    Routes map a path to (status, body, delay_seconds), optionally followed
+    by a content type. A route can also be a callable that takes the
+    request body (bytes) and returns that tuple. Requests to unknown paths
+    get a 404. Use as a context manager:
+
+        with StubServer({"/trade/search": (200, html, 0)}) as server:
+            url = server.url("/trade/search")
+    """
+    def __init__(self, routes=None, host="127.0.0.1", port=0):
+        self.routes = dict(routes or {})
+        self.requests = []
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def url(self, path=""):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self._respond(b"")
+
+            def do_POST(self):
+                self._respond(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+            def _respond(self, request_body):
+                stub.requests.append(self.path)
+                route = stub.routes.get(urlsplit(self.path).path, (404, "Not found", 0))
+                if callable(route):
+                    route = route(request_body)
+                status, body, delay = route[:3]
+                content_type = route[3] if len(route) > 3 else "text/html; charset=utf-8"
+                if delay:
+                    time.sleep(delay)
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def messages_route(reply, failures=0, failure_status=529, delay=0):
+    """
+    Route imitating the Anthropic Messages API (POST /v1/messages), plain
+    and streamed, for testing utils.llm_backend without a network:
+
+        with StubServer({"/v1/messages": messages_route("Hello!")}) as server:
+            backend = ClaudeBackend(client=anthropic_client(base_url=server.url(), api_key="test"))
+
+    Parameters:
+    reply (str or callable): The assistant text, or a function of the request JSON returning it
+    failures (int): Requests answered with failure_status before the first success
+    failure_status (int): Status of the failed requests (529 is "overloaded")
+    delay (float): Seconds to wait before every response
+    """
+    remaining = [failures]
+    lock = threading.Lock()
+
+    def handle(request_body):
+        with lock:
+            fail = remaining[0] > 0
+            remaining[0] -= fail
+        if fail:
+            error = {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}
+            return failure_status, json.dumps(error), delay, "application/json"
+
+        request = json.loads(request_body or b"{}")
+        text = reply(request) if callable(reply) else reply
+        message = {
+            "id": "msg_stub", "type": "message", "role": "assistant", "model": request.get("model", "stub"),
+            "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": 0},
+        }
+        if not request.get("stream"):
+            message.update(content=[{"type": "text", "text": text}], stop_reason="end_turn")
+            return 200, json.dumps(message), delay, "application/json"
+
+        events = [_sse("message_start", {"type": "message_start", "message": message})]
+        events.append(_sse("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+        }))
+        for piece in re.findall(r"\S+\s*|\s+", text):
+            events.append(_sse("content_block_delta", {
+                "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece},
+            }))
+        events.append(_sse("content_block_stop", {"type": "content_block_stop", "index": 0}))
+        events.append(_sse("message_delta", {
+            "type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": 0},
+        }))
+        events.append(_sse("message_stop", {"type": "message_stop"}))
+        return 200, "".join(events), delay, "text/event-stream"
+
+    return handle
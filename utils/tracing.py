@@ -0,0 +1,210 @@
+"""
+Per-turn latency tracing.
+
+    with tracer.turn("chat_turn"):
+        with tracer.span("match_products"):
+            ...
+
+Spans time a stage with a monotonic clock. Every duration goes into a
+rolling window per stage, from which p50/p95/p99 are computed, and into the
+current turn's span list. Finished turns can also be appended to a JSONL log.
+
+Set TRACING=0 to turn tracing off, and TRACE_LOG_PATH to log every turn.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Durations kept per stage for the percentiles
+WINDOW = 2048
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRIC_NAME = "water_filter_stage_seconds"
+
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+class Turn:
+    """
+    The spans of one chat turn or API request, in the order they finished
+    """
+    __slots__ = ("name", "started_at", "start", "duration", "spans")
+
+    def __init__(self, name, started_at, start):
+        self.name = name
+        self.started_at = started_at
+        self.start = start
+        self.duration = None
+        self.spans = []
+
+    def to_dict(self):
+        return {
+            "turn": self.name,
+            "started_at": self.started_at,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "spans": [{"stage": stage, "ms": round(seconds * 1000, 3)} for stage, seconds in self.spans],
+        }
+
+
+class _Span:
+    __slots__ = ("tracer", "stage", "turn", "start")
+
+    def __init__(self, tracer, stage):
+        self.tracer = tracer
+        self.stage = stage
+
+    def __enter__(self):
+        self.turn = _current_turn.get()
+        self.start = self.tracer.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.stage, self.tracer.clock() - self.start, self.turn)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _TurnContext:
+    __slots__ = ("tracer", "turn", "token")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.turn = Turn(name, time.time(), tracer.clock())
+
+    def __enter__(self):
+        self.token = _current_turn.set(self.turn)
+        return self.turn
+
+    def __exit__(self, *exc_info):
+        _current_turn.reset(self.token)
+        self.tracer._finish(self.turn)
+
+
+class Tracer:
+    """
+    Span timer and per-stage latency windows, shared by every thread.
+
+    When disabled, span() and turn() return a do-nothing context manager
+    and record() returns at once.
+    """
+    def __init__(self, enabled=True, window=WINDOW, log_path=None, clock=time.perf_counter):
+        self.enabled = enabled
+        self.window = window
+        self.log_path = log_path
+        self.clock = clock
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage):
+        """
+        Context manager timing one stage
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def turn(self, name):
+        """
+        Context manager around a chat turn or request; yields its Turn (None when disabled).
+        The whole turn is recorded as a stage under its own name.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _TurnContext(self, name)
+
+    def record(self, stage, seconds, turn=None):
+        """
+        Add a duration measured elsewhere, e.g. in a callback thread; turn
+        is the Turn it belongs to (see current_turn)
+        """
+        if not self.enabled:
+            return
+        if turn is not None:
+            turn.spans.append((stage, seconds))
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+                self._totals[stage] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def _finish(self, turn):
+        turn.duration = self.clock() - turn.start
+        self.record(turn.name, turn.duration)
+        if self.log_path:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as log:
+                    log.write(json.dumps(turn.to_dict()) + "\n")
+            except OSError as e:
+                print(f"Error writing trace log {self.log_path}: {e}")
+
+    def summary(self):
+        """
+        Latency per stage over the recent window
+
+        Returns:
+        dict: stage -> {'count', 'sum', 'p50', 'p95', 'p99'}, durations in seconds;
+            count and sum cover every recorded span, the percentiles the last window
+        """
+        with self._lock:
+            snapshot = {stage: (np.array(samples), tuple(self._totals[stage])) for stage, samples in self._samples.items()}
+        summary = {}
+        for stage, (samples, (count, total)) in sorted(snapshot.items()):
+            percentiles = np.quantile(samples, QUANTILES) if len(samples) else [np.nan] * len(QUANTILES)
+            summary[stage] = {'count': count, 'sum': total}
+            for quantile, value in zip(QUANTILES, percentiles):
+                summary[stage][f"p{round(quantile * 100)}"] = float(value)
+        return summary
+
+    def prometheus_text(self):
+        """
+        The summary in the Prometheus text exposition format (a summary metric per stage)
+        """
+        lines = [
+            f"# HELP {METRIC_NAME} Duration of chat turn and request stages",
+            f"# TYPE {METRIC_NAME} summary",
+        ]
+        for stage, stats in self.summary().items():
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            for quantile in QUANTILES:
+                lines.append(f'{METRIC_NAME}{{stage="{label}",quantile="{quantile}"}} {stats[f"p{round(quantile * 100)}"]:.6g}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {stats["sum"]:.6g}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+def current_turn():
+    """
+    The Turn being traced in this context, or None
+    """
+    return _current_turn.get()
+
+
+# Process-wide tracer; TRACING=0 disables it
+tracer = Tracer(enabled=os.environ.get("TRACING", "1") != "0", log_path=os.environ.get("TRACE_LOG_PATH"))